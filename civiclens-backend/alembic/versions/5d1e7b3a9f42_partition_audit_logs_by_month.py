@@ -0,0 +1,112 @@
+"""partition audit_logs by month
+
+Converts audit_logs into a table range-partitioned by month on "timestamp".
+Existing rows are copied into monthly partitions covering their range; the
+current month and the next few months are created ahead of time, and a
+DEFAULT partition catches anything outside them. Ongoing partition creation
+and retention are handled by app.workers.audit_partition_worker.
+
+The primary key becomes (id, timestamp), as Postgres requires the partition
+key in every unique constraint. The single-column user_id index is replaced
+by (user_id, timestamp); (resource_type, resource_id, timestamp) is added for
+resource audit trails.
+
+Revision ID: 5d1e7b3a9f42
+Revises: 92a6f8c52a99
+Create Date: 2026-04-02 10:12:37.184529
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1e7b3a9f42'
+down_revision: Union[str, None] = '92a6f8c52a99'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PREMAKE_MONTHS = 3
+
+INDEXES = [
+    ("ix_audit_logs_id", "(id)"),
+    ("ix_audit_logs_action", "(action)"),
+    ("ix_audit_logs_timestamp", '("timestamp")'),
+    ("ix_audit_logs_ip_address", "(ip_address)"),
+    ("idx_audit_user_timestamp", '(user_id, "timestamp")'),
+    ("idx_audit_resource_timestamp", '(resource_type, resource_id, "timestamp")'),
+]
+
+
+def _add_months(dt: datetime, months: int) -> datetime:
+    index = dt.year * 12 + (dt.month - 1) + months
+    return dt.replace(year=index // 12, month=index % 12 + 1)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned")
+    op.execute("ALTER TABLE audit_logs_unpartitioned RENAME CONSTRAINT audit_logs_pkey TO audit_logs_unpartitioned_pkey")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE")
+
+    op.execute(
+        "CREATE TABLE audit_logs (LIKE audit_logs_unpartitioned INCLUDING DEFAULTS) "
+        'PARTITION BY RANGE ("timestamp")'
+    )
+    op.execute('ALTER TABLE audit_logs ADD CONSTRAINT audit_logs_pkey PRIMARY KEY (id, "timestamp")')
+    op.execute(
+        "ALTER TABLE audit_logs ADD CONSTRAINT audit_logs_user_id_fkey "
+        "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE SET NULL"
+    )
+
+    # Monthly partitions from the oldest existing row through the premake window
+    now = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    oldest = bind.execute(
+        sa.text("SELECT date_trunc('month', min(\"timestamp\") AT TIME ZONE 'UTC') FROM audit_logs_unpartitioned")
+    ).scalar()
+    start = oldest.replace(tzinfo=timezone.utc) if oldest else now
+    last = _add_months(now, PREMAKE_MONTHS)
+    while start <= last:
+        end = _add_months(start, 1)
+        op.execute(
+            f"CREATE TABLE audit_logs_p{start.year:04d}_{start.month:02d} PARTITION OF audit_logs "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        start = end
+    op.execute("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT")
+
+    op.execute("INSERT INTO audit_logs SELECT * FROM audit_logs_unpartitioned")
+    op.execute("DROP TABLE audit_logs_unpartitioned")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+
+    # Indexes after the bulk copy; created on every partition automatically
+    for name, columns in INDEXES:
+        op.execute(f"CREATE INDEX {name} ON audit_logs {columns}")
+
+    op.execute("ANALYZE audit_logs")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_partitioned")
+    op.execute("ALTER TABLE audit_logs_partitioned RENAME CONSTRAINT audit_logs_pkey TO audit_logs_partitioned_pkey")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE")
+
+    op.execute("CREATE TABLE audit_logs (LIKE audit_logs_partitioned INCLUDING DEFAULTS)")
+    op.execute("ALTER TABLE audit_logs ADD CONSTRAINT audit_logs_pkey PRIMARY KEY (id)")
+    op.execute(
+        "ALTER TABLE audit_logs ADD CONSTRAINT audit_logs_user_id_fkey "
+        "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE SET NULL"
+    )
+    op.execute("INSERT INTO audit_logs SELECT * FROM audit_logs_partitioned")
+    op.execute("DROP TABLE audit_logs_partitioned")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+
+    op.execute("CREATE INDEX ix_audit_logs_id ON audit_logs (id)")
+    op.execute("CREATE INDEX ix_audit_logs_user_id ON audit_logs (user_id)")
+    op.execute("CREATE INDEX ix_audit_logs_action ON audit_logs (action)")
+    op.execute('CREATE INDEX ix_audit_logs_timestamp ON audit_logs ("timestamp")')
+    op.execute("CREATE INDEX ix_audit_logs_ip_address ON audit_logs (ip_address)")
@@ -0,0 +1,43 @@
+"""add content-addressed media objects
+
+Uploaded media is stored once per distinct content: objects live at
+media/<hh>/<sha256><ext> and are tracked in media_objects with a reference
+count. media.content_hash links each Media row to its object; rows uploaded
+before this revision keep their per-report objects and have no hash.
+
+Revision ID: 7b2e9c4d1a6f
+Revises: 5d1e7b3a9f42
+Create Date: 2026-10-19 14:05:12.431876
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e9c4d1a6f'
+down_revision: Union[str, None] = '5d1e7b3a9f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'media_objects',
+        sa.Column('content_hash', sa.String(length=64), primary_key=True),
+        sa.Column('file_url', sa.String(length=500), nullable=False),
+        sa.Column('mime_type', sa.String(length=100), nullable=True),
+        sa.Column('file_size', sa.Integer(), nullable=True),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    )
+    op.add_column('media', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_media_content_hash', 'media', ['content_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_media_content_hash', table_name='media')
+    op.drop_column('media', 'content_hash')
+    op.drop_table('media_objects')
@@ -0,0 +1,116 @@
+"""add_hot_query_indexes
+
+Composite and partial indexes for the hot report/task filters, replacing the
+out-of-band scripts/add_performance_indexes.sql.
+
+Workload (query -> index):
+- admin report lists / map data: department_id + status, newest first
+      -> idx_report_dept_status_created
+- my-reports, per-user rate limit: user_id + created_at
+      -> idx_report_user_created
+- status-filtered lists / analytics windows: status + created_at
+      -> idx_report_status_created
+- AI review queue (needs_review = true, ai_processed_at >= cutoff)
+      -> idx_report_review_queue (partial)
+- AI pending queue (ai_processed_at IS NULL AND is_duplicate = false)
+      -> idx_report_ai_pending (partial)
+- AI metrics (ai_processed_at >= cutoff)
+      -> idx_report_ai_processed (partial)
+- duplicate clusters (is_duplicate = true, grouped by duplicate_of_report_id)
+      -> idx_report_duplicates (partial)
+- active-report counts by severity / department (excludes closed/resolved/rejected)
+      -> idx_report_active_severity (partial)
+- resolution-time stats (tasks.status + resolved_at)
+      -> idx_task_status_resolved
+
+Indexes are built CONCURRENTLY so the migration can run against a live
+database. Redundant copies created by the old SQL script (duplicates of
+model-managed indexes, or prefixes of the composites below) are dropped.
+
+Verify with: python -m scripts.verify_query_indexes
+
+Revision ID: 92a6f8c52a99
+Revises: c3d039251b8f
+Create Date: 2026-10-19 10:12:31.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '92a6f8c52a99'
+down_revision: Union[str, None] = 'c3d039251b8f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+ACTIVE_STATUS_PREDICATE = "status NOT IN ('closed', 'resolved', 'rejected')"
+
+# (name, table, columns, partial predicate)
+INDEXES = [
+    ('idx_report_dept_status_created', 'reports', ['department_id', 'status', 'created_at'], None),
+    ('idx_report_user_created', 'reports', ['user_id', 'created_at'], None),
+    ('idx_report_status_created', 'reports', ['status', 'created_at'], None),
+    ('idx_report_review_queue', 'reports', ['ai_processed_at'], 'needs_review = true'),
+    ('idx_report_ai_pending', 'reports', ['created_at'], 'ai_processed_at IS NULL AND is_duplicate = false'),
+    ('idx_report_ai_processed', 'reports', ['ai_processed_at'], 'ai_processed_at IS NOT NULL'),
+    ('idx_report_duplicates', 'reports', ['duplicate_of_report_id'], 'is_duplicate = true'),
+    ('idx_report_active_severity', 'reports', ['severity', 'department_id'], ACTIVE_STATUS_PREDICATE),
+    ('idx_task_status_resolved', 'tasks', ['status', 'resolved_at'], None),
+]
+
+# Created by scripts/add_performance_indexes.sql; each duplicates a
+# model-managed index or is a prefix of one of the composites above.
+REDUNDANT_SCRIPT_INDEXES = [
+    'idx_reports_status',
+    'idx_reports_severity',
+    'idx_reports_created_at',
+    'idx_reports_ai_processed',
+    'idx_reports_department_id',
+    'idx_reports_user_id',
+    'idx_reports_status_severity',
+    'idx_reports_status_created',
+    'idx_reports_dept_status',
+    'idx_tasks_status',
+    'idx_tasks_assigned_to',
+    'idx_tasks_report_id',
+    'idx_tasks_officer_status',
+    'idx_users_role',
+    'idx_media_report_id',
+    'idx_report_status_history_report_id',
+]
+
+
+def upgrade() -> None:
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                if_not_exists=True,
+            )
+        for name in REDUNDANT_SCRIPT_INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+    op.execute('ANALYZE reports')
+    op.execute('ANALYZE tasks')
+
+
+def downgrade() -> None:
+    # The script-created indexes were never managed by Alembic and are not restored
+    with op.get_context().autocommit_block():
+        for name, table, _columns, _where in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
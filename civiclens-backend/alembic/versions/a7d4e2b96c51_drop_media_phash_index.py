@@ -0,0 +1,29 @@
+"""drop media phash index
+
+Duplicate photos are matched by Hamming distance over the candidate
+reports' media (found by report_id); a B-tree on phash can never serve that
+predicate.
+
+Revision ID: a7d4e2b96c51
+Revises: f8a2c6d94e13
+Create Date: 2026-10-19 22:41:08.173562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d4e2b96c51'
+down_revision: Union[str, None] = 'f8a2c6d94e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_media_phash', table_name='media')
+
+
+def downgrade() -> None:
+    op.create_index('ix_media_phash', 'media', ['phash'])
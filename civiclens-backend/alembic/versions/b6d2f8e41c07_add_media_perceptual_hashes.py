@@ -0,0 +1,34 @@
+"""add media perceptual hashes
+
+64-bit pHash/dHash of uploaded images (signed BIGINT), compared by Hamming
+distance in duplicate detection. Existing media has none and is simply not
+matched by image.
+
+Revision ID: b6d2f8e41c07
+Revises: e4a1f7c93b25
+Create Date: 2026-10-19 18:04:12.517203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d2f8e41c07'
+down_revision: Union[str, None] = 'e4a1f7c93b25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('media', sa.Column('phash', sa.BigInteger(), nullable=True))
+    op.add_column('media', sa.Column('dhash', sa.BigInteger(), nullable=True))
+    op.create_index('ix_media_phash', 'media', ['phash'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_media_phash', table_name='media')
+    op.drop_column('media', 'dhash')
+    op.drop_column('media', 'phash')
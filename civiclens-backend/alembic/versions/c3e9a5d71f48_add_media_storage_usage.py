@@ -0,0 +1,49 @@
+"""add media storage usage
+
+Incremental per-report / per-upload-source / total media byte and object
+counters, seeded from the existing media rows.
+
+Revision ID: c3e9a5d71f48
+Revises: b6d2f8e41c07
+Create Date: 2026-10-19 19:12:40.861357
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e9a5d71f48'
+down_revision: Union[str, None] = 'b6d2f8e41c07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'media_storage_usage',
+        sa.Column('scope', sa.String(length=20), nullable=False),
+        sa.Column('scope_key', sa.String(length=50), nullable=False),
+        sa.Column('byte_count', sa.BigInteger(), nullable=False),
+        sa.Column('object_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('scope', 'scope_key')
+    )
+
+    op.execute("""
+        INSERT INTO media_storage_usage (scope, scope_key, byte_count, object_count)
+        SELECT 'report', report_id::text, coalesce(sum(file_size), 0), count(*)
+        FROM media GROUP BY report_id
+        UNION ALL
+        SELECT 'source', coalesce(upload_source::text, 'unknown'), coalesce(sum(file_size), 0), count(*)
+        FROM media GROUP BY upload_source
+        UNION ALL
+        SELECT 'total', 'all', coalesce(sum(file_size), 0), count(*)
+        FROM media
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('media_storage_usage')
@@ -0,0 +1,31 @@
+"""add media object variants
+
+Stores the URLs of the thumbnail/medium WebP variants generated for each
+content-addressed image object. Existing objects have none; their Media
+rows fall back to the full-size URL.
+
+Revision ID: e4a1f7c93b25
+Revises: 7b2e9c4d1a6f
+Create Date: 2026-10-19 15:22:48.907315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a1f7c93b25'
+down_revision: Union[str, None] = '7b2e9c4d1a6f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('media_objects', sa.Column('variants', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('media_objects', 'variants')
@@ -0,0 +1,62 @@
+"""add stats rollups
+
+Precomputed dashboard, department and officer statistics refreshed by the
+stats rollup worker. stats_rollups tracks freshness per rollup kind (and
+holds the dashboard/public payloads); per-entity rollups live in their own
+tables.
+
+Revision ID: f8a2c6d94e13
+Revises: c3e9a5d71f48
+Create Date: 2026-10-19 21:04:17.520394
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f8a2c6d94e13'
+down_revision: Union[str, None] = 'c3e9a5d71f48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stats_rollups',
+        sa.Column('kind', sa.String(length=50), primary_key=True),
+        sa.Column('data', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('source_generation', sa.Integer(), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_table(
+        'department_stats_rollups',
+        sa.Column('department_id', sa.Integer(), sa.ForeignKey('departments.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('total_officers', sa.Integer(), nullable=False),
+        sa.Column('active_officers', sa.Integer(), nullable=False),
+        sa.Column('total_reports', sa.Integer(), nullable=False),
+        sa.Column('pending_reports', sa.Integer(), nullable=False),
+        sa.Column('in_progress_reports', sa.Integer(), nullable=False),
+        sa.Column('resolved_reports', sa.Integer(), nullable=False),
+        sa.Column('avg_resolution_time_days', sa.Float(), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_table(
+        'officer_stats_rollups',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('active_reports', sa.Integer(), nullable=False),
+        sa.Column('resolved_reports', sa.Integer(), nullable=False),
+        sa.Column('avg_resolution_time_days', sa.Float(), nullable=True),
+        sa.Column('workload_score', sa.Float(), nullable=False),
+        sa.Column('capacity_level', sa.String(length=20), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('officer_stats_rollups')
+    op.drop_table('department_stats_rollups')
+    op.drop_table('stats_rollups')
@@ -1,16 +1,22 @@
 """
 Audit Log API endpoints
+
+audit_logs is partitioned by month on ``timestamp``. Listings walk backwards
+one monthly window at a time (each query bounded on ``timestamp`` so Postgres
+prunes to a single partition) and stop as soon as ``limit`` rows are found,
+instead of sorting across every partition.
 """
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, Select
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
 from app.models.audit_log import AuditLog, AuditAction
 from app.models.user import User
+from app.services.audit_partition_service import month_start, add_months, retention_horizon
 from pydantic import BaseModel
 
 
@@ -36,12 +42,51 @@ class AuditLogResponse(BaseModel):
         from_attributes = True
 
 
+async def _fetch_latest(
+    db: AsyncSession,
+    query: Select,
+    limit: int,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> List[AuditLog]:
+    """
+    Newest-first rows of ``query`` within [since, until), fetched one monthly
+    partition window at a time until ``limit`` rows are collected.
+    """
+    until = until or datetime.now(timezone.utc)
+    if until.tzinfo is None:
+        until = until.replace(tzinfo=timezone.utc)
+    since = since or retention_horizon()
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    
+    logs: List[AuditLog] = []
+    window_end = until
+    window_start = month_start(until)
+    while window_end > since and len(logs) < limit:
+        lower = max(window_start, since)
+        result = await db.execute(
+            query
+            .where(AuditLog.timestamp >= lower)
+            .where(AuditLog.timestamp < window_end)
+            .order_by(AuditLog.timestamp.desc())
+            .limit(limit - len(logs))
+        )
+        logs.extend(result.scalars().all())
+        window_end = window_start
+        window_start = add_months(window_start, -1)
+    
+    return logs
+
+
 @router.get("/resource/{resource_type}/{resource_id}", response_model=List[AuditLogResponse])
 async def get_resource_audit_trail(
     resource_type: str,
     resource_id: str,
     limit: int = Query(100, ge=1, le=500),
     action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -53,23 +98,20 @@ async def get_resource_audit_trail(
         resource_id: ID of the resource
         limit: Maximum number of logs to return
         action: Optional filter by action type
+        since: Optional lower bound on timestamp (defaults to the retention window)
+        until: Optional upper bound on timestamp (defaults to now)
     """
     query = (
         select(AuditLog)
         .where(AuditLog.resource_type == resource_type)
         .where(AuditLog.resource_id == resource_id)
-        .order_by(AuditLog.timestamp.desc())
-        .limit(limit)
     )
     
     # Optional filter by action
     if action:
         query = query.where(AuditLog.action == action)
     
-    result = await db.execute(query)
-    logs = result.scalars().all()
-    
-    return logs
+    return await _fetch_latest(db, query, limit, since, until)
 
 
 @router.get("/user/{user_id}", response_model=List[AuditLogResponse])
@@ -77,6 +119,8 @@ async def get_user_audit_trail(
     user_id: int,
     limit: int = Query(100, ge=1, le=500),
     action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -87,22 +131,16 @@ async def get_user_audit_trail(
         user_id: ID of the user
         limit: Maximum number of logs to return
         action: Optional filter by action type
+        since: Optional lower bound on timestamp (defaults to the retention window)
+        until: Optional upper bound on timestamp (defaults to now)
     """
-    query = (
-        select(AuditLog)
-        .where(AuditLog.user_id == user_id)
-        .order_by(AuditLog.timestamp.desc())
-        .limit(limit)
-    )
+    query = select(AuditLog).where(AuditLog.user_id == user_id)
     
     # Optional filter by action
     if action:
         query = query.where(AuditLog.action == action)
     
-    result = await db.execute(query)
-    logs = result.scalars().all()
-    
-    return logs
+    return await _fetch_latest(db, query, limit, since, until)
 
 
 @router.get("/recent", response_model=List[AuditLogResponse])
@@ -110,6 +148,8 @@ async def get_recent_audit_logs(
     limit: int = Query(50, ge=1, le=200),
     action: Optional[str] = None,
     resource_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -120,8 +160,10 @@ async def get_recent_audit_logs(
         limit: Maximum number of logs to return
         action: Optional filter by action type
         resource_type: Optional filter by resource type
+        since: Optional lower bound on timestamp (defaults to the retention window)
+        until: Optional upper bound on timestamp (defaults to now)
     """
-    query = select(AuditLog).order_by(AuditLog.timestamp.desc()).limit(limit)
+    query = select(AuditLog)
     
     # Optional filters
     if action:
@@ -129,10 +171,7 @@ async def get_recent_audit_logs(
     if resource_type:
         query = query.where(AuditLog.resource_type == resource_type)
     
-    result = await db.execute(query)
-    logs = result.scalars().all()
-    
-    return logs
+    return await _fetch_latest(db, query, limit, since, until)
 
 
 @router.get("/actions", response_model=List[str])
@@ -9,9 +9,8 @@ from app.core.security import (
     generate_otp,
     generate_password_reset_token,
     generate_jti,
-    get_password_hash,
-    verify_password
 )
+from app.core.password_hashing import password_hasher
 from app.core.exceptions import UnauthorizedException, ValidationException
 from app.core.dependencies import get_current_user, require_admin
 from app.core.rate_limiter import rate_limiter
@@ -513,22 +512,16 @@ async def login(
     db: AsyncSession = Depends(get_db)
 ):
     """Login with phone and password with dual-layer rate limiting"""
-    # 1. Global IP-based rate limit
-    await rate_limiter.check_ip_rate_limit(http_request, identifier="Login IP attempts")
-    
-    # 2. Targeted phone-based rate limit
-    await rate_limiter.check_login_rate_limit(request.phone)
-    
-    # Check if account is locked
-    await account_security.check_account_status(request.phone)
+    # Global IP limit, phone limit, lock check and attempt counting
+    # (one atomic Redis round trip)
+    login_guard = await account_security.begin_login(request.phone, http_request)
     
     # Authenticate user
     user = await user_crud.authenticate(db, request.phone, request.password)
 
     if not user:
-        # Record failed login attempt
-        attempts = await account_security.record_failed_login(request.phone)
-        remaining = settings.MAX_LOGIN_ATTEMPTS - attempts
+        # The failed attempt was already counted by begin_login
+        remaining = login_guard.remaining
         
         # Log failure in background
         from app.core.enhanced_security import get_client_ip, sanitize_user_agent
@@ -566,6 +559,8 @@ async def login(
             user_agent=ua,
             reason=f"Portal access denied: {error_message}"
         )
+        # Credentials were valid; don't count this against the lockout
+        await account_security.clear_failed_login(request.phone)
         raise UnauthorizedException(error_message)
     
     # Clear failed login attempts on successful login
@@ -694,7 +689,7 @@ async def verify_user_password(
         raise UnauthorizedException("User not found")
     
     # Verify password (Note: User model uses hashed_password, not password_hash)
-    if not user.hashed_password or not verify_password(password, user.hashed_password):
+    if not user.hashed_password or not await password_hasher.verify(password, user.hashed_password):
         raise UnauthorizedException("Invalid password")
     
     return {"verified": True, "message": "Password verified successfully"}
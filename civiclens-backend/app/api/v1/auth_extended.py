@@ -13,15 +13,15 @@ from app.core.security import (
     decode_refresh_token,
     generate_password_reset_token,
     generate_jti,
-    get_password_hash,
-    verify_password,
 )
+from app.core.password_hashing import password_hasher
 from app.core.enhanced_security import validate_password_strength
 from app.core.exceptions import UnauthorizedException, ValidationException
 from app.core.audit_logger import audit_logger
 from app.core.dependencies import get_current_user
 from app.core.rate_limiter import rate_limiter
 from app.core.session_manager import session_manager
+from app.core.session_store import session_store
 from app.schemas.auth import (
     RefreshTokenRequest,
     Token,
@@ -77,10 +77,15 @@ async def refresh_token(
     
     # Update session with new access token JTI
     print(f"🔄 Refresh: Updating session {session.id} - Old JTI: {session.jti[:10]}... → New JTI: {new_access_jti[:10]}...")
+    old_access_jti = session.jti
     session.jti = new_access_jti
     session.last_activity = datetime.utcnow()
     await db.commit()
     await db.refresh(session)  # Ensure session is refreshed from DB
+    # The old access token is not revoked: requests already in flight with it
+    # are let through by get_current_user until it expires
+    await session_store.remove([old_access_jti])
+    await session_store.put(session)
     print(f"✅ Refresh: Session {session.id} updated successfully with JTI: {session.jti[:10]}...")
     
     return Token(
@@ -132,13 +137,8 @@ async def logout_others(
     payload = decode_access_token(token)
     current_jti = payload.get("jti") if payload else None
 
-    # Get all active sessions for the user
-    sessions = await session_manager.get_user_sessions(db, current_user.id, active_only=True)
-
-    # Invalidate all except current
-    for s in sessions:
-        if not current_jti or s.jti != current_jti:
-            await session_manager.invalidate_session(db, s.jti)
+    # Invalidate all except current (one set-based UPDATE)
+    await session_manager.invalidate_all_user_sessions(db, current_user.id, except_jti=current_jti)
 
     return {"message": "All other sessions terminated"}
 
@@ -248,7 +248,7 @@ async def reset_password(
         raise ValidationException(error_msg)
     
     # Update password
-    user.hashed_password = get_password_hash(request.new_password)
+    user.hashed_password = await password_hasher.hash(request.new_password)
     await db.commit()
     
     # Log password reset
@@ -275,11 +275,14 @@ async def change_password(
     current_user = Depends(get_current_user)
 ):
     """Change password (requires old password)"""
+    # Password hash is never part of the cached principal
+    await db.refresh(current_user, ["hashed_password"])
+    
     # Verify old password
     if not current_user.hashed_password:
         raise ValidationException("User does not have a password set")
     
-    if not verify_password(request.old_password, current_user.hashed_password):
+    if not await password_hasher.verify(request.old_password, current_user.hashed_password):
         raise UnauthorizedException("Incorrect current password")
     
     # Validate new password strength
@@ -288,7 +291,7 @@ async def change_password(
         raise ValidationException(error_msg)
     
     # Update password
-    current_user.hashed_password = get_password_hash(request.new_password)
+    current_user.hashed_password = await password_hasher.hash(request.new_password)
     await db.commit()
     
     # Log password change
@@ -365,6 +368,9 @@ async def enable_two_factor(
     """
     Enable 2FA after verifying TOTP code
     """
+    # TOTP secret is never part of the cached principal
+    await db.refresh(current_user, ["totp_secret"])
+    
     if not current_user.totp_secret:
         raise ValidationException("2FA not set up. Call /2fa/setup first.")
     
@@ -394,6 +400,8 @@ async def disable_two_factor(
     """
     Disable 2FA after verifying TOTP code
     """
+    await db.refresh(current_user, ["totp_secret"])
+    
     if not current_user.two_fa_enabled:
         raise ValidationException("2FA is not enabled")
     
@@ -424,6 +432,8 @@ async def verify_two_factor(
     """
     Verify 2FA code (used during login flow)
     """
+    await db.refresh(current_user, ["totp_secret"])
+    
     if not current_user.two_fa_enabled:
         raise ValidationException("2FA is not enabled for this user")
     
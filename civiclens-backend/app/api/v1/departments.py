@@ -12,6 +12,7 @@ from app.models.user import User, UserRole
 from app.models.report import Report, ReportStatus
 from app.models.task import Task, TaskStatus
 from app.core.dependencies import get_current_user
+from app.services.stats_rollup_service import StatsRollupService
 from pydantic import BaseModel
 
 
@@ -83,18 +84,9 @@ async def get_all_department_stats(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get statistics for all departments"""
-    # Get all departments
-    dept_result = await db.execute(select(Department))
-    departments = dept_result.scalars().all()
-    
-    stats_list = []
-    
-    for dept in departments:
-        stats = await get_department_statistics(db, dept.id, dept.name)
-        stats_list.append(stats)
-    
-    return stats_list
+    """Get statistics for all departments (read from precomputed rollups)"""
+    stats = await StatsRollupService(db).get_department_stats()
+    return [DepartmentStatsResponse(**row) for row in stats]
 
 
 @router.get("/{department_id}/stats", response_model=DepartmentStatsResponse)
@@ -33,21 +33,16 @@ async def detailed_health_check():
     db_ok = await check_database_connection()
     redis_ok = await check_redis_connection()
 
-    # Check MinIO
-    minio_ok = False
+    # Check object storage
+    storage_ok = False
     try:
-        from minio import Minio
-        client = Minio(
-            settings.MINIO_ENDPOINT,
-            access_key=settings.MINIO_ACCESS_KEY,
-            secret_key=settings.MINIO_SECRET_KEY,
-            secure=settings.MINIO_USE_SSL,
-        )
-        minio_ok = client.bucket_exists(settings.MINIO_BUCKET)
+        from app.services.storage_service import get_storage_service
+        storage = await get_storage_service()
+        storage_ok = await storage.backend.is_available()
     except Exception:
         pass
 
-    all_healthy = db_ok and redis_ok and minio_ok
+    all_healthy = db_ok and redis_ok and storage_ok
     http_status = 200 if all_healthy else 503
 
     from fastapi.responses import JSONResponse
@@ -68,8 +63,8 @@ async def detailed_health_check():
                     "type": "redis",
                 },
                 "storage": {
-                    "status": "ok" if minio_ok else "error",
-                    "type": "minio",
+                    "status": "ok" if storage_ok else "error",
+                    "type": settings.STORAGE_BACKEND,
                     "bucket": settings.MINIO_BUCKET,
                 },
             },
@@ -98,6 +93,25 @@ async def readiness_check():
     )
 
 
+@router.get("/health/cache")
+async def cache_stats():
+    """
+    Per-cache hit/miss counters for this worker process.
+    """
+    from app.core.cache import get_cache_stats
+    return {"caches": get_cache_stats()}
+
+
+@router.get("/health/metrics")
+async def query_metrics():
+    """
+    Per-route SQL query count / DB time histograms (Prometheus text format).
+    """
+    from fastapi.responses import PlainTextResponse
+    from app.core.query_metrics import render_metrics
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @router.get("/health/live")
 async def liveness_check():
     """
@@ -4,7 +4,7 @@ Media Upload API Endpoints for CivicLens
 Handles file uploads for reports with validation and processing
 """
 
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, Form, HTTPException, Query, status
 from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
@@ -20,9 +20,20 @@ from app.schemas.media import (
     BulkUploadResponse, 
     MediaListResponse, 
     UploadLimitsResponse, 
-    StorageStatsResponse
+    StorageStatsResponse,
+    DirectUploadRequest,
+    DirectUploadResponse,
+    FinalizeUploadRequest,
+    UploadStatusResponse
 )
 from app.services.file_upload_service import get_file_upload_service, FileUploadService
+from app.services.direct_upload_service import DirectUploadService
+from app.services.storage_backends import StorageError
+from app.services.storage_service import get_storage_service
+from app.core.background_tasks import queue_media_for_processing_bg
+from app.services.media_processing_service import unprocessed_media_ids
+from app.services.storage_usage_service import get_usage
+from app.config import settings
 from app.core.exceptions import NotFoundException, ForbiddenException, ValidationException
 from app.core.audit_logger import audit_logger
 from app.models.audit_log import AuditAction, AuditStatus
@@ -42,6 +53,7 @@ router = APIRouter(prefix="/media", tags=["Media Upload"])
 @router.post("/upload/{report_id}", response_model=MediaResponse)
 async def upload_single_file(
     report_id: int,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(..., description="File to upload (image or audio)"),
     caption: Optional[str] = Form(None, description="Optional caption for the file"),
     is_primary: bool = Form(False, description="Mark as primary image"),
@@ -106,6 +118,7 @@ async def upload_single_file(
             upload_source=source_enum,
             is_proof_of_work=is_proof_of_work
         )
+        await db.commit()
         
         # Audit log
         await audit_logger.log(
@@ -125,10 +138,15 @@ async def upload_single_file(
             resource_id=str(media.id)
         )
         
+        # Optimisation runs in the media worker once the row is committed
+        background_tasks.add_task(queue_media_for_processing_bg, unprocessed_media_ids([media]))
+        
         return MediaResponse(
             id=media.id,
             report_id=media.report_id,
             file_url=media.file_url,
+            thumbnail_url=media.variant_url("thumbnail"),
+            medium_url=media.variant_url("medium"),
             file_type=media.file_type.value.lower(),  # Convert to lowercase for frontend
             file_size=media.file_size,
             mime_type=media.mime_type,
@@ -168,6 +186,7 @@ async def upload_single_file(
 @router.post("/upload/{report_id}/bulk", response_model=BulkUploadResponse)
 async def upload_multiple_files(
     report_id: int,
+    background_tasks: BackgroundTasks,
     files: List[UploadFile] = File(..., description="Files to upload (max 5 images + 1 audio)"),
     captions: Optional[str] = Form(None, description="JSON array of captions for each file"),
     db: AsyncSession = Depends(get_db),
@@ -216,6 +235,7 @@ async def upload_multiple_files(
             user_id=current_user.id,
             captions=parsed_captions
         )
+        await db.commit()
         
         # Convert to response format
         for media in media_list:
@@ -223,6 +243,8 @@ async def upload_multiple_files(
                 id=media.id,
                 report_id=media.report_id,
                 file_url=media.file_url,
+                thumbnail_url=media.variant_url("thumbnail"),
+                medium_url=media.variant_url("medium"),
                 file_type=media.file_type.value.lower(),  # Convert to lowercase for frontend
                 file_size=media.file_size,
                 mime_type=media.mime_type,
@@ -249,6 +271,8 @@ async def upload_multiple_files(
             resource_id="bulk"
         )
         
+        background_tasks.add_task(queue_media_for_processing_bg, unprocessed_media_ids(media_list))
+        
         return BulkUploadResponse(
             success=True,
             uploaded_count=len(uploaded_media),
@@ -282,6 +306,96 @@ async def upload_multiple_files(
         )
 
 
+async def _get_uploadable_report(db: AsyncSession, report_id: int, current_user: User) -> Report:
+    """Report the current user may upload files to"""
+    report = await report_crud.get(db, report_id)
+    if not report:
+        raise NotFoundException("Report not found")
+    
+    if report.user_id != current_user.id and not current_user.can_access_admin_portal():
+        raise ForbiddenException("You can only upload files to your own reports")
+    
+    return report
+
+
+@router.post("/upload/{report_id}/presign", response_model=DirectUploadResponse)
+async def create_direct_uploads(
+    report_id: int,
+    request: DirectUploadRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    upload_service: FileUploadService = Depends(get_file_upload_service)
+) -> DirectUploadResponse:
+    """
+    Start a direct upload: returns a presigned POST target per file
+    
+    Post each file to its ``url`` as multipart/form-data with all ``fields``
+    followed by the file as ``file``, then call ``/finalize`` with the
+    upload ids. Content type and size are enforced by storage.
+    """
+    
+    await _get_uploadable_report(db, report_id, current_user)
+    
+    try:
+        uploads = await DirectUploadService(upload_service).create_uploads(
+            report_id, current_user.id, request.files
+        )
+    except StorageError as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    
+    return DirectUploadResponse(
+        uploads=uploads,
+        expires_in=settings.DIRECT_UPLOAD_EXPIRE_SECONDS
+    )
+
+
+@router.post(
+    "/upload/{report_id}/finalize",
+    response_model=List[UploadStatusResponse],
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def finalize_direct_uploads(
+    report_id: int,
+    request: FinalizeUploadRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    upload_service: FileUploadService = Depends(get_file_upload_service)
+) -> List[UploadStatusResponse]:
+    """
+    Finalize direct uploads
+    
+    Uploaded files are validated and added to the report by the direct
+    upload worker; poll ``/status`` for the resulting media ids. Files that
+    have not been uploaded yet stay pending and can be finalized again.
+    """
+    
+    await _get_uploadable_report(db, report_id, current_user)
+    
+    statuses, _ = await DirectUploadService(upload_service).finalize(
+        report_id, current_user.id, request.upload_ids
+    )
+    
+    return [UploadStatusResponse(**upload_status) for upload_status in statuses]
+
+
+@router.get("/upload/{report_id}/status", response_model=List[UploadStatusResponse])
+async def get_direct_upload_status(
+    report_id: int,
+    upload_ids: List[str] = Query(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    upload_service: FileUploadService = Depends(get_file_upload_service)
+) -> List[UploadStatusResponse]:
+    """State of direct uploads: pending, processing, completed or failed"""
+    
+    await _get_uploadable_report(db, report_id, current_user)
+    
+    statuses = await DirectUploadService(upload_service).get_statuses(
+        report_id, current_user.id, upload_ids
+    )
+    return [UploadStatusResponse(**upload_status) for upload_status in statuses]
+
+
 @router.delete("/{media_id}")
 async def delete_media(
     media_id: int,
@@ -327,6 +441,8 @@ async def delete_media(
 @router.get("/report/{report_id}", response_model=List[MediaResponse])
 async def get_report_media(
     report_id: int,
+    signed: bool = Query(False, description="Return presigned URLs (valid for at least expires_in seconds)"),
+    expires_in: int = Query(3600, ge=60, le=86400),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> List[MediaResponse]:
@@ -351,11 +467,30 @@ async def get_report_media(
     )
     media_list = media_result.scalars().all()
     
+    # Batch-sign every URL at once (local HMAC, cached per time window)
+    signed_urls = {}
+    if signed:
+        storage = await get_storage_service()
+        signed_urls = storage.get_signed_urls(
+            {
+                url
+                for media in media_list
+                for url in (media.file_url, media.variant_url("thumbnail"), media.variant_url("medium"))
+                if url
+            },
+            expires_in=expires_in
+        )
+    
+    def url_for(url: Optional[str]) -> Optional[str]:
+        return signed_urls.get(url, url) if url else url
+    
     return [
         MediaResponse(
             id=media.id,
             report_id=media.report_id,
-            file_url=media.file_url,
+            file_url=url_for(media.file_url),
+            thumbnail_url=url_for(media.variant_url("thumbnail")),
+            medium_url=url_for(media.variant_url("medium")),
             file_type=media.file_type.value.lower(),  # Convert to lowercase for frontend
             file_size=media.file_size,
             mime_type=media.mime_type,
@@ -403,17 +538,20 @@ async def get_upload_limits():
 
 @router.get("/storage/stats")
 async def get_storage_stats(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     upload_service: FileUploadService = Depends(get_file_upload_service)
 ):
-    """Get storage statistics (admin only)"""
+    """Get storage statistics and per report/department/source usage (admin only)"""
     
     if not current_user.can_access_admin_portal():
         raise ForbiddenException("Admin access required")
     
-    storage_stats = upload_service.storage.get_storage_stats()
+    storage_stats = await upload_service.storage.get_storage_stats()
+    usage = await get_usage(db)
     
     return {
         "storage": storage_stats,
+        "usage": usage,
         "timestamp": datetime.utcnow().isoformat()
     }
\ No newline at end of file
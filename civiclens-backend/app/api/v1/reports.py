@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Query, status, Request, Form, BackgroundTasks
+from fastapi import APIRouter, Depends, Query, status, Request, Form, BackgroundTasks, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from typing import Optional
@@ -19,6 +19,7 @@ from app.models.report import Report, ReportStatus, ReportSeverity
 from app.crud.report import report_crud
 from app.crud.user import user_crud
 from app.core.rate_limiter import rate_limiter
+from app.core.cache import get_cache, invalidate as invalidate_cache, REPORTS_TAG
 from app.config import settings
 from pydantic import BaseModel, Field
 from app.models.task import Task, TaskStatus
@@ -26,7 +27,9 @@ from sqlalchemy import select, func
 from app.models.report_status_history import ReportStatusHistory
 from datetime import datetime
 from app.models.department import Department
+import base64
 import logging
+import math
 from app.core.background_tasks import (
     update_user_reputation_bg,
     queue_report_for_processing_bg,
@@ -35,6 +38,18 @@ from app.core.background_tasks import (
 
 logger = logging.getLogger(__name__)
 
+map_data_cache = get_cache("map_data", ttl_seconds=300, tags=[REPORTS_TAG])
+map_clusters_cache = get_cache("map_clusters", ttl_seconds=settings.MAP_TILE_CACHE_SECONDS, tags=[REPORTS_TAG])
+map_tiles_cache = get_cache("map_tiles", ttl_seconds=settings.MAP_TILE_CACHE_SECONDS, tags=[REPORTS_TAG])
+
+
+def _split_csv(value: Optional[str]) -> Optional[list[str]]:
+    """Parse a comma-separated query parameter into a list (None if empty)"""
+    if not value:
+        return None
+    items = [v.strip() for v in value.split(',') if v.strip()]
+    return items or None
+
 
 def serialize_report_with_details(report, current_user: Optional[User] = None, bookmarked_ids: Optional[set[int]] = None) -> dict:
     """Helper function to serialize a report with its relationships"""
@@ -160,6 +175,8 @@ def serialize_report_with_details(report, current_user: Optional[User] = None, b
                         payload["media"].append({
                             "id": media.id,
                             "file_url": media.file_url,
+                            "thumbnail_url": media.variant_url("thumbnail"),
+                            "medium_url": media.variant_url("medium"),
                             "file_type": media.file_type.value if hasattr(media.file_type, 'value') else str(media.file_type),
                             "file_size": getattr(media, "file_size", None),
                             "mime_type": getattr(media, "mime_type", None),
@@ -356,7 +373,9 @@ async def create_report(
 
         # Add media records for photos and videos (pre-uploaded via storage)
         from app.models.media import Media, MediaType, UploadSource
+        from app.services.storage_usage_service import apply_usage, usage_entries
         
+        media_list = []
         if photos:
             for i, photo_url in enumerate(photos):
                 media = Media(
@@ -367,6 +386,7 @@ async def create_report(
                     is_primary=(i == 0)
                 )
                 db.add(media)
+                media_list.append(media)
         
         if videos:
             for video_url in videos:
@@ -377,6 +397,7 @@ async def create_report(
                     upload_source=UploadSource.CITIZEN_SUBMISSION
                 )
                 db.add(media)
+                media_list.append(media)
         
         if photos or videos:
             await db.flush()
@@ -419,21 +440,15 @@ async def create_report(
             user_agent=request.headers.get("user-agent")
         )
 
+        # Counter rows stay locked only until this commit
+        await apply_usage(db, usage_entries(media_list))
+        
         # Commit all changes
         await db.commit()
         await db.refresh(report)
         
-        # Invalidate map data cache (non-blocking)
-        try:
-            redis = await get_redis()
-            # Delete all map data cache keys (pattern: map_data:*)
-            keys = await redis.keys("map_data:*")
-            if keys:
-                await redis.delete(*keys)
-                logger.info(f"Invalidated {len(keys)} map data cache keys after report creation")
-        except Exception as e:
-            logger.warning(f"Failed to invalidate map cache: {e}")
-            # Don't fail the request if cache invalidation fails
+        # Invalidate report-derived caches (map data, dashboard stats)
+        await invalidate_cache(REPORTS_TAG)
         
         # Send notification to citizen that report was received
         try:
@@ -617,38 +632,35 @@ async def get_map_data(
     
     Production Features:
     - Optimized query (only fetches required fields)
-    - Redis caching (5 minutes)
+    - Redis caching (5 minutes, invalidated on report writes)
     - No relationship loading (faster queries)
     - Rate limiting ready
     - Efficient for heat map rendering
     """
-    import hashlib
-    import json
-    from datetime import timedelta
-    
-    # Build cache key from filters
-    cache_key_parts = {
+    filters = {
         'status': status,
         'severity': severity,
         'category': category,
         'department_id': department_id,
         'limit': limit
     }
-    cache_key_str = json.dumps(cache_key_parts, sort_keys=True)
-    cache_key = f"map_data:{hashlib.md5(cache_key_str.encode()).hexdigest()}"
-    
-    # Try to get from cache
-    try:
-        redis = await get_redis()
-        cached_data = await redis.get(cache_key)
-        if cached_data:
-            logger.info(f"Map data cache hit for key: {cache_key}")
-            response = json.loads(cached_data)
-            response["cached"] = True
-            return response
-    except Exception as e:
-        logger.warning(f"Cache read error: {e}")
-    
+
+    response, cached = await map_data_cache.fetch(
+        filters,
+        lambda: _compute_map_data(db, status, severity, category, department_id, limit)
+    )
+    return {**response, "cached": cached}
+
+
+async def _compute_map_data(
+    db: AsyncSession,
+    status: Optional[str],
+    severity: Optional[str],
+    category: Optional[str],
+    department_id: Optional[int],
+    limit: int
+) -> dict:
+    """Query minimal map fields from the database (cache miss)"""
     # Build optimized query - only fetch required fields
     query = select(
         Report.id,
@@ -705,25 +717,114 @@ async def get_map_data(
         for row in rows
     ]
     
-    response = {
+    return {
         "reports": map_data,
-        "count": len(map_data),
-        "cached": False
+        "count": len(map_data)
     }
+
+
+@router.get("/map-clusters", response_model=dict)
+async def get_map_clusters(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(..., ge=0, le=22, description="Map zoom level"),
+    status: Optional[str] = Query(None, description="Comma-separated status list"),
+    severity: Optional[str] = Query(None, description="Comma-separated severity list"),
+    category: Optional[str] = Query(None, description="Comma-separated category list"),
+    department_id: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get server-side clustered report data for the visible map viewport
     
-    # Cache the result for 5 minutes
-    try:
-        redis = await get_redis()
-        await redis.setex(
-            cache_key,
-            int(timedelta(minutes=5).total_seconds()),
-            json.dumps(response)
+    Unlike /map-data, every report in the viewport is represented: reports are
+    aggregated into grid cells sized by zoom level, so payload size depends on
+    the viewport rather than on the number of reports.
+    """
+    if min_lat > max_lat or min_lng > max_lng:
+        raise ValidationException("Invalid bounding box: min must be less than max")
+    
+    # Snap bbox outward to the cluster grid so nearby viewports share cache entries
+    cell_size = 360.0 / (2 ** zoom) / settings.MAP_CLUSTER_CELLS_PER_TILE
+    bbox = {
+        "min_lat": max(-90.0, math.floor(min_lat / cell_size) * cell_size),
+        "min_lng": max(-180.0, math.floor(min_lng / cell_size) * cell_size),
+        "max_lat": min(90.0, math.ceil(max_lat / cell_size) * cell_size),
+        "max_lng": min(180.0, math.ceil(max_lng / cell_size) * cell_size),
+    }
+    filters = {
+        "statuses": _split_csv(status),
+        "severities": _split_csv(severity),
+        "categories": _split_csv(category),
+        "department_id": department_id,
+    }
+    
+    async def compute() -> dict:
+        clusters = await report_crud.get_map_clusters(
+            db,
+            zoom=zoom,
+            cells_per_tile=settings.MAP_CLUSTER_CELLS_PER_TILE,
+            limit=settings.MAP_CLUSTER_MAX_RESULTS,
+            **bbox,
+            **filters
         )
-        logger.info(f"Map data cached for key: {cache_key}")
-    except Exception as e:
-        logger.warning(f"Cache write error: {e}")
+        return {
+            "clusters": clusters,
+            "count": len(clusters),
+            "total_reports": sum(c["count"] for c in clusters),
+            "zoom": zoom,
+        }
+    
+    response, cached = await map_clusters_cache.fetch({**bbox, **filters, "zoom": zoom}, compute)
+    return {**response, "cached": cached}
+
+
+@router.get("/map-tiles/{z}/{x}/{y}.mvt")
+async def get_map_tile(
+    z: int,
+    x: int,
+    y: int,
+    status: Optional[str] = Query(None, description="Comma-separated status list"),
+    severity: Optional[str] = Query(None, description="Comma-separated severity list"),
+    category: Optional[str] = Query(None, description="Comma-separated category list"),
+    department_id: Optional[int] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get a Mapbox Vector Tile of aggregated reports (layer "reports")
     
-    return response
+    Features carry count/critical/high properties and report_id for the
+    smallest clusters. Tiles are cached per z/x/y and filter set.
+    """
+    if not (0 <= z <= 22) or not (0 <= x < 2 ** z) or not (0 <= y < 2 ** z):
+        raise ValidationException(f"Invalid tile coordinates {z}/{x}/{y}")
+    
+    filters = {
+        "statuses": _split_csv(status),
+        "severities": _split_csv(severity),
+        "categories": _split_csv(category),
+        "department_id": department_id,
+    }
+    
+    async def compute() -> str:
+        tile = await report_crud.get_map_tile(
+            db, z=z, x=x, y=y,
+            grid_size=settings.MAP_TILE_GRID_SIZE,
+            **filters
+        )
+        # Response cache stores JSON - keep the binary tile base64 encoded
+        return base64.b64encode(tile).decode("ascii")
+    
+    encoded = await map_tiles_cache.get_or_set({**filters, "z": z, "x": x, "y": y}, compute)
+    return Response(
+        content=base64.b64decode(encoded),
+        media_type="application/vnd.mapbox-vector-tile",
+        headers={"Cache-Control": "private, max-age=60"}
+    )
 
 
 @router.get("/my-reports", response_model=list[ReportWithDetails])
@@ -1163,6 +1264,7 @@ async def update_report_status(
             resource_id=str(report_id)
         )
 
+    await invalidate_cache(REPORTS_TAG)
     return updated
 
 
@@ -2009,6 +2111,7 @@ async def update_report(
         raise ForbiddenException("Not authorized to update this report")
     
     updated_report = await report_crud.update(db, report_id, report_data)
+    await invalidate_cache(REPORTS_TAG)
     return updated_report
 
 
@@ -2029,6 +2132,7 @@ async def delete_report(
         raise ForbiddenException("Not authorized to delete this report")
     
     await report_crud.delete(db, report_id)
+    await invalidate_cache(REPORTS_TAG)
     return None
 
 
@@ -2178,6 +2282,9 @@ async def bulk_update_status(
             resource_id="bulk"
         )
         
+        if result['successful'] > 0:
+            await invalidate_cache(REPORTS_TAG)
+        
         return BulkOperationResult(**result)
         
     except Exception as e:
@@ -17,15 +17,18 @@ from app.core.database import get_db, get_redis, AsyncSessionLocal
 from app.core.dependencies import get_current_user
 from app.core.exceptions import NotFoundException, ForbiddenException, ValidationException
 from app.core.audit_logger import audit_logger
+from app.core.cache import invalidate as invalidate_cache, REPORTS_TAG
 from app.models.audit_log import AuditAction, AuditStatus
 from app.models.user import User
 from app.models.report import Report, ReportStatus, ReportSeverity, ReportCategory
 from app.schemas.report import ReportCreateInternal, ReportResponse, ReportWithDetails
 from app.services.file_upload_service import get_file_upload_service, FileUploadService
+from app.services.media_processing_service import unprocessed_media_ids
 from app.crud.report import report_crud
 from app.core.background_tasks import (
     update_user_reputation_bg,
     queue_report_for_processing_bg,
+    queue_media_for_processing_bg,
     log_audit_event_bg
 )
 from app.config import settings
@@ -408,6 +411,7 @@ async def submit_complete_report(
         
         # 5. Background tasks — pass ONLY plain scalars, never ORM objects or sessions
         background_tasks.add_task(queue_report_for_processing_bg, report.id)
+        background_tasks.add_task(queue_media_for_processing_bg, unprocessed_media_ids(media_list))
         background_tasks.add_task(update_user_reputation_bg, user_id, 5)
         background_tasks.add_task(
             _log_complete_submission_audit,
@@ -419,12 +423,8 @@ async def submit_complete_report(
             req_ip, req_ua
         )
         
-        # Invalidate cache
-        try:
-            redis = await get_redis()
-            keys = await redis.keys("map_data:*")
-            if keys: await redis.delete(*keys)
-        except: pass
+        # Invalidate report-derived caches (map data, dashboard stats)
+        await invalidate_cache(REPORTS_TAG)
         
         # Send notification
         try:
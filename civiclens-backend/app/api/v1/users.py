@@ -374,6 +374,15 @@ async def get_my_stats(
     return UserStatsResponse(**stats)
 
 
+@router.get("/me/permissions")
+async def get_my_permissions(
+    current_user: User = Depends(get_current_user)
+):
+    """Get current user's permissions as a compact bitmask"""
+    from app.core.rbac import get_permission_payload
+    return get_permission_payload(current_user.role)
+
+
 @router.get("/officers", response_model=List[UserResponse])
 async def get_officers(
     department_id: Optional[int] = Query(None, description="Filter by department ID"),
@@ -574,57 +583,15 @@ async def get_all_officers_stats(
     if not current_user.can_access_admin_portal():
         raise ForbiddenException("Admin access required")
     
-    # Get officers query
-    query = select(User).where(
-        User.role.in_([UserRole.NODAL_OFFICER, UserRole.ADMIN]),
-        User.is_active == True
-    )
-    
-    if department_id:
-        query = query.where(User.department_id == department_id)
-    
-    result = await db.execute(query)
-    officers = result.scalars().all()
-    
-    # Get workload stats for each officer
-    from app.services.report_service import ReportService
-    report_service = ReportService(db)
+    # Precomputed workload rollups joined with users/departments in one query
+    from app.services.stats_rollup_service import StatsRollupService
+    stats = await StatsRollupService(db).get_officer_stats(department_id)
     
     officer_stats = []
-    for officer in officers:
-        workload = await report_service.workload_balancer.get_officer_workload(officer.id)
-        
-        # Get department name if available
-        dept_name = None
-        if officer.department_id:
-            dept_result = await db.execute(
-                select(Department.name).where(Department.id == officer.department_id)
-            )
-            dept_name = dept_result.scalar()
-        
-        # Safely extract workload data with defaults
-        active_reports = workload.get("active_reports", 0) or 0
-        resolved_reports = workload.get("resolved_reports", 0) or 0
-        avg_resolution_time = workload.get("avg_resolution_time_days") or 0.0
-        workload_score = workload.get("workload_score", 0.0) or 0.0
-        capacity_level = workload.get("capacity_level", "available") or "available"
-        
-        officer_stats.append(OfficerStatsResponse(
-            user_id=officer.id,
-            full_name=officer.full_name,
-            email=officer.email or f"officer{officer.id}@{settings.ORG_SHORT_NAME.lower()}.gov.in",  # Ensure email is not None
-            phone=officer.phone,
-            employee_id=officer.employee_id,
-            department_id=officer.department_id,
-            department_name=dept_name,
-            total_reports=active_reports + resolved_reports,
-            resolved_reports=resolved_reports,
-            in_progress_reports=active_reports,
-            active_reports=active_reports,
-            avg_resolution_time_days=float(avg_resolution_time),
-            workload_score=float(workload_score),
-            capacity_level=str(capacity_level)
-        ))
+    for row in stats:
+        # Ensure email is not None
+        row["email"] = row["email"] or f"officer{row['user_id']}@{settings.ORG_SHORT_NAME.lower()}.gov.in"
+        officer_stats.append(OfficerStatsResponse(**row))
     
     return officer_stats
 
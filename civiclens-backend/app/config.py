@@ -48,6 +48,15 @@ class Settings(BaseSettings):
     MINIO_SECRET_KEY: str = Field(..., description="MinIO secret key (required)")
     MINIO_BUCKET: str = "civiclens-media"
     MINIO_USE_SSL: bool = False
+    MINIO_REGION: str = "us-east-1"  # Fixed so signing never needs a bucket-location lookup
+    MINIO_STAT_CONCURRENCY: int = 16  # Concurrent stat requests in bulk lookups
+    SIGNED_URL_CACHE_MAX_ENTRIES: int = 10000  # Cached presigned URLs per process
+    STORAGE_BACKEND: str = "minio"  # "minio" (S3-compatible) or "local" (development)
+    STORAGE_MAX_CONNECTIONS: int = 32  # Pooled HTTP connections to object storage
+    STORAGE_TIMEOUT_SECONDS: float = 30.0  # Per-request timeout (connect capped at 5s)
+    STORAGE_MAX_RETRIES: int = 3  # Retries on connection errors and 5xx responses
+    LOCAL_STORAGE_PATH: str = "./media"  # Root directory for STORAGE_BACKEND=local
+    LOCAL_STORAGE_BASE_URL: str = "http://localhost:8000/media"  # Served by the app for STORAGE_BACKEND=local
     
     # OTP
     OTP_EXPIRY_MINUTES: int = 5
@@ -56,6 +65,10 @@ class Settings(BaseSettings):
     
     # Rate Limiting
     RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_ALGORITHM: str = "sliding_window"  # "sliding_window" (exact) or "gcra" (token bucket)
+    RATE_LIMIT_LOCAL_PREFILTER_ENABLED: bool = True  # Reject known-blocked keys in-process until retry time
+    RATE_LIMIT_LOCAL_PREFILTER_MAX_KEYS: int = 10000
+    RATE_LIMIT_FAIL_CLOSED_RETRY_SECONDS: int = 30  # Retry-after for auth throttles refused while Redis is down
     RATE_LIMIT_OTP_MAX_REQUESTS: int = 3  # Max OTP requests
     RATE_LIMIT_OTP_WINDOW_SECONDS: int = 3600  # 1 hour window
     RATE_LIMIT_LOGIN_MAX_REQUESTS: int = 5  # Max login attempts
@@ -67,6 +80,21 @@ class Settings(BaseSettings):
     RATE_LIMIT_PHONE_VERIFY_MAX_REQUESTS: int = 3  # Max phone verification requests
     RATE_LIMIT_PHONE_VERIFY_WINDOW_SECONDS: int = 3600  # 1 hour window
     
+    # Global Rate Limit Middleware (every request, before routing)
+    RATE_LIMIT_MIDDLEWARE_ENABLED: bool = True
+    RATE_LIMIT_DEFAULT_POLICY: str = "300/60"  # Per client (user or IP): <requests>/<seconds>
+    # Comma-separated "METHOD /path/glob=<requests>/<seconds>"; first match applies on top of the default
+    RATE_LIMIT_ROUTE_POLICIES: str = (
+        "POST /api/v1/auth/*=30/60,"
+        "POST /api/v1/reports*=30/300,"
+        "POST /api/v1/media/*=60/300,"
+        "POST /api/v1/sync/*=60/60,"
+        "* /api/v1/analytics/*=120/60"
+    )
+    # Limit multipliers by token role ("anonymous" = no valid token)
+    RATE_LIMIT_ROLE_MULTIPLIERS: str = "anonymous=0.5,nodal_officer=2,auditor=2,admin=4,super_admin=4"
+    RATE_LIMIT_EXEMPT_PATHS: str = "/health*,/docs*,/redoc*,/openapi.json"
+    
     # Account Security
     MAX_LOGIN_ATTEMPTS: int = 5  # Max failed login attempts before lockout
     ACCOUNT_LOCKOUT_DURATION_MINUTES: int = 30  # Lockout duration
@@ -80,6 +108,16 @@ class Settings(BaseSettings):
     # Session Management
     MAX_CONCURRENT_SESSIONS: int = 3  # Max active sessions per user
     SESSION_INACTIVITY_TIMEOUT_MINUTES: int = 60  # Auto-logout after inactivity
+    SESSION_STORE_ENABLED: bool = True  # Mirror active sessions in Redis (TTL = expiry)
+    SESSION_ACTIVITY_FLUSH_SECONDS: int = 30  # Coalesced last_activity write-back interval
+    SESSION_CLEANUP_BATCH_SIZE: int = 5000  # Rows per set-based cleanup statement
+    SESSION_RETENTION_DAYS: int = 30  # Inactive, expired session rows kept before purging
+
+    # Principal Cache (authenticated user + session validity per JTI)
+    PRINCIPAL_CACHE_ENABLED: bool = True
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 300  # Redis entry lifetime
+    PRINCIPAL_CACHE_LOCAL_TTL_SECONDS: float = 5.0  # In-process lifetime (bounds cross-worker staleness)
+    PRINCIPAL_CACHE_LOCAL_MAX_ENTRIES: int = 10000
     
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000"  # Comma-separated list
@@ -108,6 +146,17 @@ class Settings(BaseSettings):
             return [header.strip() for header in self.CORS_HEADERS.split(",") if header.strip()]
         return self.CORS_HEADERS
     
+    # Map Aggregation (clustered map / vector tiles)
+    MAP_CLUSTER_CELLS_PER_TILE: int = 8  # Grid cells per 256px tile side for JSON clusters
+    MAP_CLUSTER_MAX_RESULTS: int = 5000  # Hard cap on clusters per response
+    MAP_TILE_GRID_SIZE: int = 64  # Snap grid per vector tile side (max grid^2 features)
+    MAP_TILE_CACHE_SECONDS: int = 300  # Redis TTL for rendered tiles/clusters
+    
+    # Statistics Rollups (precomputed dashboard/department/officer stats)
+    STATS_ROLLUP_MIN_REFRESH_SECONDS: int = 10  # Min age before a dirty rollup is recomputed on read
+    STATS_ROLLUP_MAX_AGE_SECONDS: int = 300  # Rollups older than this are always recomputed
+    STATS_ROLLUP_WORKER_INTERVAL_SECONDS: int = 60  # Scheduled refresh interval
+    
     # Pagination
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
@@ -116,6 +165,13 @@ class Settings(BaseSettings):
     MAX_UPLOAD_SIZE: int = 10485760  # 10MB
     ALLOWED_IMAGE_TYPES: str = "image/jpeg,image/png,image/webp"  # Comma-separated
     ALLOWED_VIDEO_TYPES: str = "video/mp4,video/webm"  # Comma-separated
+    MEDIA_PROCESS_WORKERS: int = 2  # Media worker image processes and concurrent jobs (0 = one job, default thread pool)
+    MEDIA_UPLOAD_CONCURRENCY: int = 4  # Concurrent object storage uploads per process
+    MEDIA_MULTIPART_PART_SIZE: int = 8388608  # 8MB parts for streamed uploads (S3 minimum is 5MB)
+    DIRECT_UPLOAD_EXPIRE_SECONDS: int = 900  # Lifetime of presigned direct-upload policies
+    DIRECT_UPLOAD_PREFIX: str = "incoming"  # Object prefix for direct uploads awaiting finalize (expired after 1 day)
+    DIRECT_UPLOAD_CLAIM_SECONDS: int = 600  # A finalized upload not processed within this is claimable again
+    STORAGE_USAGE_RECONCILE_INTERVAL_SECONDS: int = 3600  # Rebuild storage usage counters from the media table
     
     @property
     def allowed_image_types_list(self) -> List[str]:
@@ -180,12 +236,25 @@ class Settings(BaseSettings):
     PASSWORD_REQUIRE_DIGIT: bool = True
     PASSWORD_REQUIRE_SPECIAL: bool = True
     
+    # Password Hashing (bcrypt runs in a bounded thread pool)
+    BCRYPT_ROUNDS: int = 12  # Hashes with a different cost are rehashed on login
+    PASSWORD_HASH_WORKERS: int = 4  # Concurrent bcrypt operations per process
+    PASSWORD_HASH_MAX_QUEUE: int = 32  # Waiting operations before shedding with 503
+    
     # Session Fingerprinting
     SESSION_FINGERPRINT_ENABLED: bool = True
     
     # Audit Logging
     AUDIT_LOG_ENABLED: bool = True
-    AUDIT_LOG_RETENTION_DAYS: int = 365  # 1 year retention
+    AUDIT_LOG_RETENTION_DAYS: int = 365  # 1 year retention (whole monthly partitions)
+    AUDIT_PARTITION_PREMAKE_MONTHS: int = 3  # Monthly partitions created ahead of time
+    AUDIT_PARTITION_RETENTION_ACTION: str = "detach"  # "detach" (move to archive schema) or "drop"
+    AUDIT_ARCHIVE_SCHEMA: str = "audit_archive"  # Schema receiving detached partitions
+    AUDIT_PARTITION_WORKER_INTERVAL_SECONDS: int = 21600  # Partition maintenance interval (6 hours)
+    AUDIT_BUFFER_MAX_EVENTS: int = 10000  # Buffered events before spilling to the spool file
+    AUDIT_FLUSH_BATCH_SIZE: int = 200  # Rows per batched INSERT (flush early when reached)
+    AUDIT_FLUSH_INTERVAL_MS: int = 500  # Max time an event waits in the buffer
+    AUDIT_SPOOL_PATH: str = "logs/audit_spool.jsonl"  # Local fallback when the database is down
     
     # HTTPS Enforcement
     HTTPS_ONLY: Optional[bool] = None  # Set True in production (Defaults to True in production)
@@ -194,6 +263,12 @@ class Settings(BaseSettings):
     # Security Headers
     SECURITY_HEADERS_ENABLED: bool = True
     
+    # Query Instrumentation (per-request SQL count / DB time)
+    QUERY_METRICS_ENABLED: bool = True
+    QUERY_METRICS_SAMPLE_RATE: float = 0.1  # Fraction of requests instrumented (1.0 = all)
+    QUERY_METRICS_SLOW_REQUEST_MS: int = 500  # Log requests whose total DB time exceeds this
+    QUERY_METRICS_MAX_STATEMENTS: int = 50  # Log requests running this many statements (N+1 smell)
+    
     @model_validator(mode='after')
     def enforce_secure_defaults(self):
         """Enforce secure defaults in production environment"""
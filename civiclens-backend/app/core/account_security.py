@@ -1,96 +1,133 @@
 """
 Account Security Service
 Handles account lockout, failed login attempts, and security monitoring
+
+Lockout uses the rate limiter's attempt guard: checking the lock, counting
+the attempt and setting the lock are one atomic Redis script, so concurrent
+wrong-password bursts cannot all slip past the lock check. ``begin_login``
+runs the guard together with the IP and phone rate limits in a single round
+trip; a successful login clears the guard.
 """
 
 from typing import Optional
-from datetime import datetime, timedelta
-from app.core.database import get_redis
+from fastapi import Request
 from app.config import settings
-from app.core.exceptions import UnauthorizedException
+from app.core.exceptions import UnauthorizedException, ValidationException
+from app.core.rate_limiter import rate_limiter, GuardResult
 
 
 class AccountSecurity:
     """Manage account security features"""
-    
+
+    @staticmethod
+    def _guard_key(phone: str) -> str:
+        return f"login:{phone}"
+
+    @staticmethod
+    def _locked_message(retry_after: float) -> str:
+        minutes = max(1, int((retry_after + 59) // 60))
+        return (
+            f"Account temporarily locked due to too many failed login attempts. "
+            f"Try again in {minutes} minutes."
+        )
+
+    async def begin_login(self, phone: str, request: Optional[Request] = None) -> GuardResult:
+        """
+        Gate a login attempt: IP and phone rate limits, lock check and attempt
+        counting in one Redis round trip.
+
+        The attempt is counted up front; call ``clear_failed_login`` when it
+        succeeds. ``remaining`` on the result is the number of further failed
+        attempts allowed before the account locks.
+
+        Raises:
+            ValidationException if a rate limit is exceeded
+            UnauthorizedException if the account is locked
+        """
+        checks = [(
+            f"login:{phone}",
+            settings.RATE_LIMIT_LOGIN_MAX_REQUESTS,
+            settings.RATE_LIMIT_LOGIN_WINDOW_SECONDS,
+        )]
+        labels = ["login attempts"]
+        if request is not None:
+            from app.core.enhanced_security import get_client_ip
+            checks.insert(0, (f"ip:{get_client_ip(request)}", 100, 3600))
+            labels.insert(0, "Login IP attempts")
+
+        lockout_seconds = settings.ACCOUNT_LOCKOUT_DURATION_MINUTES * 60
+        guard, limits = await rate_limiter.guard(
+            self._guard_key(phone),
+            max_attempts=settings.MAX_LOGIN_ATTEMPTS,
+            window_seconds=lockout_seconds,
+            lock_seconds=lockout_seconds,
+            checks=checks,
+            fail_closed=True,
+        )
+
+        for label, result in zip(labels, limits):
+            if not result.allowed:
+                retry_after = max(1, int(result.retry_after + 0.999))
+                raise ValidationException(
+                    f"Rate limit exceeded for {label}. "
+                    f"Try again in {retry_after} seconds."
+                )
+
+        if not guard.allowed:
+            raise UnauthorizedException(self._locked_message(guard.retry_after))
+
+        return guard
+
     async def record_failed_login(self, phone: str) -> int:
         """
-        Record a failed login attempt
-        
+        Record a failed login attempt (for flows not gated by ``begin_login``)
+
         Returns:
             Number of failed attempts in current window
         """
-        redis = await get_redis()
-        key = f"failed_login:{phone}"
-        
-        # Increment counter
-        attempts = await redis.incr(key)
-        
-        # Set expiry on first attempt
-        if attempts == 1:
-            await redis.expire(key, settings.ACCOUNT_LOCKOUT_DURATION_MINUTES * 60)
-        
-        # Check if account should be locked
-        if attempts >= settings.MAX_LOGIN_ATTEMPTS:
-            await self.lock_account(phone)
-        
-        return attempts
-    
+        lockout_seconds = settings.ACCOUNT_LOCKOUT_DURATION_MINUTES * 60
+        guard, _ = await rate_limiter.guard(
+            self._guard_key(phone),
+            max_attempts=settings.MAX_LOGIN_ATTEMPTS,
+            window_seconds=lockout_seconds,
+            lock_seconds=lockout_seconds,
+            fail_closed=True,
+        )
+        return guard.attempts
+
     async def clear_failed_login(self, phone: str):
         """Clear failed login attempts after successful login"""
-        redis = await get_redis()
-        await redis.delete(f"failed_login:{phone}")
-    
+        await rate_limiter.clear_guard(self._guard_key(phone))
+
     async def get_failed_login_count(self, phone: str) -> int:
         """Get current failed login attempt count"""
-        redis = await get_redis()
-        count = await redis.get(f"failed_login:{phone}")
-        return int(count) if count else 0
-    
-    async def lock_account(self, phone: str):
-        """Lock account after too many failed attempts"""
-        redis = await get_redis()
-        key = f"account_locked:{phone}"
-        
-        # Set lock with expiry
-        await redis.setex(
-            key,
-            settings.ACCOUNT_LOCKOUT_DURATION_MINUTES * 60,
-            "locked"
-        )
-    
+        status = await rate_limiter.guard_status(self._guard_key(phone))
+        return status.attempts
+
     async def is_account_locked(self, phone: str) -> bool:
         """Check if account is currently locked"""
-        redis = await get_redis()
-        locked = await redis.get(f"account_locked:{phone}")
-        return locked is not None
-    
+        status = await rate_limiter.guard_status(self._guard_key(phone))
+        return not status.allowed
+
     async def get_lockout_remaining_time(self, phone: str) -> Optional[int]:
         """Get remaining lockout time in seconds"""
-        redis = await get_redis()
-        ttl = await redis.ttl(f"account_locked:{phone}")
-        return ttl if ttl > 0 else None
-    
+        status = await rate_limiter.guard_status(self._guard_key(phone))
+        return int(status.retry_after) if not status.allowed else None
+
     async def unlock_account(self, phone: str):
         """Manually unlock account (admin action)"""
-        redis = await get_redis()
-        await redis.delete(f"account_locked:{phone}")
-        await redis.delete(f"failed_login:{phone}")
-    
+        await rate_limiter.clear_guard(self._guard_key(phone))
+
     async def check_account_status(self, phone: str):
         """
         Check account status and raise exception if locked
-        
+
         Raises:
             UnauthorizedException if account is locked
         """
-        if await self.is_account_locked(phone):
-            remaining = await self.get_lockout_remaining_time(phone)
-            minutes = remaining // 60 if remaining else 0
-            raise UnauthorizedException(
-                f"Account temporarily locked due to too many failed login attempts. "
-                f"Try again in {minutes} minutes."
-            )
+        status = await rate_limiter.guard_status(self._guard_key(phone))
+        if not status.allowed:
+            raise UnauthorizedException(self._locked_message(status.retry_after))
 
 
 # Global account security instance
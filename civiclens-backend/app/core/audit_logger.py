@@ -1,16 +1,19 @@
 """
 Audit Logger Service (Priority 2)
 Centralized service for logging security events
+
+Events are handed to the buffered audit sink (app.core.audit_sink) and written
+in batches; logging never commits the caller's session.
 """
 
 from typing import Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Request
-from app.models.audit_log import AuditLog, AuditAction, AuditStatus
+from app.models.audit_log import AuditAction, AuditStatus
 from app.models.user import User
 from app.config import settings
 from app.core.enhanced_security import get_client_ip, sanitize_user_agent
-from app.core.database import AsyncSessionLocal
+from app.core.audit_sink import audit_sink
 
 
 class AuditLogger:
@@ -35,7 +38,7 @@ class AuditLogger:
         Log an audit event
         
         Args:
-            db: Database session
+            db: Caller's database session (never committed; callers commit their own changes)
             action: Type of action being audited
             status: Success/failure/warning
             user: User object (if available)
@@ -75,22 +78,19 @@ class AuditLogger:
             if not user_agent:
                 user_agent = sanitize_user_agent(request.headers.get("user-agent", ""))
         
-        # Create audit log entry
-        audit_log = AuditLog(
-            user_id=user_id,
-            user_role=user_role,
-            action=action,
-            status=status,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            description=description,
-            extra_data=metadata,
-            resource_type=resource_type,
-            resource_id=resource_id
-        )
-        
-        db.add(audit_log)
-        await db.commit()
+        # Queue audit log entry
+        audit_sink.enqueue({
+            "user_id": user_id,
+            "user_role": user_role,
+            "action": action,
+            "status": status,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "description": description,
+            "extra_data": metadata,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+        })
     
     async def log_login_success(
         self,
@@ -234,19 +234,18 @@ class AuditLogger:
         login_method: str = "password"
     ):
         """Background task to log successful login without blocking response"""
-        async with AsyncSessionLocal() as db:
-            audit_log = AuditLog(
-                user_id=user_id,
-                user_role=user_role,
-                action=AuditAction.LOGIN_SUCCESS,
-                status=AuditStatus.SUCCESS,
-                ip_address=ip_address,
-                user_agent=user_agent,
-                description=f"User logged in via {login_method}",
-                extra_data={"login_method": login_method}
-            )
-            db.add(audit_log)
-            await db.commit()
+        if not settings.AUDIT_LOG_ENABLED:
+            return
+        audit_sink.enqueue({
+            "user_id": user_id,
+            "user_role": user_role,
+            "action": AuditAction.LOGIN_SUCCESS,
+            "status": AuditStatus.SUCCESS,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "description": f"User logged in via {login_method}",
+            "extra_data": {"login_method": login_method},
+        })
 
     async def log_login_failure_bg(
         self,
@@ -256,17 +255,16 @@ class AuditLogger:
         reason: str = "Invalid credentials"
     ):
         """Background task to log failed login attempt without blocking response"""
-        async with AsyncSessionLocal() as db:
-            audit_log = AuditLog(
-                action=AuditAction.LOGIN_FAILURE,
-                status=AuditStatus.FAILURE,
-                ip_address=ip_address,
-                user_agent=user_agent,
-                description=f"Failed login attempt for {phone}: {reason}",
-                extra_data={"phone": phone, "reason": reason}
-            )
-            db.add(audit_log)
-            await db.commit()
+        if not settings.AUDIT_LOG_ENABLED:
+            return
+        audit_sink.enqueue({
+            "action": AuditAction.LOGIN_FAILURE,
+            "status": AuditStatus.FAILURE,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "description": f"Failed login attempt for {phone}: {reason}",
+            "extra_data": {"phone": phone, "reason": reason},
+        })
 
 
 # Global audit logger instance
@@ -0,0 +1,280 @@
+"""
+Audit Sink
+Buffered, batched writer for audit log rows
+
+Audit events are appended to an in-process buffer and written by a single
+background flusher with one multi-row INSERT every AUDIT_FLUSH_INTERVAL_MS or
+as soon as AUDIT_FLUSH_BATCH_SIZE events are waiting. Callers never commit
+(or wait on) the database to record an event.
+
+- If the database is unavailable, the batch is appended to a local JSON-lines
+  spool file (AUDIT_SPOOL_PATH) and replayed after the next successful flush.
+  Replay is at-least-once: rows from a replay interrupted by a crash are
+  picked up again by the next one.
+- If the buffer is full (AUDIT_BUFFER_MAX_EVENTS), new events go straight to
+  the spool file instead of being dropped.
+- ``stop()`` drains the buffer on shutdown.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.audit_log import AuditLog, AuditAction, AuditStatus
+
+logger = logging.getLogger(__name__)
+
+# Every buffered row carries exactly these keys so a batch is one executemany
+AUDIT_COLUMNS = (
+    "user_id", "user_role", "action", "status", "timestamp", "ip_address",
+    "user_agent", "description", "extra_data", "resource_type", "resource_id",
+)
+
+
+def _to_spool_record(row: Dict[str, Any]) -> str:
+    record = {}
+    for key, value in row.items():
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, (AuditAction, AuditStatus)):
+            value = value.value
+        record[key] = value
+    return json.dumps(record, default=str)
+
+
+def _from_spool_record(line: str) -> Dict[str, Any]:
+    data = json.loads(line)
+    row = {column: data.get(column) for column in AUDIT_COLUMNS}
+    row["action"] = AuditAction(row["action"])
+    row["status"] = AuditStatus(row.get("status") or AuditStatus.SUCCESS.value)
+    if row.get("timestamp"):
+        row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return row
+
+
+class AuditSink:
+    """In-process audit buffer flushed in batches by a background task"""
+
+    def __init__(self):
+        self._buffer: deque = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._stopping = False
+        # Spool file writes come from the event loop and worker threads
+        self._spool_lock = threading.Lock()
+        self.written = 0
+        self.spooled = 0
+        self.failed_flushes = 0
+
+    # ------------------------------------------------------------------ enqueue
+
+    def enqueue(self, row: Dict[str, Any]):
+        """
+        Record an audit row (column -> value). Never blocks on the database.
+        """
+        row = {column: row.get(column) for column in AUDIT_COLUMNS}
+        row["timestamp"] = row["timestamp"] or datetime.utcnow()
+        row["status"] = row["status"] or AuditStatus.SUCCESS
+
+        if len(self._buffer) >= settings.AUDIT_BUFFER_MAX_EVENTS:
+            self._spool([row])
+            return
+
+        self._buffer.append(row)
+        self._ensure_started()
+        if self._wakeup is not None and len(self._buffer) >= settings.AUDIT_FLUSH_BATCH_SIZE:
+            self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    # ---------------------------------------------------------------- lifecycle
+
+    def _ensure_started(self):
+        if self._task is not None or self._stopping:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = loop.create_task(self._run())
+
+    def start(self):
+        """Start the background flusher (idempotent)"""
+        self._stopping = False
+        self._ensure_started()
+
+    async def stop(self):
+        """Stop the flusher and drain everything still buffered"""
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        while self._buffer:
+            if not await self.flush():
+                # Database unavailable: keep the remainder on disk
+                rows = list(self._buffer)
+                self._buffer.clear()
+                await asyncio.to_thread(self._spool, rows)
+
+    async def _run(self):
+        interval = settings.AUDIT_FLUSH_INTERVAL_MS / 1000
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                while self._buffer:
+                    if not await self.flush():
+                        break
+                    if len(self._buffer) < settings.AUDIT_FLUSH_BATCH_SIZE:
+                        break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Audit flush loop error: {str(e)}", exc_info=True)
+
+    # -------------------------------------------------------------------- flush
+
+    async def flush(self) -> bool:
+        """
+        Write up to AUDIT_FLUSH_BATCH_SIZE buffered rows in one INSERT.
+
+        Returns False if the database write failed (rows were spooled).
+        """
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            batch: List[Dict[str, Any]] = []
+            while self._buffer and len(batch) < settings.AUDIT_FLUSH_BATCH_SIZE:
+                batch.append(self._buffer.popleft())
+            if not batch:
+                return True
+
+            if not await self._insert(batch):
+                self.failed_flushes += 1
+                await asyncio.to_thread(self._spool, batch)
+                return False
+
+            self.written += len(batch)
+            await self._replay_spool()
+            return True
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> bool:
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(AuditLog.__table__), rows)
+                await db.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"Audit batch insert of {len(rows)} rows failed: {str(e)}")
+            return False
+
+    # -------------------------------------------------------------------- spool
+
+    def _spool(self, rows: List[Dict[str, Any]]):
+        """Append rows to the spool file (blocking; off the event loop where possible)"""
+        path = settings.AUDIT_SPOOL_PATH
+        try:
+            with self._spool_lock:
+                directory = os.path.dirname(path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(path, "a", encoding="utf-8") as f:
+                    for row in rows:
+                        f.write(_to_spool_record(row) + "\n")
+            self.spooled += len(rows)
+        except Exception as e:
+            logger.error(f"Failed to spool {len(rows)} audit rows to {path}: {str(e)}")
+
+    def _claim_spool(self, path: str, replay_path: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Move spooled rows into the replay file and read them (blocking).
+        A replay file left by an interrupted replay is kept and extended,
+        never overwritten. Returns None if there is nothing to replay.
+        """
+        with self._spool_lock:
+            if os.path.exists(path):
+                if os.path.exists(replay_path):
+                    with open(path, "r", encoding="utf-8") as src, open(replay_path, "a", encoding="utf-8") as dst:
+                        for line in src:
+                            dst.write(line if line.endswith("\n") else line + "\n")
+                    os.remove(path)
+                else:
+                    os.replace(path, replay_path)
+            elif not os.path.exists(replay_path):
+                return None
+
+            rows = []
+            with open(replay_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        rows.append(_from_spool_record(line))
+                    except ValueError:
+                        # Partial line from a crash mid-write
+                        logger.warning(f"Skipping unreadable audit spool line: {line[:200]!r}")
+            return rows
+
+    async def _replay_spool(self):
+        """Re-insert spooled rows once the database is reachable again"""
+        path = settings.AUDIT_SPOOL_PATH
+        replay_path = f"{path}.replay"
+        if not os.path.exists(path) and not os.path.exists(replay_path):
+            return
+        try:
+            rows = await asyncio.to_thread(self._claim_spool, path, replay_path)
+        except Exception as e:
+            logger.error(f"Failed to read audit spool {path}: {str(e)}")
+            return
+        if rows is None:
+            return
+
+        batch_size = settings.AUDIT_FLUSH_BATCH_SIZE
+        for start in range(0, len(rows), batch_size):
+            if not await self._insert(rows[start:start + batch_size]):
+                await asyncio.to_thread(self._spool, rows[start:])
+                break
+            self.written += len(rows[start:start + batch_size])
+        else:
+            logger.info(f"Replayed {len(rows)} spooled audit rows")
+
+        try:
+            await asyncio.to_thread(os.remove, replay_path)
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self.pending,
+            "written": self.written,
+            "spooled": self.spooled,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+# Global audit sink instance
+audit_sink = AuditSink()
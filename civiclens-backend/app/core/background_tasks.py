@@ -4,7 +4,7 @@ These functions are designed to be used with FastAPI's BackgroundTasks.
 """
 
 import logging
-from typing import Optional
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import AsyncSessionLocal, get_redis
 from app.crud.user import user_crud
@@ -52,6 +52,22 @@ async def queue_report_for_processing_bg(report_id: int):
         )
 
 
+async def queue_media_for_processing_bg(media_ids: List[int]):
+    """
+    Background task to queue uploaded images for optimisation by the media worker.
+    Until processed, the stored original is served.
+    """
+    if not media_ids:
+        return
+    try:
+        from app.services.media_processing_service import enqueue_media_processing
+        await enqueue_media_processing(media_ids)
+        logger.info(f"Background: Media {media_ids} queued for processing")
+    except Exception as e:
+        # Non-critical failure - the original image is stored and served
+        logger.warning(f"Background: Failed to queue media {media_ids} for processing: {str(e)}")
+
+
 async def send_email_notification_bg(
     to_email: str,
     subject: str,
@@ -83,27 +99,23 @@ async def log_audit_event_bg(
 ):
     """
     Background task for audit logging.
-    Creates its own DB session to avoid session conflicts.
+    Queues the event on the buffered audit sink (batched INSERTs).
     """
     try:
-        async with AsyncSessionLocal() as db:
-            from app.models.audit_log import AuditLog
-            
-            audit_log = AuditLog(
-                action=action,
-                status=status,
-                user_id=user_id,
-                description=description,
-                metadata=metadata or {},
-                resource_type=resource_type,
-                resource_id=resource_id,
-                ip_address=ip_address,
-                user_agent=user_agent
-            )
-            
-            db.add(audit_log)
-            await db.commit()
-            logger.info(f"Background: Audit log created - {action.value}")
+        from app.core.audit_sink import audit_sink
+        
+        audit_sink.enqueue({
+            "action": action,
+            "status": status,
+            "user_id": user_id,
+            "description": description,
+            "extra_data": metadata or {},
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+        })
+        logger.info(f"Background: Audit log queued - {action.value}")
     except Exception as e:
         logger.error(f"Background: Failed to create audit log: {str(e)}")
 
@@ -0,0 +1,222 @@
+"""
+Response Cache Service
+Shared Redis response cache with tag-based (generation) invalidation
+
+Cache keys embed the current generation of every tag they depend on, e.g.
+``cache:map_data:reports=42:<hash>``. Writers call ``invalidate("reports")``
+which is a single INCR - old entries simply stop being addressed and age out
+via their TTL. This replaces pattern deletes (``KEYS map_data:*``), which are
+O(keyspace) and block Redis for every client.
+
+Cache misses are computed under a short single-flight lock so that a burst of
+requests after an invalidation only hits the database once.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from app.core.database import get_redis
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY_PREFIX = "cache:gen"
+LOCK_KEY_PREFIX = "cache:lock"
+
+# Release the single-flight lock only if we still own it
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class CacheStats:
+    """In-process hit/miss counters for a single named cache"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.lock_waits = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return round(self.hits / total, 4) if total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "lock_waits": self.lock_waits,
+            "hit_rate": self.hit_rate,
+        }
+
+
+class ResponseCache:
+    """A named cache whose entries depend on one or more invalidation tags"""
+
+    def __init__(
+        self,
+        name: str,
+        ttl_seconds: int,
+        tags: Iterable[str] = (),
+        lock_timeout_seconds: float = 10.0,
+        lock_poll_interval: float = 0.05,
+    ):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.tags = tuple(tags)
+        self.lock_timeout_seconds = lock_timeout_seconds
+        self.lock_poll_interval = lock_poll_interval
+        self.stats = CacheStats()
+
+    async def build_key(self, params: Optional[Dict[str, Any]] = None) -> str:
+        """Build a cache key from the current tag generations and request params"""
+        generations = await get_generations(self.tags)
+        gen_part = ",".join(f"{tag}={generations[tag]}" for tag in self.tags) or "-"
+        params_str = json.dumps(params or {}, sort_keys=True, default=str)
+        digest = hashlib.md5(params_str.encode()).hexdigest()
+        return f"cache:{self.name}:{gen_part}:{digest}"
+
+    async def get_or_set(
+        self,
+        params: Optional[Dict[str, Any]],
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Return the cached value for ``params`` or compute, store and return it.
+
+        ``compute`` must return a JSON-serializable value. If Redis is
+        unavailable the value is computed directly (the cache never fails a
+        request).
+        """
+        value, _ = await self.fetch(params, compute)
+        return value
+
+    async def fetch(
+        self,
+        params: Optional[Dict[str, Any]],
+        compute: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """Like ``get_or_set`` but also returns whether the value was a cache hit"""
+        try:
+            redis = await get_redis()
+            key = await self.build_key(params)
+            cached = await redis.get(key)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Cache '{self.name}' read failed: {e}. Falling back to source.")
+            return await compute(), False
+
+        if cached is not None:
+            self.stats.hits += 1
+            return json.loads(cached), True
+
+        self.stats.misses += 1
+
+        # Single-flight: only the lock holder recomputes, others wait for its result
+        lock_key = f"{LOCK_KEY_PREFIX}:{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await redis.set(
+                lock_key, token, nx=True, px=int(self.lock_timeout_seconds * 1000)
+            )
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Cache '{self.name}' lock failed: {e}")
+            return await compute(), False
+
+        if not acquired:
+            self.stats.lock_waits += 1
+            value = await self._wait_for_value(redis, key)
+            if value is not None:
+                return value, True
+            # Lock holder died or took too long - compute ourselves
+            return await compute(), False
+
+        try:
+            value = await compute()
+            try:
+                await redis.setex(key, self.ttl_seconds, json.dumps(value, default=str))
+            except Exception as e:
+                self.stats.errors += 1
+                logger.warning(f"Cache '{self.name}' write failed: {e}. Continuing without cache.")
+            return value, False
+        finally:
+            try:
+                await redis.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+            except Exception:
+                pass
+
+    async def _wait_for_value(self, redis, key: str) -> Optional[Any]:
+        """Poll for a value being computed by another worker"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_timeout_seconds
+        while loop.time() < deadline:
+            await asyncio.sleep(self.lock_poll_interval)
+            try:
+                cached = await redis.get(key)
+            except Exception:
+                return None
+            if cached is not None:
+                return json.loads(cached)
+        return None
+
+
+async def get_generations(tags: Iterable[str]) -> Dict[str, int]:
+    """Fetch current generations for tags in one round trip"""
+    tags = list(tags)
+    if not tags:
+        return {}
+    redis = await get_redis()
+    values = await redis.mget([f"{GENERATION_KEY_PREFIX}:{tag}" for tag in tags])
+    return {tag: int(value) if value else 0 for tag, value in zip(tags, values)}
+
+
+async def invalidate(*tags: str) -> None:
+    """
+    Invalidate every cache entry depending on the given tags.
+
+    Never raises - a failed invalidation only means entries live until TTL.
+    """
+    try:
+        redis = await get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(f"{GENERATION_KEY_PREFIX}:{tag}")
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to invalidate cache tags {tags}: {e}")
+
+
+# Registry of named caches (used for metrics reporting)
+_caches: Dict[str, ResponseCache] = {}
+
+
+def get_cache(
+    name: str,
+    ttl_seconds: int,
+    tags: Iterable[str] = (),
+) -> ResponseCache:
+    """Get or create a named response cache"""
+    cache = _caches.get(name)
+    if cache is None:
+        cache = ResponseCache(name, ttl_seconds, tags)
+        _caches[name] = cache
+    return cache
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-cache hit-rate metrics for this process"""
+    return {name: cache.stats.to_dict() for name, cache in _caches.items()}
+
+
+# Invalidation tags
+REPORTS_TAG = "reports"
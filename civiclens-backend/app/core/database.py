@@ -83,7 +83,7 @@ async def init_db():
             user, department, report, task, media, 
             area_assignment, role_history, appeal, escalation,
             report_status_history, session, sync, audit_log,
-            notification, feedback
+            notification, feedback, stats_rollup
         )
         
         # Create all tables
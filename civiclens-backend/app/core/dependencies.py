@@ -10,12 +10,15 @@ from app.models.session import Session
 from app.core.exceptions import UnauthorizedException, ForbiddenException
 from app.core.enhanced_security import validate_session_fingerprint, is_ip_whitelisted, get_client_ip
 from app.core.audit_logger import audit_logger
+from app.core.principal_cache import principal_cache, build_user, serialize_user
+from app.core.session_manager import session_manager
 from app.config import settings
 from app.core.rbac import (
     Permission,
     has_permission,
-    has_any_permission,
-    has_all_permissions,
+    has_any_permission_mask,
+    has_all_permissions_mask,
+    permission_mask,
     get_role_level,
     is_higher_role,
     can_manage_role,
@@ -47,9 +50,19 @@ async def get_current_user(
     if user_id is None:
         raise UnauthorizedException("Invalid token payload")
     
-    # Fetch user from database
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    check_session = settings.SESSION_FINGERPRINT_ENABLED and jti and request
+    
+    # Cached principal: no DB round trips on a hit
+    principal = await principal_cache.lookup(user_id, jti if check_session else None)
+    
+    if principal.user is not None:
+        user = await db.merge(build_user(principal.user), load=False)
+    else:
+        # Fetch user from database
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+        if user and user.is_active:
+            await principal_cache.store_user(user_id, principal.version, serialize_user(user))
     
     if not user:
         raise UnauthorizedException("User not found")
@@ -58,16 +71,20 @@ async def get_current_user(
         raise UnauthorizedException("Inactive user")
     
     # Validate session fingerprint if enabled
-    if settings.SESSION_FINGERPRINT_ENABLED and jti and request:
-        session_result = await db.execute(
-            select(Session).where(
-                Session.jti == jti,
-                Session.is_active == 1
-            )
-        )
-        session = session_result.scalar_one_or_none()
+    if check_session:
+        session = principal.session
+        
+        if session is None:
+            # One Redis lookup with the revocation check (database fallback on a miss)
+            session_data, revoked = await session_manager.get_session_state(db, jti)
+            if revoked:
+                raise UnauthorizedException("Session has been revoked")
+            
+            if session_data and session_data["user_id"] == user_id:
+                session = {"id": session_data["id"], "fingerprint": session_data["fingerprint"]}
+                await principal_cache.store_session(jti, user_id, principal.version, session)
         
-        if not session:
+        if session is None:
             # Session not found with this JTI - might be race condition after refresh
             # Check if there's an active session for this user (fallback for race conditions)
             print(f"⚠️  Session not found for JTI: {jti[:10]}...")
@@ -82,16 +99,16 @@ async def get_current_user(
             
             if len(all_sessions) > 0:
                 # User has active sessions - this might be a race condition after token refresh
-                # Allow the request but log warning
+                # Allow the request but log warning (not cached)
                 print(f"   ⚠️  Allowing request - user has {len(all_sessions)} active session(s), likely race condition")
-                session = all_sessions[0]  # Use the first active session
+                session = {"id": all_sessions[0].id, "fingerprint": all_sessions[0].fingerprint}  # Use the first active session
             else:
                 # No active sessions at all - token is truly invalid
                 print(f"   ❌ No active sessions found - token is invalid")
                 raise UnauthorizedException("Session not found or expired")
         
-        if session.fingerprint:
-            if not validate_session_fingerprint(request, session.fingerprint):
+        if session["fingerprint"]:
+            if not validate_session_fingerprint(request, session["fingerprint"]):
                 # For mobile apps, be more lenient - only log warning, don't block
                 user_agent = request.headers.get("user-agent", "").lower()
                 is_mobile = any(x in user_agent for x in ["android", "ios", "mobile", "expo"])
@@ -106,9 +123,11 @@ async def get_current_user(
                         description="Session fingerprint mismatch - possible session hijacking",
                         user=user,
                         request=request,
-                        metadata={"session_id": session.id, "jti": jti}
+                        metadata={"session_id": session["id"], "jti": jti}
                     )
                     raise UnauthorizedException("Session validation failed")
+        
+        await session_manager.update_session_activity(db, jti)
     
     # Enforce IP whitelist for admin/super_admin if enabled
     if request:
@@ -145,9 +164,16 @@ async def get_current_user_optional(
     if user_id is None:
         return None
     
-    # Fetch user from database
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    principal = await principal_cache.lookup(user_id)
+    
+    if principal.user is not None:
+        user = await db.merge(build_user(principal.user), load=False)
+    else:
+        # Fetch user from database
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+        if user and user.is_active:
+            await principal_cache.store_user(user_id, principal.version, serialize_user(user))
     
     if not user:
         return None
@@ -203,8 +229,10 @@ def require_permission(permission: Permission):
 
 def require_any_permission(permissions: List[Permission]):
     """Dependency to require any of the specified permissions"""
+    required_mask = permission_mask(permissions)
+    
     async def permission_checker(current_user: User = Depends(get_current_user)) -> User:
-        if not has_any_permission(current_user.role, permissions):
+        if not has_any_permission_mask(current_user.role, required_mask):
             perm_names = ', '.join([p.value for p in permissions])
             raise ForbiddenException(
                 f"You need at least one of these permissions: {perm_names}"
@@ -215,8 +243,10 @@ def require_any_permission(permissions: List[Permission]):
 
 def require_all_permissions(permissions: List[Permission]):
     """Dependency to require all of the specified permissions"""
+    required_mask = permission_mask(permissions)
+    
     async def permission_checker(current_user: User = Depends(get_current_user)) -> User:
-        if not has_all_permissions(current_user.role, permissions):
+        if not has_all_permissions_mask(current_user.role, required_mask):
             perm_names = ', '.join([p.value for p in permissions])
             raise ForbiddenException(
                 f"You need all of these permissions: {perm_names}"
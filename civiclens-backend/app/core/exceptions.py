@@ -35,3 +35,9 @@ class ConflictException(CivicLensException):
     """Raised when resource already exists"""
     def __init__(self, detail: str = "Resource already exists"):
         super().__init__(detail=detail, status_code=status.HTTP_409_CONFLICT)
+
+
+class ServiceUnavailableException(CivicLensException):
+    """Raised when the service is temporarily overloaded"""
+    def __init__(self, detail: str = "Service temporarily unavailable"):
+        super().__init__(detail=detail, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -1,7 +1,16 @@
+import fnmatch
+import logging
+import math
+from typing import Dict, List, Tuple
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.responses import JSONResponse, Response
 from app.config import settings
+from app.core.enhanced_security import get_client_ip
+from app.core.rate_limiter import rate_limiter
+from app.core.security import decode_access_token
+
+logger = logging.getLogger(__name__)
 
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     """
@@ -22,3 +31,138 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
             response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
 
         return response
+
+
+# ============================================================================
+# GLOBAL RATE LIMITING
+# ============================================================================
+
+class RateLimitPolicy:
+    """``limit`` requests per ``window_seconds`` for requests matching ``method`` + ``path_pattern``"""
+
+    __slots__ = ("name", "method", "path_pattern", "limit", "window_seconds")
+
+    def __init__(self, name: str, method: str, path_pattern: str, limit: int, window_seconds: int):
+        self.name = name
+        self.method = method
+        self.path_pattern = path_pattern
+        self.limit = limit
+        self.window_seconds = window_seconds
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method == "*" or self.method == method) and fnmatch.fnmatchcase(path, self.path_pattern)
+
+
+def _parse_limit(spec: str) -> Tuple[int, int]:
+    """Parse "<requests>/<seconds>" """
+    limit, window = spec.strip().split("/", 1)
+    return int(limit), int(window)
+
+
+def parse_route_policies(spec: str) -> List[RateLimitPolicy]:
+    """Parse RATE_LIMIT_ROUTE_POLICIES: "METHOD /path/glob*=<requests>/<seconds>,..." """
+    policies = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            route, limit_spec = entry.rsplit("=", 1)
+            method, path_pattern = route.strip().split(None, 1)
+            limit, window = _parse_limit(limit_spec)
+        except ValueError:
+            logger.warning(f"Ignoring malformed rate limit policy: {entry!r}")
+            continue
+        policies.append(RateLimitPolicy(f"{method.upper()} {path_pattern}", method.upper(), path_pattern, limit, window))
+    return policies
+
+
+def parse_role_multipliers(spec: str) -> Dict[str, float]:
+    """Parse RATE_LIMIT_ROLE_MULTIPLIERS: "role=multiplier,..." """
+    multipliers = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            role, value = entry.split("=", 1)
+            multipliers[role.strip()] = float(value)
+        except ValueError:
+            logger.warning(f"Ignoring malformed rate limit role multiplier: {entry!r}")
+    return multipliers
+
+
+class RateLimitMiddleware(BaseHTTPMiddleware):
+    """
+    Applies declarative rate limits to every request before routing.
+
+    Each request is counted against the default per-client policy and the
+    first matching route policy (RATE_LIMIT_ROUTE_POLICIES), in one pipelined
+    Redis round trip. Clients are identified by the user id in a valid access
+    token (no DB lookup) or by IP; limits are scaled by the token's role
+    (RATE_LIMIT_ROLE_MULTIPLIERS). Rejections happen before any dependency
+    runs, so abusive clients never take a DB connection.
+
+    Responses carry ``RateLimit-Limit`` / ``RateLimit-Remaining`` /
+    ``RateLimit-Reset`` / ``RateLimit-Policy`` for the most restrictive
+    policy, plus ``Retry-After`` on 429.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        default_limit, default_window = _parse_limit(settings.RATE_LIMIT_DEFAULT_POLICY)
+        self.default_policy = RateLimitPolicy("default", "*", "*", default_limit, default_window)
+        self.route_policies = parse_route_policies(settings.RATE_LIMIT_ROUTE_POLICIES)
+        self.role_multipliers = parse_role_multipliers(settings.RATE_LIMIT_ROLE_MULTIPLIERS)
+        self.exempt_patterns = [p.strip() for p in settings.RATE_LIMIT_EXEMPT_PATHS.split(",") if p.strip()]
+
+    def _identify(self, request: Request) -> Tuple[str, str]:
+        """(client key, role) from the bearer token, falling back to the client IP"""
+        auth_header = request.headers.get("authorization", "")
+        if auth_header.lower().startswith("bearer "):
+            payload = decode_access_token(auth_header[7:].strip())
+            if payload and payload.get("user_id") is not None:
+                return f"user:{payload['user_id']}", payload.get("role") or "citizen"
+        return f"ip:{get_client_ip(request)}", "anonymous"
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        path = request.url.path
+        if request.method == "OPTIONS" or any(fnmatch.fnmatchcase(path, p) for p in self.exempt_patterns):
+            return await call_next(request)
+
+        client, role = self._identify(request)
+        multiplier = self.role_multipliers.get(role, 1.0)
+
+        policies = [self.default_policy]
+        route_policy = next((p for p in self.route_policies if p.matches(request.method, path)), None)
+        if route_policy:
+            policies.append(route_policy)
+
+        checks = [
+            (
+                f"mw:{policy.name}:{client}",
+                max(1, int(policy.limit * multiplier)),
+                policy.window_seconds,
+            )
+            for policy in policies
+        ]
+        results = await rate_limiter.hit_many(checks)
+
+        denied = [(policy, result) for policy, result in zip(policies, results) if not result.allowed]
+        if denied:
+            policy, result = max(denied, key=lambda item: item[1].retry_after)
+            retry_after = max(1, math.ceil(result.retry_after))
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": f"Rate limit exceeded. Try again in {retry_after} seconds."},
+            )
+            self._set_headers(response, policy, result)
+            response.headers["Retry-After"] = str(retry_after)
+            return response
+
+        response = await call_next(request)
+
+        policy, result = min(zip(policies, results), key=lambda item: item[1].remaining)
+        self._set_headers(response, policy, result)
+        return response
+
+    @staticmethod
+    def _set_headers(response: Response, policy: RateLimitPolicy, result):
+        response.headers["RateLimit-Limit"] = str(result.limit)
+        response.headers["RateLimit-Remaining"] = str(result.remaining)
+        response.headers["RateLimit-Reset"] = str(max(0, math.ceil(result.reset_after)))
+        response.headers["RateLimit-Policy"] = f"{result.limit};w={policy.window_seconds}"
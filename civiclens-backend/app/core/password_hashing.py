@@ -0,0 +1,117 @@
+"""
+Password Hashing Service
+Runs bcrypt off the event loop in a bounded thread pool
+
+A bcrypt check costs ~250 ms of CPU at cost 12; calling it directly from an
+async handler stalls every request on the worker for that long. bcrypt
+releases the GIL, so a small dedicated thread pool gives real parallelism.
+
+- PASSWORD_HASH_WORKERS caps concurrent hashes (CPU bound, keep <= cores).
+- PASSWORD_HASH_MAX_QUEUE caps waiting jobs; beyond it requests are shed with
+  503 instead of queueing unboundedly during credential-stuffing bursts.
+- Hashes made with a cost other than BCRYPT_ROUNDS are transparently rehashed
+  on successful verification (``verify_and_update``).
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from app.config import settings
+from app.core.exceptions import ServiceUnavailableException
+from app.core.security import get_password_hash, verify_password
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordHashingOverloaded(ServiceUnavailableException):
+    """Raised when the hashing queue is full"""
+    def __init__(self):
+        super().__init__("Too many authentication requests, please retry shortly")
+
+
+class PasswordHasher:
+    """Async bcrypt hashing/verification with a concurrency cap and load shedding"""
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self.shed_count = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="password-hash",
+            )
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs waiting for a free worker"""
+        return max(0, self._pending - self.workers)
+
+    async def _run(self, func, *args):
+        if self._pending >= self.workers + self.max_queue:
+            self.shed_count += 1
+            logger.warning(
+                f"Password hashing overloaded ({self._pending} pending), shedding request"
+            )
+            raise PasswordHashingOverloaded()
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured bcrypt cost"""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Verify a password against a bcrypt hash"""
+        return await self._run(verify_password, password, hashed_password)
+
+    @staticmethod
+    def needs_rehash(hashed_password: str) -> bool:
+        """True if the hash was made with a different bcrypt cost than BCRYPT_ROUNDS"""
+        # Format: $2b$<cost>$<salt+hash>
+        parts = hashed_password.split("$")
+        if len(parts) < 4 or not parts[2].isdigit():
+            return True
+        return int(parts[2]) != settings.BCRYPT_ROUNDS
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and, if the hash uses outdated parameters, return a new hash.
+
+        Returns (verified, new_hash); new_hash is None when no rehash is needed.
+        Rehashing is best effort and skipped when the pool is saturated.
+        """
+        if not await self.verify(password, hashed_password):
+            return False, None
+
+        if not self.needs_rehash(hashed_password):
+            return True, None
+
+        try:
+            return True, await self.hash(password)
+        except PasswordHashingOverloaded:
+            return True, None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
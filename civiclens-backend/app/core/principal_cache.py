@@ -0,0 +1,331 @@
+"""
+Principal Cache
+Caches the authenticated principal (user row + session validity per JTI)
+
+``get_current_user`` used to run ``select(User)`` and ``select(Session)`` on
+every authenticated request. Both lookups are now served from a two-level
+cache:
+
+- an in-process TTL LRU (PRINCIPAL_CACHE_LOCAL_TTL_SECONDS, a few seconds) so
+  hot principals cost no I/O at all, and
+- Redis (PRINCIPAL_CACHE_TTL_SECONDS), shared by all workers.
+
+Every entry is stamped with the user's principal version
+(``principal:ver:{user_id}``). Invalidation bumps the version after the
+database commit, so entries written by a request that read the database
+before the change are dead on arrival. Other workers' local entries expire
+within the local TTL.
+
+Invalidation happens explicitly (logout, session_manager.invalidate_*, role
+change, deactivation) and, as a safety net, after any commit that changed a
+User or Session row.
+
+Password hashes, TOTP secrets and Aadhaar hashes are never cached; handlers
+that need them load them with ``db.refresh(user, [...])``.
+"""
+
+import asyncio
+import enum
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import DateTime, Enum as SQLEnum, event
+from sqlalchemy.orm import Session as ORMSession, make_transient_to_detached
+
+from app.config import settings
+from app.core.database import get_redis
+from app.models.session import Session
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "principal"
+
+# Columns that must never leave the database
+EXCLUDED_USER_COLUMNS = frozenset({"hashed_password", "totp_secret", "aadhaar_hash"})
+
+# Session.info key holding user ids to invalidate after commit
+_DIRTY_USERS_INFO_KEY = "principal_cache_dirty_users"
+
+
+class _LocalTTLCache:
+    """Small in-process LRU whose entries also expire after a fixed TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Any) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Any, value: Any):
+        self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Any):
+        self._data.pop(key, None)
+
+    def pop_where(self, predicate):
+        for key in [k for k, (_, v) in self._data.items() if predicate(v)]:
+            self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+
+class PrincipalLookup:
+    """Result of a cache lookup; ``version`` must be passed back when storing"""
+
+    __slots__ = ("version", "user", "session")
+
+    def __init__(self, version: int, user: Optional[Dict[str, Any]], session: Optional[Dict[str, Any]]):
+        self.version = version
+        self.user = user
+        self.session = session
+
+
+def serialize_user(user: User) -> Dict[str, Any]:
+    """Column values of a loaded User as JSON-safe data (sensitive columns excluded)"""
+    data = {}
+    for column in User.__table__.columns:
+        if column.key in EXCLUDED_USER_COLUMNS:
+            continue
+        value = getattr(user, column.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif isinstance(value, enum.Enum):
+            value = value.value
+        data[column.key] = value
+    return data
+
+
+def build_user(data: Dict[str, Any]) -> User:
+    """
+    Rebuild a detached, clean User from cached column values.
+
+    Merge it into the request's session with ``db.merge(user, load=False)``;
+    changes made by handlers are then flushed as normal UPDATEs.
+    """
+    values = {}
+    for column in User.__table__.columns:
+        if column.key not in data:
+            continue
+        value = data[column.key]
+        if value is not None:
+            if isinstance(column.type, DateTime):
+                value = datetime.fromisoformat(value)
+            elif isinstance(column.type, SQLEnum) and column.type.enum_class is not None:
+                value = column.type.enum_class(value)
+        values[column.key] = value
+
+    user = User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+class PrincipalCache:
+    """Two-level (in-process + Redis) cache of authenticated principals"""
+
+    def __init__(self):
+        self._local_users = _LocalTTLCache(
+            settings.PRINCIPAL_CACHE_LOCAL_MAX_ENTRIES,
+            settings.PRINCIPAL_CACHE_LOCAL_TTL_SECONDS,
+        )
+        self._local_sessions = _LocalTTLCache(
+            settings.PRINCIPAL_CACHE_LOCAL_MAX_ENTRIES,
+            settings.PRINCIPAL_CACHE_LOCAL_TTL_SECONDS,
+        )
+        self._pending_tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _version_key(user_id: int) -> str:
+        return f"{KEY_PREFIX}:ver:{user_id}"
+
+    @staticmethod
+    def _user_key(user_id: int) -> str:
+        return f"{KEY_PREFIX}:user:{user_id}"
+
+    @staticmethod
+    def _session_key(jti: str) -> str:
+        return f"{KEY_PREFIX}:session:{jti}"
+
+    async def lookup(self, user_id: int, jti: Optional[str] = None) -> PrincipalLookup:
+        """
+        Find cached user data and (if ``jti`` given) session validity.
+
+        Missing parts are ``None``; load them from the database and call
+        ``store_user`` / ``store_session`` with the returned version.
+        """
+        if not settings.PRINCIPAL_CACHE_ENABLED:
+            return PrincipalLookup(0, None, None)
+
+        local_user = self._local_users.get(user_id)
+        local_session = self._local_sessions.get(jti) if jti else None
+        if local_user is not None and (jti is None or local_session is not None):
+            return PrincipalLookup(local_user["ver"], local_user["user"], local_session["session"] if local_session else None)
+
+        try:
+            redis = await get_redis()
+            keys = [self._version_key(user_id), self._user_key(user_id)]
+            if jti:
+                keys.append(self._session_key(jti))
+            raw = await redis.mget(keys)
+        except Exception as e:
+            logger.warning(f"Principal cache read failed: {str(e)}")
+            return PrincipalLookup(-1, None, None)
+
+        version = int(raw[0] or 0)
+        user_entry = json.loads(raw[1]) if raw[1] else None
+        session_entry = json.loads(raw[2]) if jti and raw[2] else None
+
+        if user_entry is not None and user_entry.get("ver") != version:
+            user_entry = None
+        if session_entry is not None and (
+            session_entry.get("ver") != version or session_entry["session"].get("user_id") != user_id
+        ):
+            session_entry = None
+
+        if user_entry is not None:
+            self._local_users.set(user_id, user_entry)
+        if session_entry is not None:
+            self._local_sessions.set(jti, session_entry)
+
+        return PrincipalLookup(
+            version,
+            user_entry["user"] if user_entry else None,
+            session_entry["session"] if session_entry else None,
+        )
+
+    async def store_user(self, user_id: int, version: int, user_data: Dict[str, Any]):
+        """Cache user column data under the version returned by ``lookup``"""
+        if not settings.PRINCIPAL_CACHE_ENABLED or version < 0:
+            return
+        entry = {"ver": version, "user": user_data}
+        self._local_users.set(user_id, entry)
+        try:
+            redis = await get_redis()
+            await redis.setex(
+                self._user_key(user_id),
+                settings.PRINCIPAL_CACHE_TTL_SECONDS,
+                json.dumps(entry, default=str),
+            )
+        except Exception as e:
+            logger.warning(f"Principal cache write failed: {str(e)}")
+
+    async def store_session(self, jti: str, user_id: int, version: int, session_data: Dict[str, Any]):
+        """Cache that ``jti`` maps to an active session of ``user_id``"""
+        if not settings.PRINCIPAL_CACHE_ENABLED or version < 0:
+            return
+        entry = {"ver": version, "session": {**session_data, "user_id": user_id}}
+        self._local_sessions.set(jti, entry)
+        try:
+            redis = await get_redis()
+            await redis.setex(
+                self._session_key(jti),
+                settings.PRINCIPAL_CACHE_TTL_SECONDS,
+                json.dumps(entry),
+            )
+        except Exception as e:
+            logger.warning(f"Principal cache write failed: {str(e)}")
+
+    def forget_local(self, user_ids: Iterable[int]):
+        """Drop this process's entries for the given users"""
+        ids = set(user_ids)
+        for user_id in ids:
+            self._local_users.pop(user_id)
+        self._local_sessions.pop_where(lambda entry: entry["session"].get("user_id") in ids)
+
+    async def invalidate_users(self, user_ids: Iterable[int]):
+        """
+        Invalidate cached principals (user data and all their sessions).
+
+        Call after the database change has been committed.
+        """
+        ids = {int(user_id) for user_id in user_ids if user_id is not None}
+        if not ids:
+            return
+        self.forget_local(ids)
+        try:
+            redis = await get_redis()
+            # Version keys outlive every entry they fence
+            version_ttl = max(settings.PRINCIPAL_CACHE_TTL_SECONDS * 2, 86400)
+            async with redis.pipeline(transaction=False) as pipe:
+                for user_id in ids:
+                    pipe.incr(self._version_key(user_id))
+                    pipe.expire(self._version_key(user_id), version_ttl)
+                    pipe.delete(self._user_key(user_id))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Principal cache invalidation failed for users {sorted(ids)}: {str(e)}")
+
+    async def invalidate_user(self, user_id: int):
+        """Invalidate one user's cached principal"""
+        await self.invalidate_users([user_id])
+
+    def mark_user_dirty(self, db, user_id: int):
+        """
+        Invalidate ``user_id`` once ``db`` commits.
+
+        For writes the ORM cannot see (bulk ``update(User)`` statements).
+        """
+        sync_session = getattr(db, "sync_session", db)
+        sync_session.info.setdefault(_DIRTY_USERS_INFO_KEY, set()).add(user_id)
+
+    def _schedule_invalidation(self, user_ids: Set[int]):
+        self.forget_local(user_ids)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self.invalidate_users(user_ids))
+        self._pending_tasks.add(task)
+        task.add_done_callback(self._pending_tasks.discard)
+
+    def clear_local(self):
+        self._local_users.clear()
+        self._local_sessions.clear()
+
+
+# ============================================================================
+# ORM EVENTS (safety net for User / Session writes)
+# ============================================================================
+
+@event.listens_for(ORMSession, "after_flush")
+def _collect_dirty_principals(session, flush_context):
+    dirty = session.info.setdefault(_DIRTY_USERS_INFO_KEY, set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            dirty.add(obj.id)
+        elif isinstance(obj, Session):
+            dirty.add(obj.user_id)
+
+
+@event.listens_for(ORMSession, "after_commit")
+def _invalidate_committed_principals(session):
+    dirty = session.info.pop(_DIRTY_USERS_INFO_KEY, None)
+    if dirty:
+        principal_cache._schedule_invalidation({user_id for user_id in dirty if user_id is not None})
+
+
+@event.listens_for(ORMSession, "after_rollback")
+def _discard_dirty_principals(session):
+    session.info.pop(_DIRTY_USERS_INFO_KEY, None)
+
+
+# Global principal cache instance
+principal_cache = PrincipalCache()
@@ -0,0 +1,182 @@
+"""
+Query Metrics Instrumentation
+Per-request SQL statement count, DB time and slowest statement
+
+SQLAlchemy engine events record every statement executed while a sampled
+request is in flight (tracked through a ContextVar, which SQLAlchemy's async
+greenlets share with the calling task). The middleware then:
+- adds a ``Server-Timing`` header in DEBUG,
+- feeds per-route Prometheus-style histograms (exposed at /health/metrics),
+- logs requests whose DB time or statement count exceed the thresholds.
+
+Sampling (QUERY_METRICS_SAMPLE_RATE) keeps the overhead negligible in production.
+"""
+
+import logging
+import random
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RequestQueryStats:
+    """SQL statistics collected for a single request"""
+
+    __slots__ = ("count", "total_ms", "slowest_ms", "slowest_statement")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, duration_ms: float):
+        self.count += 1
+        self.total_ms += duration_ms
+        if duration_ms > self.slowest_ms:
+            self.slowest_ms = duration_ms
+            self.slowest_statement = statement
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("query_stats", default=None)
+
+
+# ============================================================================
+# ENGINE EVENTS
+# ============================================================================
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    duration_ms = (time.perf_counter() - start_times.pop()) * 1000
+    stats.record(statement, duration_ms)
+
+
+def install_query_instrumentation(engine) -> None:
+    """Attach statement timing listeners to an (async) engine"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ============================================================================
+# HISTOGRAMS
+# ============================================================================
+
+class Histogram:
+    """Minimal labelled histogram rendered in Prometheus text format"""
+
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        # label value -> (bucket counts, sum, count)
+        self._series: Dict[str, Tuple[List[int], float, int]] = {}
+
+    def observe(self, label: str, value: float):
+        counts, total, n = self._series.get(label) or ([0] * len(self.buckets), 0.0, 0)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self._series[label] = (counts, total + value, n + 1)
+
+    def render(self, label_name: str) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for label, (counts, total, n) in sorted(self._series.items()):
+            escaped = label.replace("\\", "\\\\").replace('"', '\\"')
+            for bound, count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{label_name}="{escaped}",le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label_name}="{escaped}",le="+Inf"}} {n}')
+            lines.append(f'{self.name}_sum{{{label_name}="{escaped}"}} {total}')
+            lines.append(f'{self.name}_count{{{label_name}="{escaped}"}} {n}')
+        return lines
+
+
+query_count_histogram = Histogram(
+    "civiclens_request_db_queries",
+    "SQL statements executed per request",
+    (1, 2, 5, 10, 20, 50, 100, 250),
+)
+query_time_histogram = Histogram(
+    "civiclens_request_db_seconds",
+    "Total SQL time per request in seconds",
+    (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+
+def render_metrics() -> str:
+    """Render all query histograms in Prometheus text exposition format"""
+    lines = query_count_histogram.render("route") + query_time_histogram.render("route")
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+def _route_label(request: Request) -> str:
+    """Route template (e.g. /api/v1/reports/{report_id}) to keep label cardinality low"""
+    route = request.scope.get("route")
+    path = getattr(route, "path", None) or "unmatched"
+    return f"{request.method} {path}"
+
+
+class QueryMetricsMiddleware(BaseHTTPMiddleware):
+    """
+    Middleware to record SQL statement count and DB time for sampled requests.
+    """
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        if not settings.QUERY_METRICS_ENABLED or random.random() >= settings.QUERY_METRICS_SAMPLE_RATE:
+            return await call_next(request)
+
+        stats = RequestQueryStats()
+        token = _current_stats.set(stats)
+        try:
+            response = await call_next(request)
+        finally:
+            _current_stats.reset(token)
+
+        route = _route_label(request)
+        query_count_histogram.observe(route, stats.count)
+        query_time_histogram.observe(route, stats.total_ms / 1000)
+
+        if settings.DEBUG:
+            response.headers["Server-Timing"] = (
+                f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries", '
+                f'db-slowest;dur={stats.slowest_ms:.1f}'
+            )
+
+        if (
+            stats.total_ms >= settings.QUERY_METRICS_SLOW_REQUEST_MS
+            or stats.count >= settings.QUERY_METRICS_MAX_STATEMENTS
+        ):
+            slowest = " ".join((stats.slowest_statement or "").split())[:300]
+            logger.warning(
+                f"Slow DB request {route}: {stats.count} queries, "
+                f"{stats.total_ms:.1f}ms total, slowest {stats.slowest_ms:.1f}ms: {slowest}"
+            )
+
+        return response
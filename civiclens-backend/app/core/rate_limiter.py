@@ -1,126 +1,480 @@
 """
 Rate Limiting Service using Redis
-Implements sliding window rate limiting for various endpoints
+Implements sliding window (or GCRA) rate limiting for various endpoints
+
+Each check is a single server-side Lua script (EVALSHA, with automatic
+NOSCRIPT fallback), so trimming, counting and recording a request happen
+atomically in one round trip - concurrent bursts cannot all slip through.
+
+Algorithms (RATE_LIMIT_ALGORITHM):
+- "sliding_window": sorted set of request timestamps; exact count per window.
+- "gcra": generic cell rate algorithm (token bucket); one small string key
+  per client, smooth spacing with bursts up to ``max_requests``.
+
+A local in-process pre-filter remembers keys Redis has rejected until their
+retry time, so obvious floods are refused without touching Redis at all.
+
+Attempt guards (``guard``) count attempts in a fixed window and lock the key
+once the limit is reached - lock check, increment and lock-setting in one
+script. They back account lockout (app.core.account_security) and the OTP
+and password-reset limits, and can be pipelined with ordinary rate-limit
+checks so the whole pre-auth login gate is one Redis round trip.
+
+If Redis is unavailable, checks fail open (allowed) by default so an outage
+does not take the API down with it. Authentication throttles (login, OTP,
+password reset, account lockout) pass ``fail_closed=True`` and are refused
+instead, so they cannot be brute-forced while Redis is down.
 """
 
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
 from fastapi import Request
-from typing import Optional
-from datetime import datetime, timedelta
+from redis.exceptions import NoScriptError
+from typing import List, Optional, Tuple
 from app.core.database import get_redis
 from app.config import settings
 from app.core.exceptions import ValidationException
 
+logger = logging.getLogger(__name__)
+
+# KEYS[1] = zset key; ARGV = now_ms, window_ms, limit, member
+# Returns {allowed, remaining, retry_after_ms, reset_after_ms}
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+local count = redis.call('ZCARD', key)
+
+if count >= limit then
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    local retry = window
+    if oldest[2] then
+        retry = math.max(1, math.ceil(tonumber(oldest[2]) + window - now))
+    end
+    return {0, 0, retry, retry}
+end
+
+redis.call('ZADD', key, now, ARGV[4])
+redis.call('PEXPIRE', key, window)
+
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+local reset = window
+if oldest[2] then
+    reset = math.max(1, math.ceil(tonumber(oldest[2]) + window - now))
+end
+return {1, limit - count - 1, 0, reset}
+"""
+
+# KEYS[1] = TAT key; ARGV = now_ms, period_ms, limit
+# Returns {allowed, remaining, retry_after_ms, reset_after_ms}
+GCRA_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local interval = period / limit
+
+local tat = tonumber(redis.call('GET', key))
+if not tat or tat < now then
+    tat = now
+end
+
+local new_tat = tat + interval
+local allow_at = new_tat - period
+
+if allow_at > now then
+    local retry = math.max(1, math.ceil(allow_at - now))
+    return {0, 0, retry, math.ceil(tat - now)}
+end
+
+redis.call('SET', key, string.format('%.3f', new_tat), 'PX', math.max(1, math.ceil(new_tat - now)))
+local remaining = math.floor((now - allow_at) / interval)
+return {1, remaining, 0, math.ceil(new_tat - now)}
+"""
+
+
+# KEYS[1] = guard hash {count, locked_until}; ARGV = now_ms, max_attempts, window_ms, lock_ms
+# lock_ms <= 0 locks until the attempt window ends.
+# Returns {allowed, attempts, remaining, retry_after_ms}
+GUARD_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local max_attempts = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local lock = tonumber(ARGV[4])
+
+local locked_until = tonumber(redis.call('HGET', key, 'locked_until') or '0')
+if locked_until > now then
+    local attempts = tonumber(redis.call('HGET', key, 'count') or '0')
+    return {0, attempts, 0, locked_until - now}
+end
+if locked_until > 0 then
+    redis.call('DEL', key)
+end
+
+local count = redis.call('HINCRBY', key, 'count', 1)
+if count == 1 then
+    redis.call('PEXPIRE', key, window)
+end
+
+if count >= max_attempts then
+    local ttl = redis.call('PTTL', key)
+    if lock <= 0 then
+        lock = math.max(1, ttl)
+    end
+    redis.call('HSET', key, 'locked_until', now + lock)
+    if ttl < lock then
+        redis.call('PEXPIRE', key, lock)
+    end
+    if count > max_attempts then
+        return {0, count, 0, lock}
+    end
+end
+
+return {1, count, max_attempts - count, 0}
+"""
+
+
+_SCRIPTS = {"sliding_window": SLIDING_WINDOW_SCRIPT, "gcra": GCRA_SCRIPT, "guard": GUARD_SCRIPT}
+_SCRIPT_SHAS = {name: hashlib.sha1(source.encode("utf-8")).hexdigest() for name, source in _SCRIPTS.items()}
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of a single rate limit check"""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # seconds until the next request would be allowed (0 if allowed)
+    reset_after: float  # seconds until the limit is fully replenished
+
+
+@dataclass
+class GuardResult:
+    """Outcome of an attempt guard"""
+    allowed: bool
+    attempts: int  # attempts in the current window, including this one
+    remaining: int  # further attempts allowed before the key locks
+    retry_after: float  # seconds until the lock lifts (0 if allowed)
+
 
 class RateLimiter:
-    """Redis-based rate limiter with sliding window"""
-    
+    """Redis-based rate limiter with sliding window (or GCRA) and a local pre-filter"""
+
     def __init__(self):
         self.enabled = settings.RATE_LIMIT_ENABLED
-    
+        self.algorithm = settings.RATE_LIMIT_ALGORITHM if settings.RATE_LIMIT_ALGORITHM in _SCRIPTS else "sliding_window"
+        # (redis key, limit, window) -> monotonic time when Redis will accept again
+        self._blocked: "OrderedDict[tuple, float]" = OrderedDict()
+        self.local_rejections = 0
+
+    async def _run_scripts(self, redis, calls: List[Tuple[str, str, list]]) -> list:
+        """
+        Run (algorithm, key, args) script calls in one pipelined round trip.
+
+        Uses EVALSHA; on NOSCRIPT (e.g. after a Redis restart) loads the
+        scripts and retries once.
+        """
+        for attempt in range(2):
+            try:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for algorithm, redis_key, args in calls:
+                        pipe.evalsha(_SCRIPT_SHAS[algorithm], 1, redis_key, *args)
+                    return await pipe.execute()
+            except NoScriptError:
+                if attempt:
+                    raise
+                for algorithm in {algorithm for algorithm, _, _ in calls}:
+                    await redis.script_load(_SCRIPTS[algorithm])
+
+    def _check_local(self, block_key: tuple) -> Optional[RateLimitResult]:
+        """Reject without Redis while a previous rejection is still in force"""
+        if not settings.RATE_LIMIT_LOCAL_PREFILTER_ENABLED:
+            return None
+        until = self._blocked.get(block_key)
+        if until is None:
+            return None
+        remaining_block = until - time.monotonic()
+        if remaining_block <= 0:
+            self._blocked.pop(block_key, None)
+            return None
+        self.local_rejections += 1
+        return RateLimitResult(False, block_key[1], 0, remaining_block, remaining_block)
+
+    def _remember_rejection(self, block_key: tuple, result: RateLimitResult):
+        if not settings.RATE_LIMIT_LOCAL_PREFILTER_ENABLED:
+            return
+        self._blocked[block_key] = time.monotonic() + result.retry_after
+        self._blocked.move_to_end(block_key)
+        while len(self._blocked) > settings.RATE_LIMIT_LOCAL_PREFILTER_MAX_KEYS:
+            self._blocked.popitem(last=False)
+
+    async def hit(
+        self,
+        key: str,
+        max_requests: int,
+        window_seconds: int,
+        algorithm: Optional[str] = None,
+        fail_closed: bool = False
+    ) -> RateLimitResult:
+        """
+        Record a request against ``key`` and report whether it is allowed.
+
+        Does not raise; if Redis is unavailable the request is allowed, or
+        refused with ``fail_closed``.
+        """
+        results = await self.hit_many(
+            [(key, max_requests, window_seconds)], algorithm=algorithm, fail_closed=fail_closed
+        )
+        return results[0]
+
+    async def hit_many(
+        self,
+        checks: List[Tuple[str, int, int]],
+        algorithm: Optional[str] = None,
+        fail_closed: bool = False
+    ) -> List[RateLimitResult]:
+        """
+        Record a request against several (key, max_requests, window_seconds)
+        limits in a single pipelined Redis round trip.
+        """
+        results, _ = await self._hit(checks, algorithm, fail_closed=fail_closed)
+        return results
+
+    async def guard(
+        self,
+        key: str,
+        max_attempts: int,
+        window_seconds: int,
+        lock_seconds: int = 0,
+        checks: Optional[List[Tuple[str, int, int]]] = None,
+        fail_closed: bool = False
+    ) -> Tuple[GuardResult, List[RateLimitResult]]:
+        """
+        Count an attempt against ``key`` and lock it once ``max_attempts``
+        is reached (for ``lock_seconds``, or until the window ends if 0).
+
+        Any rate-limit ``checks`` run in the same round trip. Does not
+        raise; if Redis is unavailable the attempt (and the checks) are
+        allowed, or refused with ``fail_closed``.
+        """
+        now_ms = int(time.time() * 1000)
+        guard_call = (
+            "guard",
+            f"guard:{key}",
+            [now_ms, max_attempts, int(window_seconds * 1000), int(lock_seconds * 1000)],
+        )
+        results, extra = await self._hit(checks or [], extra_calls=[guard_call], fail_closed=fail_closed)
+
+        if extra is None:
+            if fail_closed:
+                return GuardResult(False, 0, 0, settings.RATE_LIMIT_FAIL_CLOSED_RETRY_SECONDS), results
+            return GuardResult(True, 0, max_attempts, 0), results
+        allowed, attempts, remaining, retry_ms = extra[0]
+        return GuardResult(
+            allowed=bool(allowed),
+            attempts=int(attempts),
+            remaining=max(0, int(remaining)),
+            retry_after=int(retry_ms) / 1000,
+        ), results
+
+    async def guard_status(self, key: str) -> GuardResult:
+        """Read a guard without counting an attempt"""
+        try:
+            redis = await get_redis()
+            count, locked_until = await redis.hmget(f"guard:{key}", "count", "locked_until")
+        except Exception as e:
+            logger.warning(f"Rate limiter Redis error (allowing request): {e}")
+            return GuardResult(True, 0, 0, 0)
+        retry_ms = float(locked_until or 0) - time.time() * 1000
+        attempts = int(count or 0)
+        if retry_ms > 0:
+            return GuardResult(False, attempts, 0, retry_ms / 1000)
+        return GuardResult(True, attempts, 0, 0)
+
+    async def clear_guard(self, key: str):
+        """Reset a guard (successful login, admin unlock); does not raise"""
+        try:
+            redis = await get_redis()
+            await redis.delete(f"guard:{key}")
+        except Exception as e:
+            logger.warning(f"Rate limiter Redis error (guard {key} not cleared): {e}")
+
+    async def _hit(
+        self,
+        checks: List[Tuple[str, int, int]],
+        algorithm: Optional[str] = None,
+        extra_calls: Optional[List[Tuple[str, str, list]]] = None,
+        fail_closed: bool = False
+    ) -> Tuple[List[RateLimitResult], Optional[list]]:
+        """
+        Run rate-limit ``checks`` plus raw ``extra_calls`` (script, key, args)
+        in one pipeline. Returns the check results and the extra replies
+        (None if Redis failed). If Redis fails, checks are allowed, or
+        refused for RATE_LIMIT_FAIL_CLOSED_RETRY_SECONDS with ``fail_closed``.
+        """
+        extra_calls = extra_calls or []
+        algorithm = algorithm or self.algorithm
+        results: List[Optional[RateLimitResult]] = [None] * len(checks)
+        calls = []
+        pending = []
+
+        now_ms = int(time.time() * 1000)
+        for i, (key, max_requests, window_seconds) in enumerate(checks):
+            if not self.enabled:
+                results[i] = RateLimitResult(True, max_requests, max_requests, 0, 0)
+                continue
+
+            redis_key = f"rate_limit:{key}" if algorithm != "gcra" else f"rate_limit:gcra:{key}"
+            window_ms = int(window_seconds * 1000)
+            # The same key may be checked with different limits (e.g. per-IP limits)
+            block_key = (redis_key, max_requests, window_ms)
+
+            local = self._check_local(block_key)
+            if local is not None:
+                results[i] = local
+                continue
+
+            args = [now_ms, window_ms, max_requests]
+            if algorithm != "gcra":
+                args.append(f"{now_ms}-{uuid.uuid4().hex[:8]}")
+            calls.append((algorithm, redis_key, args))
+            pending.append((i, block_key, max_requests))
+
+        replies = None
+        if calls or extra_calls:
+            try:
+                redis = await get_redis()
+                replies = await self._run_scripts(redis, calls + extra_calls)
+            except Exception as e:
+                if fail_closed:
+                    logger.error(f"Rate limiter Redis error (refusing request): {e}")
+                else:
+                    logger.warning(f"Rate limiter Redis error (allowing request): {e}")
+
+        for n, (i, block_key, max_requests) in enumerate(pending):
+            if replies is None:
+                if fail_closed:
+                    retry = settings.RATE_LIMIT_FAIL_CLOSED_RETRY_SECONDS
+                    results[i] = RateLimitResult(False, max_requests, 0, retry, retry)
+                else:
+                    results[i] = RateLimitResult(True, max_requests, max_requests, 0, 0)
+                continue
+            allowed, remaining, retry_ms, reset_ms = replies[n]
+            result = RateLimitResult(
+                allowed=bool(allowed),
+                limit=max_requests,
+                remaining=max(0, int(remaining)),
+                retry_after=int(retry_ms) / 1000,
+                reset_after=int(reset_ms) / 1000,
+            )
+            if not result.allowed:
+                self._remember_rejection(block_key, result)
+            results[i] = result
+
+        extra = replies[len(calls):] if replies is not None else None
+        return results, extra
+
     async def check_rate_limit(
         self,
         key: str,
         max_requests: int,
         window_seconds: int,
-        identifier: str = "request"
+        identifier: str = "request",
+        fail_closed: bool = False
     ) -> bool:
         """
         Check if request is within rate limit
-        
+
         Args:
             key: Redis key (e.g., "otp:+919876543210")
             max_requests: Maximum requests allowed
             window_seconds: Time window in seconds
             identifier: Human-readable identifier for error message
-            
+            fail_closed: Refuse the request if Redis is unavailable
+
         Returns:
             True if within limit
-            
+
         Raises:
             ValidationException if rate limit exceeded
         """
+        result = await self.hit(key, max_requests, window_seconds, fail_closed=fail_closed)
+
+        if not result.allowed:
+            retry_after = max(1, int(result.retry_after + 0.999))
+            raise ValidationException(
+                f"Rate limit exceeded for {identifier}. "
+                f"Try again in {retry_after} seconds."
+            )
+
+        return True
+
+    async def check_attempt_guard(
+        self,
+        key: str,
+        max_attempts: int,
+        window_seconds: int,
+        identifier: str = "request",
+        fail_closed: bool = False
+    ) -> bool:
+        """
+        Count an attempt with ``guard`` (one atomic script call)
+
+        Raises:
+            ValidationException if the key is locked
+        """
         if not self.enabled:
             return True
-        
-        redis = await get_redis()
-        current_time = datetime.utcnow()
-        window_start = current_time - timedelta(seconds=window_seconds)
-        
-        # Use sorted set to track requests with timestamps
-        rate_limit_key = f"rate_limit:{key}"
-        
-        # Remove old entries outside the window
-        await redis.zremrangebyscore(
-            rate_limit_key,
-            0,
-            window_start.timestamp()
-        )
-        
-        # Count requests in current window
-        request_count = await redis.zcard(rate_limit_key)
-        
-        if request_count >= max_requests:
-            # Rate limit exceeded - calculate retry time without complex Redis operations
-            # Use a simple fallback approach to avoid async generator issues
-            retry_after = window_seconds  # Simple fallback
-            
-            try:
-                # Try to get the oldest timestamp for more accurate retry time
-                # Use zscore to get the oldest item's score instead of zrange
-                oldest_member = await redis.zrange(rate_limit_key, 0, 0)
-                if oldest_member:
-                    # Get the score (timestamp) of the oldest member
-                    oldest_timestamp = await redis.zscore(rate_limit_key, oldest_member[0])
-                    if oldest_timestamp:
-                        retry_after = max(1, int(oldest_timestamp + window_seconds - current_time.timestamp()))
-            except Exception as e:
-                # If Redis operations fail, use the fallback retry time
-                import logging
-                logging.warning(f"Rate limiter Redis error (using fallback): {e}")
-            
+
+        result, _ = await self.guard(key, max_attempts, window_seconds, fail_closed=fail_closed)
+
+        if not result.allowed:
+            retry_after = max(1, int(result.retry_after + 0.999))
             raise ValidationException(
                 f"Rate limit exceeded for {identifier}. "
                 f"Try again in {retry_after} seconds."
             )
-        
-        # Add current request
-        await redis.zadd(
-            rate_limit_key,
-            {str(current_time.timestamp()): current_time.timestamp()}
-        )
-        
-        # Set expiry on the key
-        await redis.expire(rate_limit_key, window_seconds)
-        
+
         return True
-    
+
     async def check_otp_rate_limit(self, phone: str) -> bool:
         """Check OTP request rate limit"""
-        return await self.check_rate_limit(
+        return await self.check_attempt_guard(
             key=f"otp:{phone}",
-            max_requests=settings.RATE_LIMIT_OTP_MAX_REQUESTS,
+            max_attempts=settings.RATE_LIMIT_OTP_MAX_REQUESTS,
             window_seconds=settings.RATE_LIMIT_OTP_WINDOW_SECONDS,
-            identifier="OTP requests"
+            identifier="OTP requests",
+            fail_closed=True
         )
-    
+
     async def check_login_rate_limit(self, phone: str) -> bool:
         """Check login rate limit"""
         return await self.check_rate_limit(
             key=f"login:{phone}",
             max_requests=settings.RATE_LIMIT_LOGIN_MAX_REQUESTS,
             window_seconds=settings.RATE_LIMIT_LOGIN_WINDOW_SECONDS,
-            identifier="login attempts"
+            identifier="login attempts",
+            fail_closed=True
         )
-    
+
     async def check_password_reset_rate_limit(self, phone: str) -> bool:
         """Check password reset rate limit"""
-        return await self.check_rate_limit(
+        return await self.check_attempt_guard(
             key=f"password_reset:{phone}",
-            max_requests=settings.RATE_LIMIT_PASSWORD_RESET_MAX_REQUESTS,
+            max_attempts=settings.RATE_LIMIT_PASSWORD_RESET_MAX_REQUESTS,
             window_seconds=settings.RATE_LIMIT_PASSWORD_RESET_WINDOW_SECONDS,
-            identifier="password reset requests"
+            identifier="password reset requests",
+            fail_closed=True
         )
-    
+
     async def check_ip_rate_limit(
         self,
         request: Request,
@@ -142,8 +496,11 @@ class RateLimiter:
 
     async def reset_rate_limit(self, key: str):
         """Reset rate limit for a specific key (admin action)"""
+        redis_keys = (f"rate_limit:{key}", f"rate_limit:gcra:{key}", f"guard:{key}")
+        for block_key in [k for k in self._blocked if k[0] in redis_keys]:
+            self._blocked.pop(block_key, None)
         redis = await get_redis()
-        await redis.delete(f"rate_limit:{key}")
+        await redis.delete(*redis_keys)
 
 
 # Global rate limiter instance
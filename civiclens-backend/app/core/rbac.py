@@ -13,7 +13,7 @@ ROLE HIERARCHY:
 """
 
 from enum import Enum
-from typing import List, Set, Optional
+from typing import FrozenSet, Iterable, List, Set, Optional
 from app.models.user import UserRole
 
 
@@ -455,6 +455,41 @@ ROLE_PERMISSIONS: dict[UserRole, Set[Permission]] = {
 }
 
 
+# ============================================================================
+# COMPILED PERMISSION BITSETS
+# ============================================================================
+# Built once at import: each Permission gets one bit (in declaration order)
+# and each role's declared set becomes an int mask, so permission checks are
+# a single AND. Masks are also the compact form for client permission
+# payloads (see get_permission_payload).
+
+PERMISSION_BITS: dict[Permission, int] = {
+    permission: 1 << index for index, permission in enumerate(Permission)
+}
+
+
+def permission_mask(permissions: Iterable[Permission]) -> int:
+    """Combine permissions into a bitmask"""
+    mask = 0
+    for permission in permissions:
+        mask |= PERMISSION_BITS[permission]
+    return mask
+
+
+def permissions_from_mask(mask: int) -> List[Permission]:
+    """Decode a bitmask back into permissions (declaration order)"""
+    return [permission for permission, bit in PERMISSION_BITS.items() if mask & bit]
+
+
+ROLE_PERMISSION_MASKS: dict[UserRole, int] = {
+    role: permission_mask(permissions) for role, permissions in ROLE_PERMISSIONS.items()
+}
+
+ROLE_PERMISSION_SETS: dict[UserRole, FrozenSet[Permission]] = {
+    role: frozenset(permissions) for role, permissions in ROLE_PERMISSIONS.items()
+}
+
+
 # ============================================================================
 # RBAC HELPER FUNCTIONS
 # ============================================================================
@@ -464,26 +499,51 @@ def get_role_level(role: UserRole) -> int:
     return ROLE_LEVELS.get(role, 0)
 
 
+def get_role_permission_mask(user_role: UserRole) -> int:
+    """Get the compiled permission bitmask for a role"""
+    return ROLE_PERMISSION_MASKS.get(user_role, 0)
+
+
 def has_permission(user_role: UserRole, permission: Permission) -> bool:
     """Check if a role has a specific permission"""
-    return permission in ROLE_PERMISSIONS.get(user_role, set())
+    return bool(ROLE_PERMISSION_MASKS.get(user_role, 0) & PERMISSION_BITS[permission])
+
+
+def has_any_permission_mask(user_role: UserRole, mask: int) -> bool:
+    """Check if a role has any permission in a precomputed mask"""
+    return bool(ROLE_PERMISSION_MASKS.get(user_role, 0) & mask)
+
+
+def has_all_permissions_mask(user_role: UserRole, mask: int) -> bool:
+    """Check if a role has every permission in a precomputed mask"""
+    return ROLE_PERMISSION_MASKS.get(user_role, 0) & mask == mask
 
 
 def has_any_permission(user_role: UserRole, permissions: List[Permission]) -> bool:
     """Check if a role has any of the specified permissions"""
-    role_perms = ROLE_PERMISSIONS.get(user_role, set())
-    return any(perm in role_perms for perm in permissions)
+    return has_any_permission_mask(user_role, permission_mask(permissions))
 
 
 def has_all_permissions(user_role: UserRole, permissions: List[Permission]) -> bool:
     """Check if a role has all of the specified permissions"""
-    role_perms = ROLE_PERMISSIONS.get(user_role, set())
-    return all(perm in role_perms for perm in permissions)
+    return has_all_permissions_mask(user_role, permission_mask(permissions))
 
 
-def get_user_permissions(user_role: UserRole) -> Set[Permission]:
+def get_user_permissions(user_role: UserRole) -> FrozenSet[Permission]:
     """Get all permissions for a role"""
-    return ROLE_PERMISSIONS.get(user_role, set())
+    return ROLE_PERMISSION_SETS.get(user_role, frozenset())
+
+
+def get_permission_payload(user_role: UserRole) -> dict:
+    """
+    Compact permission description for clients: the role mask (hex) plus
+    the bit order needed to decode it.
+    """
+    return {
+        "role": user_role.value,
+        "mask": format(get_role_permission_mask(user_role), "x"),
+        "bits": [permission.value for permission in PERMISSION_BITS],
+    }
 
 
 def is_higher_role(role1: UserRole, role2: UserRole) -> bool:
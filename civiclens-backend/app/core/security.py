@@ -9,12 +9,13 @@ import bcrypt
 
 # ============================================================================
 # PASSWORD HASHING - Using bcrypt directly (production-ready)
+# Blocking: async code should use app.core.password_hashing.password_hasher
 # ============================================================================
 
 def get_password_hash(password: str) -> str:
     """Hash password using bcrypt directly (production-safe)"""
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
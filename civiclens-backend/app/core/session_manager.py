@@ -1,17 +1,24 @@
 """
 Session Management Service
 Handles session creation, validation, and cleanup
+
+Active sessions are mirrored in Redis (app.core.session_store); validation
+reads the mirror first and activity is written back to Postgres in bulk.
+Invalidation and cleanup are set-based UPDATE/DELETE ... RETURNING jti
+statements; returned JTIs go to the Redis revocation set.
 """
 
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, update, delete, and_, or_
 from app.models.session import Session
 from app.models.user import User
 from app.config import settings
 from app.core.security import generate_jti
 from app.core.enhanced_security import create_session_fingerprint
+from app.core.principal_cache import principal_cache
+from app.core.session_store import session_store
 from fastapi import Request
 
 
@@ -58,6 +65,7 @@ class SessionManager:
         db.add(session)
         await db.commit()
         await db.refresh(session)
+        await session_store.put(session)
         
         # Enforce max concurrent sessions
         await self.enforce_session_limit(db, user_id)
@@ -101,11 +109,107 @@ class SessionManager:
         db: AsyncSession,
         jti: str
     ):
-        """Update last activity timestamp"""
+        """Update last activity timestamp (coalesced, written back in bulk)"""
+        session_store.touch(jti)
+    
+    async def get_active_session_data(
+        self,
+        db: AsyncSession,
+        jti: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Active, unexpired session for ``jti`` as
+        {"id", "user_id", "fingerprint", "expires_at"}, or None.
+        """
+        data, _ = await self.get_session_state(db, jti)
+        return data
+    
+    async def get_session_state(
+        self,
+        db: AsyncSession,
+        jti: str
+    ) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        (active session data or None, whether ``jti`` is revoked).
+        
+        Served from the Redis mirror with the revocation check in the same
+        round trip (revoked JTIs are rejected without touching the
+        database); falls back to the database and re-populates the mirror
+        on a miss.
+        """
+        data, revoked = await session_store.lookup(jti)
+        if revoked:
+            return None, True
+        if data is not None:
+            return data, False
+        
         session = await self.get_session_by_jti(db, jti)
-        if session:
-            session.last_activity = datetime.utcnow()
+        if not session:
+            return None, False
+        
+        if session.is_expired():
+            session.is_active = 0
+            await db.commit()
+            await principal_cache.invalidate_user(session.user_id)
+            return None, False
+        
+        await session_store.put(session)
+        return {
+            "id": session.id,
+            "user_id": session.user_id,
+            "fingerprint": session.fingerprint,
+            "expires_at": session.expires_at,
+        }, False
+    
+    async def _deactivate(
+        self,
+        db: AsyncSession,
+        *conditions
+    ) -> List[Tuple[int, str]]:
+        """
+        Set-based ``UPDATE sessions SET is_active = 0 WHERE ... RETURNING
+        user_id, jti`` for active sessions matching ``conditions``. Commits.
+        """
+        result = await db.execute(
+            update(Session)
+            .where(Session.is_active == 1, *conditions)
+            .values(is_active=0)
+            .returning(Session.user_id, Session.jti)
+        )
+        rows = [(row.user_id, row.jti) for row in result]
+        await db.commit()
+        return rows
+    
+    async def _deactivate_in_batches(
+        self,
+        db: AsyncSession,
+        *conditions
+    ) -> List[Tuple[int, str]]:
+        """
+        ``_deactivate`` in SESSION_CLEANUP_BATCH_SIZE chunks (one short
+        transaction each, skipping rows locked by concurrent requests).
+        """
+        rows: List[Tuple[int, str]] = []
+        while True:
+            batch_ids = (
+                select(Session.id)
+                .where(Session.is_active == 1, *conditions)
+                .limit(settings.SESSION_CLEANUP_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                update(Session)
+                .where(Session.id.in_(batch_ids))
+                .values(is_active=0)
+                .returning(Session.user_id, Session.jti)
+                .execution_options(synchronize_session=False)
+            )
+            batch = [(row.user_id, row.jti) for row in result]
             await db.commit()
+            rows.extend(batch)
+            if len(batch) < settings.SESSION_CLEANUP_BATCH_SIZE:
+                return rows
     
     async def invalidate_session(
         self,
@@ -113,10 +217,10 @@ class SessionManager:
         jti: str
     ):
         """Invalidate a specific session (logout)"""
-        session = await self.get_session_by_jti(db, jti)
-        if session:
-            session.is_active = 0
-            await db.commit()
+        rows = await self._deactivate(db, Session.jti == jti)
+        await session_store.revoke([jti])
+        if rows:
+            await principal_cache.invalidate_user(rows[0][0])
     
     async def invalidate_all_user_sessions(
         self,
@@ -125,23 +229,13 @@ class SessionManager:
         except_jti: Optional[str] = None
     ):
         """Invalidate all sessions for a user (logout all devices)"""
-        query = select(Session).where(
-            and_(
-                Session.user_id == user_id,
-                Session.is_active == 1
-            )
-        )
-        
+        conditions = [Session.user_id == user_id]
         if except_jti:
-            query = query.where(Session.jti != except_jti)
-        
-        result = await db.execute(query)
-        sessions = result.scalars().all()
-        
-        for session in sessions:
-            session.is_active = 0
+            conditions.append(Session.jti != except_jti)
         
-        await db.commit()
+        rows = await self._deactivate(db, *conditions)
+        await session_store.revoke([jti for _, jti in rows])
+        await principal_cache.invalidate_user(user_id)
     
     async def get_user_sessions(
         self,
@@ -166,37 +260,32 @@ class SessionManager:
         user_id: int
     ):
         """Enforce maximum concurrent sessions per user"""
-        sessions = await self.get_user_sessions(db, user_id, active_only=True)
-        
-        if len(sessions) > settings.MAX_CONCURRENT_SESSIONS:
-            # Invalidate oldest sessions
-            sessions_to_remove = sessions[settings.MAX_CONCURRENT_SESSIONS:]
-            for session in sessions_to_remove:
-                session.is_active = 0
-            
-            await db.commit()
+        # Everything but the most recently active MAX_CONCURRENT_SESSIONS
+        oldest_ids = (
+            select(Session.id)
+            .where(Session.user_id == user_id, Session.is_active == 1)
+            .order_by(Session.last_activity.desc())
+            .offset(settings.MAX_CONCURRENT_SESSIONS)
+            .scalar_subquery()
+        )
+        rows = await self._deactivate(db, Session.id.in_(oldest_ids))
+        
+        if rows:
+            await session_store.revoke([jti for _, jti in rows])
+            await principal_cache.invalidate_user(user_id)
     
     async def cleanup_expired_sessions(
         self,
         db: AsyncSession
     ):
         """Clean up expired sessions (background task)"""
-        result = await db.execute(
-            select(Session).where(
-                and_(
-                    Session.is_active == 1,
-                    Session.expires_at < datetime.utcnow()
-                )
-            )
-        )
-        expired_sessions = result.scalars().all()
+        rows = await self._deactivate_in_batches(db, Session.expires_at < datetime.utcnow())
         
-        for session in expired_sessions:
-            session.is_active = 0
-        
-        await db.commit()
+        # Tokens of expired sessions are already invalid; just drop mirrors
+        await session_store.remove([jti for _, jti in rows])
+        await principal_cache.invalidate_users({user_id for user_id, _ in rows})
         
-        return len(expired_sessions)
+        return len(rows)
     
     async def cleanup_inactive_sessions(
         self,
@@ -207,22 +296,45 @@ class SessionManager:
             minutes=settings.SESSION_INACTIVITY_TIMEOUT_MINUTES
         )
         
-        result = await db.execute(
-            select(Session).where(
-                and_(
-                    Session.is_active == 1,
-                    Session.last_activity < inactivity_threshold
-                )
-            )
-        )
-        inactive_sessions = result.scalars().all()
+        # Pending coalesced activity must land first, or live sessions look idle
+        await session_store.flush_activity()
+        rows = await self._deactivate_in_batches(db, Session.last_activity < inactivity_threshold)
         
-        for session in inactive_sessions:
-            session.is_active = 0
+        await session_store.revoke([jti for _, jti in rows])
+        await principal_cache.invalidate_users({user_id for user_id, _ in rows})
         
-        await db.commit()
+        return len(rows)
+    
+    async def purge_old_sessions(
+        self,
+        db: AsyncSession
+    ):
+        """Delete inactive sessions older than SESSION_RETENTION_DAYS (background task)"""
+        cutoff = datetime.utcnow() - timedelta(days=settings.SESSION_RETENTION_DAYS)
+        purged: List[str] = []
+        
+        while True:
+            batch_ids = (
+                select(Session.id)
+                .where(Session.is_active == 0, Session.expires_at < cutoff)
+                .limit(settings.SESSION_CLEANUP_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                delete(Session)
+                .where(Session.id.in_(batch_ids))
+                .returning(Session.jti)
+                .execution_options(synchronize_session=False)
+            )
+            batch = result.scalars().all()
+            await db.commit()
+            purged.extend(batch)
+            if len(batch) < settings.SESSION_CLEANUP_BATCH_SIZE:
+                break
         
-        return len(inactive_sessions)
+        await session_store.remove(purged)
+        return len(purged)
     
     async def validate_session(
         self,
@@ -230,17 +342,7 @@ class SessionManager:
         jti: str
     ) -> bool:
         """Validate if session is active and not expired"""
-        session = await self.get_session_by_jti(db, jti)
-        
-        if not session:
-            return False
-        
-        if session.is_expired():
-            session.is_active = 0
-            await db.commit()
-            return False
-        
-        return True
+        return await self.get_active_session_data(db, jti) is not None
 
 
 # Global session manager instance
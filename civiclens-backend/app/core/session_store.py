@@ -0,0 +1,212 @@
+"""
+Session Store
+Redis mirror of active sessions with write-behind of last_activity
+
+Every active session is mirrored into a Redis hash ``session:{jti}``
+(id, user_id, fingerprint, expires_at) that expires together with the
+session, so validating a session is one HGETALL and expired sessions simply
+disappear from Redis. Postgres stays the source of truth: a miss falls back
+to the ``sessions`` table and re-populates the mirror.
+
+Revoked access-token JTIs (logout, logout-all, revocation, session limit,
+inactivity cleanup) are added to the ``session:revoked`` sorted set, scored
+by the time after which no access token carrying them can still be valid, so
+the auth path rejects them with an O(1) ZSCORE, pipelined with the mirror
+lookup, even when the database still has another active session for the
+user. Access tokens replaced by a refresh are not revoked; they stay usable
+until they expire, so requests in flight during a refresh still succeed.
+
+Activity is not written per request. ``touch`` records the latest activity
+time in process; a background flusher writes all pending timestamps every
+SESSION_ACTIVITY_FLUSH_SECONDS with one set-based UPDATE.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.config import settings
+from app.core.database import AsyncSessionLocal, get_redis
+from app.models.session import Session
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "session"
+REVOKED_KEY = f"{KEY_PREFIX}:revoked"
+
+
+def _as_utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+class SessionStore:
+    """Redis-backed active session mirror"""
+
+    def __init__(self):
+        self._pending_activity: Dict[str, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @staticmethod
+    def _key(jti: str) -> str:
+        return f"{KEY_PREFIX}:{jti}"
+
+    async def put(self, session: Session):
+        """Mirror an active session (call after it is committed)"""
+        if not settings.SESSION_STORE_ENABLED:
+            return
+        expires_at = _as_utc(session.expires_at)
+        if expires_at <= datetime.now(timezone.utc):
+            return
+        try:
+            redis = await get_redis()
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.hset(self._key(session.jti), mapping={
+                    "id": session.id,
+                    "user_id": session.user_id,
+                    "fingerprint": session.fingerprint or "",
+                    "expires_at": expires_at.timestamp(),
+                })
+                pipe.expireat(self._key(session.jti), int(expires_at.timestamp()) + 1)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Session store write failed: {str(e)}")
+
+    async def lookup(self, jti: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Mirrored session data for ``jti`` and whether the JTI is revoked,
+        in one round trip.
+
+        Data is {"id", "user_id", "fingerprint", "expires_at"} or None if not
+        mirrored.
+        """
+        if not settings.SESSION_STORE_ENABLED:
+            return None, False
+        try:
+            redis = await get_redis()
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.hgetall(self._key(jti))
+                pipe.zscore(REVOKED_KEY, jti)
+                data, revoked_until = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Session store read failed: {str(e)}")
+            return None, False
+
+        revoked = revoked_until is not None and float(revoked_until) > datetime.now(timezone.utc).timestamp()
+        if revoked or not data or "user_id" not in data:
+            return None, revoked
+        return {
+            "id": int(data["id"]),
+            "user_id": int(data["user_id"]),
+            "fingerprint": data.get("fingerprint") or None,
+            "expires_at": datetime.fromtimestamp(float(data["expires_at"]), tz=timezone.utc),
+        }, False
+
+    async def revoke(self, jtis: Iterable[str]):
+        """
+        Revoke access-token JTIs: drop their mirrors and add them to the
+        revocation set until any token carrying them has expired.
+        """
+        jtis = [jti for jti in jtis if jti]
+        for jti in jtis:
+            self._pending_activity.pop(jti, None)
+        if not jtis or not settings.SESSION_STORE_ENABLED:
+            return
+        now = datetime.now(timezone.utc)
+        until = (now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)).timestamp()
+        try:
+            redis = await get_redis()
+            async with redis.pipeline(transaction=False) as pipe:
+                for start in range(0, len(jtis), 1000):
+                    chunk = jtis[start:start + 1000]
+                    pipe.delete(*[self._key(jti) for jti in chunk])
+                    pipe.zadd(REVOKED_KEY, {jti: until for jti in chunk})
+                pipe.zremrangebyscore(REVOKED_KEY, "-inf", now.timestamp())
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Session revocation failed for {len(jtis)} JTIs: {str(e)}")
+
+    async def remove(self, jtis: Iterable[str]):
+        """Drop mirrored sessions (logout / revocation)"""
+        jtis = [jti for jti in jtis if jti]
+        for jti in jtis:
+            self._pending_activity.pop(jti, None)
+        keys = [self._key(jti) for jti in jtis]
+        if not keys or not settings.SESSION_STORE_ENABLED:
+            return
+        try:
+            redis = await get_redis()
+            await redis.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Session store delete failed: {str(e)}")
+
+    # ------------------------------------------------------------ write-behind
+
+    def touch(self, jti: str, at: Optional[datetime] = None):
+        """Record session activity; written back in bulk by the flusher"""
+        self._pending_activity[jti] = at or datetime.now(timezone.utc)
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self._task is not None or self._stopping:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(settings.SESSION_ACTIVITY_FLUSH_SECONDS)
+            try:
+                await self.flush_activity()
+            except Exception as e:
+                logger.error(f"Session activity flush error: {str(e)}", exc_info=True)
+
+    async def flush_activity(self) -> int:
+        """Write pending last_activity values to Postgres in one UPDATE"""
+        if not self._pending_activity:
+            return 0
+        pending, self._pending_activity = self._pending_activity, {}
+        jtis = list(pending)
+        timestamps = [pending[jti] for jti in jtis]
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    text(
+                        "UPDATE sessions AS s SET last_activity = v.ts "
+                        "FROM unnest(CAST(:jtis AS text[]), CAST(:timestamps AS timestamptz[])) AS v(jti, ts) "
+                        "WHERE s.jti = v.jti AND s.is_active = 1 AND s.last_activity < v.ts"
+                    ),
+                    {"jtis": jtis, "timestamps": timestamps},
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Session activity write-behind failed ({len(jtis)} sessions): {str(e)}")
+            # Keep the newest values for the next attempt
+            for jti, at in pending.items():
+                self._pending_activity.setdefault(jti, at)
+            return 0
+
+        return len(jtis)
+
+    async def stop(self):
+        """Stop the flusher and write back pending activity"""
+        self._stopping = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush_activity()
+
+
+# Global session store instance
+session_store = SessionStore()
@@ -1,6 +1,7 @@
 from typing import Optional, List, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, and_, or_, func, cast, text, String
+from geoalchemy2 import Geography, Geometry
 from geoalchemy2.functions import ST_DWithin, ST_MakePoint
 from app.crud.base import CRUDBase
 from app.models.report import Report, ReportStatus, ReportSeverity
@@ -270,6 +271,144 @@ class CRUDReport(CRUDBase[Report, ReportCreate, ReportUpdate]):
         result = await db.execute(query)
         return list(result.scalars().all())
 
+    
+    async def get_map_clusters(
+        self,
+        db: AsyncSession,
+        min_lng: float,
+        min_lat: float,
+        max_lng: float,
+        max_lat: float,
+        zoom: int,
+        statuses: Optional[List[str]] = None,
+        severities: Optional[List[str]] = None,
+        categories: Optional[List[str]] = None,
+        department_id: Optional[int] = None,
+        cells_per_tile: int = 8,
+        limit: int = 5000
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate reports inside a bounding box into grid clusters for a zoom level.
+        
+        The bbox filter uses the geography && operator so it is served by
+        idx_report_location_gist. Grid cells are sized so each 256px map tile
+        holds ``cells_per_tile`` cells per side, which bounds the number of
+        clusters returned for any viewport regardless of report volume.
+        """
+        cell_size = 360.0 / (2 ** zoom) / cells_per_tile
+        envelope = cast(
+            func.ST_MakeEnvelope(min_lng, min_lat, max_lng, max_lat, 4326),
+            Geography(srid=4326)
+        )
+        cell = func.ST_SnapToGrid(cast(Report.location, Geometry(srid=4326)), cell_size)
+        
+        query = (
+            select(
+                func.count(Report.id).label("count"),
+                func.avg(Report.latitude).label("lat"),
+                func.avg(Report.longitude).label("lng"),
+                func.min(Report.id).label("report_id"),
+                func.count(Report.id).filter(Report.severity == ReportSeverity.CRITICAL).label("critical"),
+                func.count(Report.id).filter(Report.severity == ReportSeverity.HIGH).label("high"),
+            )
+            .where(
+                Report.location.isnot(None),
+                Report.location.op("&&")(envelope)
+            )
+            .group_by(cell)
+            .order_by(func.count(Report.id).desc())
+            .limit(limit)
+        )
+        
+        # Compared as text like the tile query: unknown values match nothing
+        # instead of failing the enum cast
+        if statuses:
+            query = query.where(cast(Report.status, String).in_(statuses))
+        if severities:
+            query = query.where(cast(Report.severity, String).in_(severities))
+        if categories:
+            query = query.where(Report.category.in_(categories))
+        if department_id:
+            query = query.where(Report.department_id == department_id)
+        
+        result = await db.execute(query)
+        return [
+            {
+                "lat": float(row.lat),
+                "lng": float(row.lng),
+                "count": row.count,
+                "critical": row.critical,
+                "high": row.high,
+                # Single-report clusters can link straight to the report
+                "report_id": row.report_id if row.count == 1 else None,
+            }
+            for row in result.all()
+        ]
+    
+    async def get_map_tile(
+        self,
+        db: AsyncSession,
+        z: int,
+        x: int,
+        y: int,
+        statuses: Optional[List[str]] = None,
+        severities: Optional[List[str]] = None,
+        categories: Optional[List[str]] = None,
+        department_id: Optional[int] = None,
+        grid_size: int = 64
+    ) -> bytes:
+        """
+        Render a Mapbox Vector Tile (layer "reports") for tile z/x/y.
+        
+        Points are snapped to a ``grid_size`` x ``grid_size`` grid inside the
+        tile and aggregated, so a tile never carries more than grid_size^2
+        features. Requires PostGIS >= 3.0 (ST_TileEnvelope / ST_AsMVT).
+        """
+        # Web Mercator tile width in meters at this zoom
+        cell_size = 40075016.68557849 / (2 ** z) / grid_size
+        
+        conditions = ["r.location IS NOT NULL"]
+        params: Dict[str, Any] = {"z": z, "x": x, "y": y, "cell": cell_size}
+        if statuses:
+            conditions.append("r.status::text = ANY(:statuses)")
+            params["statuses"] = statuses
+        if severities:
+            conditions.append("r.severity::text = ANY(:severities)")
+            params["severities"] = severities
+        if categories:
+            conditions.append("r.category = ANY(:categories)")
+            params["categories"] = categories
+        if department_id:
+            conditions.append("r.department_id = :department_id")
+            params["department_id"] = department_id
+        
+        sql = text(f"""
+            WITH bounds AS (
+                SELECT ST_TileEnvelope(:z, :x, :y) AS geom
+            ),
+            points AS (
+                SELECT ST_SnapToGrid(ST_Transform(r.location::geometry, 3857), :cell) AS geom,
+                       r.id, r.severity::text AS severity
+                FROM reports r, bounds
+                WHERE r.location && ST_Transform(bounds.geom, 4326)::geography
+                  AND {" AND ".join(conditions)}
+            ),
+            clusters AS (
+                SELECT ST_AsMVTGeom(points.geom, bounds.geom) AS geom,
+                       count(*) AS count,
+                       min(points.id) AS report_id,
+                       count(*) FILTER (WHERE points.severity = 'critical') AS critical,
+                       count(*) FILTER (WHERE points.severity = 'high') AS high
+                FROM points, bounds
+                GROUP BY points.geom, bounds.geom
+            )
+            SELECT ST_AsMVT(clusters.*, 'reports') FROM clusters
+        """)
+        
+        result = await db.execute(sql, params)
+        tile = result.scalar()
+        return bytes(tile) if tile else b""
+
 
 # Singleton instance
 report_crud = CRUDReport(Report)
@@ -5,9 +5,10 @@ from app.crud.base import CRUDBase
 from app.models.user import User, UserRole, ProfileCompletionLevel
 from app.models.role_history import RoleHistory
 from app.schemas.user import UserCreate, UserUpdate, UserProfileUpdate, OfficerCreate, RoleChangeRequest
-from app.core.security import get_password_hash, get_password_hash_direct, verify_password, verify_password_direct
 from app.core.enhanced_security import validate_password_strength
 from app.core.exceptions import ValidationException
+from app.core.principal_cache import principal_cache
+from app.core.password_hashing import password_hasher
 from datetime import datetime
 import re
 
@@ -15,6 +16,33 @@ import re
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     """CRUD operations for User model"""
 
+    async def update(
+        self,
+        db: AsyncSession,
+        id: int,
+        obj_in: UserUpdate,
+        commit: bool = True
+    ) -> Optional[User]:
+        """Update a user (bulk UPDATE, so the cached principal is invalidated explicitly)"""
+        principal_cache.mark_user_dirty(db, id)
+        user = await super().update(db, id, obj_in, commit=commit)
+        if commit:
+            await principal_cache.invalidate_user(id)
+        return user
+
+    async def delete(
+        self,
+        db: AsyncSession,
+        id: int,
+        commit: bool = True
+    ) -> bool:
+        """Delete a user and drop their cached principal"""
+        principal_cache.mark_user_dirty(db, id)
+        deleted = await super().delete(db, id, commit=commit)
+        if commit:
+            await principal_cache.invalidate_user(id)
+        return deleted
+
     async def get_by_phone(self, db: AsyncSession, phone: str) -> Optional[User]:
         """Get user by phone number (handles multiple formats)"""
         # Normalize phone number for search
@@ -93,7 +121,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             last_name=obj_in.last_name,
             full_name=obj_in.full_name,
             role=obj_in.role,
-            hashed_password=get_password_hash(obj_in.password) if obj_in.password else None,
+            hashed_password=await password_hasher.hash(obj_in.password) if obj_in.password else None,
             profile_completion=ProfileCompletionLevel.COMPLETE if obj_in.email else ProfileCompletionLevel.BASIC,
             account_created_via="password"
         )
@@ -125,7 +153,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             last_name=obj_in.last_name,
             full_name=obj_in.full_name,
             role=obj_in.role,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=await password_hasher.hash(obj_in.password),
             employee_id=None,  # Will be set after getting ID
             department_id=obj_in.department_id,
             profile_completion=ProfileCompletionLevel.COMPLETE,
@@ -170,9 +198,15 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         if not user.hashed_password:
             return None
 
-        if not verify_password(password, user.hashed_password):
+        verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not verified:
             return None
 
+        # Transparent rehash when BCRYPT_ROUNDS changed
+        if new_hash:
+            user.hashed_password = new_hash
+            await db.commit()
+
         return user
 
     async def update_profile(
@@ -259,6 +293,7 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
 
         if commit:
             await db.commit()
+            await principal_cache.invalidate_user(user_id)
             await db.refresh(user)
 
         return user
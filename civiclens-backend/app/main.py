@@ -1,7 +1,8 @@
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.httpsredirect import HTTPSRedirectMiddleware
-from app.core.middleware import SecurityHeadersMiddleware
+from app.core.middleware import SecurityHeadersMiddleware, RateLimitMiddleware
+from app.core.query_metrics import QueryMetricsMiddleware, install_query_instrumentation
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.exceptions import RequestValidationError
@@ -9,9 +10,10 @@ from pydantic import ValidationError
 from contextlib import asynccontextmanager
 from datetime import datetime
 import os
+from urllib.parse import urlparse
 import logging
 from app.config import settings
-from app.core.database import init_db, close_db, close_redis, check_redis_connection, check_database_connection
+from app.core.database import engine, init_db, close_db, close_redis, check_redis_connection, check_database_connection
 from app.core.exceptions import CivicLensException
 from app.api.v1 import auth, reports, reports_complete, analytics, users, departments, appeals, escalations, audit, media, feedbacks
 from app.api.v1.auth_extended import router as auth_extended
@@ -52,6 +54,12 @@ async def lifespan(app: FastAPI):
         print("✅ PostgreSQL - Connected")
         await init_db()
         print("✅ Database tables initialized")
+        try:
+            from app.services.audit_partition_service import ensure_partitions
+            await ensure_partitions()
+            print("✅ Audit log partitions ready")
+        except Exception as e:
+            print(f"⚠️  Audit log partitions: {e}")
     else:
         print("❌ PostgreSQL - Connection failed")
         print("⚠️  Server starting anyway, but database operations will fail")
@@ -65,31 +73,20 @@ async def lifespan(app: FastAPI):
         print("❌ Redis - Connection failed")
         print("⚠️  OTP functionality will not work without Redis")
     
-    # Check MinIO (required)
-    print("\n📦 Checking MinIO connection...")
-    minio_ok = False
+    # Check object storage (required)
+    print(f"\n📦 Checking {settings.STORAGE_BACKEND} storage...")
+    storage_ok = False
     try:
-        from minio import Minio
-        minio_client = Minio(
-            settings.MINIO_ENDPOINT,
-            access_key=settings.MINIO_ACCESS_KEY,
-            secret_key=settings.MINIO_SECRET_KEY,
-            secure=settings.MINIO_USE_SSL
-        )
-        # Try to check if bucket exists
-        bucket_exists = minio_client.bucket_exists(settings.MINIO_BUCKET)
-        if bucket_exists:
-            print(f"✅ MinIO - Connected (bucket '{settings.MINIO_BUCKET}' exists)")
-            minio_ok = True
+        from app.services.storage_service import get_storage_service
+        storage = await get_storage_service()
+        storage_ok = await storage.backend.is_available()
+        if storage_ok:
+            print(f"✅ Storage - Connected ({storage.backend.base_url})")
         else:
-            print(f"⚠️  MinIO - Connected but bucket '{settings.MINIO_BUCKET}' not found")
-            print(f"   Creating bucket '{settings.MINIO_BUCKET}'...")
-            minio_client.make_bucket(settings.MINIO_BUCKET)
-            print(f"✅ Bucket '{settings.MINIO_BUCKET}' created")
-            minio_ok = True
+            print(f"❌ Storage - {storage.backend.base_url} not reachable")
     except Exception as e:
-        print(f"❌ MinIO - Connection failed: {str(e)}")
-        print("   MinIO is required for file uploads")
+        print(f"❌ Storage - Connection failed: {str(e)}")
+        print("   Object storage is required for file uploads")
     
     # Summary
     print("\n" + "=" * 60)
@@ -97,26 +94,37 @@ async def lifespan(app: FastAPI):
     print("=" * 60)
     print(f"PostgreSQL: {'✅ Ready' if db_ok else '❌ Failed'}")
     print(f"Redis:      {'✅ Ready' if redis_ok else '❌ Failed'}")
-    print(f"MinIO:      {'✅ Ready' if minio_ok else '❌ Failed'}")
+    print(f"Storage:    {'✅ Ready' if storage_ok else '❌ Failed'}")
     print("=" * 60)
     
     if not db_ok:
         print("\n❌ Critical service failed. Application cannot start.")
         return
     
-    if not minio_ok:
-        print("\n❌ MinIO is required for file uploads. Application cannot start.")
+    if not storage_ok:
+        print("\n❌ Object storage is required for file uploads. Application cannot start.")
         return
     
     print("\n✅ All critical services are ready!")
+    
+    from app.core.audit_sink import audit_sink
+    audit_sink.start()
     print("\n🎉 CivicLens API startup complete!")
     
     yield
     
     # Shutdown
     print("\n🔄 Shutting down CivicLens API...")
+    from app.core.audit_sink import audit_sink
+    await audit_sink.stop()
+    from app.core.session_store import session_store
+    await session_store.stop()
     await close_db()
     await close_redis()
+    from app.core.password_hashing import password_hasher
+    password_hasher.shutdown()
+    from app.services.storage_service import close_storage_service
+    await close_storage_service()
     print("✅ Cleanup complete")
 
 
@@ -135,6 +143,10 @@ app = FastAPI(
 if settings.HTTPS_ONLY:
     app.add_middleware(HTTPSRedirectMiddleware)
 
+# Global rate limiting (inside CORS/security headers so 429s carry them)
+if settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_MIDDLEWARE_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 # Security Headers
 if settings.SECURITY_HEADERS_ENABLED:
     app.add_middleware(SecurityHeadersMiddleware)
@@ -148,8 +160,20 @@ app.add_middleware(
     allow_headers=settings.cors_headers_list,
 )
 
-# Note: Static file serving removed - using MinIO for all media files
-# All media files are now served directly from MinIO storage
+# Per-request SQL instrumentation (sampled; outermost so it sees the whole request)
+if settings.QUERY_METRICS_ENABLED:
+    install_query_instrumentation(engine)
+    app.add_middleware(QueryMetricsMiddleware)
+
+# Media files are served directly from MinIO storage; the local development
+# backend is served by the app itself
+if settings.STORAGE_BACKEND == "local":
+    os.makedirs(settings.LOCAL_STORAGE_PATH, exist_ok=True)
+    app.mount(
+        urlparse(settings.LOCAL_STORAGE_BASE_URL).path.rstrip("/") or "/media",
+        StaticFiles(directory=settings.LOCAL_STORAGE_PATH),
+        name="media",
+    )
 
 # Exception handlers
 @app.exception_handler(RequestValidationError)
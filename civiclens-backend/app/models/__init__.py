@@ -11,7 +11,7 @@ from app.models.report import Report, ReportStatus, ReportSeverity, ReportCatego
 from app.models.area_assignment import AreaAssignment
 from app.models.task import Task, TaskStatus
 from app.models.role_history import RoleHistory
-from app.models.media import Media
+from app.models.media import Media, MediaObject, MediaStorageUsage
 from app.models.appeal import Appeal, AppealType, AppealStatus
 from app.models.escalation import Escalation, EscalationLevel, EscalationReason, EscalationStatus
 from app.models.report_status_history import ReportStatusHistory
@@ -20,6 +20,7 @@ from app.models.audit_log import AuditLog, AuditAction, AuditStatus
 from app.models.notification import Notification, NotificationType, NotificationPriority
 from app.models.feedback import Feedback
 from app.models.validation import Validation
+from app.models.stats_rollup import StatsRollup, DepartmentStatsRollup, OfficerStatsRollup
 
 __all__ = [
     "BaseModel",
@@ -37,6 +38,8 @@ __all__ = [
     "TaskStatus",
     "RoleHistory",
     "Media",
+    "MediaObject",
+    "MediaStorageUsage",
     "Appeal",
     "AppealType",
     "AppealStatus",
@@ -56,4 +59,7 @@ __all__ = [
     "NotificationPriority",
     "Feedback",
     "Validation",
+    "StatsRollup",
+    "DepartmentStatsRollup",
+    "OfficerStatsRollup",
 ]
@@ -3,7 +3,7 @@ Audit Log Model (Priority 2)
 Tracks all security-relevant events for compliance and monitoring
 """
 
-from sqlalchemy import Column, String, Integer, Text, ForeignKey, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, String, Integer, Text, ForeignKey, DateTime, Index, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import JSONB
 from app.models.base import BaseModel
 from datetime import datetime
@@ -99,11 +99,23 @@ class AuditStatus(str, enum.Enum):
 
 
 class AuditLog(BaseModel):
-    """Audit log for security and compliance"""
+    """
+    Audit log for security and compliance
+    
+    Range-partitioned by month on ``timestamp`` (see
+    app.services.audit_partition_service); the primary key therefore
+    includes ``timestamp``. Queries should bound ``timestamp`` so Postgres
+    prunes to the relevant partitions.
+    """
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("idx_audit_user_timestamp", "user_id", "timestamp"),
+        Index("idx_audit_resource_timestamp", "resource_type", "resource_id", "timestamp"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
     
     # Who
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     user_role = Column(String(50), nullable=True)
     
     # What
@@ -119,7 +131,7 @@ class AuditLog(BaseModel):
     )
     
     # When
-    timestamp = Column(DateTime(timezone=True), default=datetime.utcnow, nullable=False, index=True)
+    timestamp = Column(DateTime(timezone=True), default=datetime.utcnow, primary_key=True, nullable=False, index=True)
     
     # Where
     ip_address = Column(String(45), nullable=True, index=True)  # IPv4 or IPv6
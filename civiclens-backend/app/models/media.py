@@ -1,8 +1,10 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Enum as SQLEnum, Boolean
+from sqlalchemy import Column, String, Integer, BigInteger, ForeignKey, Enum as SQLEnum, Boolean, DateTime, func
 from sqlalchemy.orm import relationship
+from app.core.database import Base
 from app.models.base import BaseModel
 from sqlalchemy.dialects.postgresql import JSONB
 import enum
+from typing import Optional
 
 
 class MediaType(str, enum.Enum):
@@ -32,9 +34,65 @@ class Media(BaseModel):
     caption = Column(String(500), nullable=True)
     meta = Column(JSONB, nullable=True)
     upload_source = Column(SQLEnum(UploadSource, native_enum=True, values_callable=lambda x: [e.value for e in x]), nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # sha256 of the uploaded bytes -> media_objects
+    phash = Column(BigInteger, nullable=True)  # 64-bit perceptual (DCT) hash of images, signed
+    dhash = Column(BigInteger, nullable=True)  # 64-bit gradient hash of images, signed
     
     # Relationships
     report = relationship("Report", back_populates="media")
     
+    def variant_url(self, variant: str) -> Optional[str]:
+        """
+        URL of a downscaled variant ("thumbnail", "medium"). Images stored
+        without variants fall back to the full-size URL; other media has none.
+        """
+        variants = (self.meta or {}).get('variants') or {}
+        if variant in variants:
+            return variants[variant]
+        return self.file_url if self.file_type == MediaType.IMAGE else None
+    
     def __repr__(self):
         return f"<Media(id={self.id}, report_id={self.report_id}, type={self.file_type})>"
+
+
+class MediaObject(Base):
+    """
+    Content-addressed stored object, keyed by the sha256 of the uploaded bytes.
+
+    Media rows with the same content share one object (and its resized
+    variants); ``ref_count`` is the number of Media rows referencing it. The
+    object is deleted from storage when the last reference is released.
+    """
+    __tablename__ = "media_objects"
+
+    content_hash = Column(String(64), primary_key=True)
+    file_url = Column(String(500), nullable=False)
+    mime_type = Column(String(100), nullable=True)
+    file_size = Column(Integer, nullable=True)  # Size in bytes (after processing)
+    variants = Column(JSONB, nullable=True)  # Variant name -> URL (images)
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<MediaObject(hash={self.content_hash}, refs={self.ref_count})>"
+
+
+class MediaStorageUsage(Base):
+    """
+    Incremental storage accounting: bytes and count of Media rows per scope
+    ("report" -> report id, "source" -> upload source, "total" -> "all").
+
+    Updated with deltas as media is added, deleted or re-encoded (see
+    app.services.storage_usage_service) and periodically reconciled
+    against the media table, so usage is read without listing the bucket.
+    """
+    __tablename__ = "media_storage_usage"
+
+    scope = Column(String(20), primary_key=True)
+    scope_key = Column(String(50), primary_key=True)
+    byte_count = Column(BigInteger, default=0, nullable=False)
+    object_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<MediaStorageUsage({self.scope}={self.scope_key}, bytes={self.byte_count})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Float, Integer, ForeignKey, Enum as SQLEnum, Index, DateTime, Boolean
+from sqlalchemy import Column, String, Text, Float, Integer, ForeignKey, Enum as SQLEnum, Index, DateTime, Boolean, text
 from sqlalchemy.orm import relationship
 from geoalchemy2 import Geography
 from app.models.base import BaseModel
@@ -132,6 +132,18 @@ class Report(BaseModel):
         Index('idx_report_location', 'latitude', 'longitude'),
         Index('idx_report_location_gist', 'location', postgresql_using='gist'),
         Index('idx_report_created', 'created_at'),
+        # Hot-query composites and partial indexes (migration 92a6f8c52a99)
+        Index('idx_report_dept_status_created', 'department_id', 'status', 'created_at'),
+        Index('idx_report_user_created', 'user_id', 'created_at'),
+        Index('idx_report_status_created', 'status', 'created_at'),
+        Index('idx_report_review_queue', 'ai_processed_at', postgresql_where=text('needs_review = true')),
+        Index('idx_report_ai_pending', 'created_at', postgresql_where=text('ai_processed_at IS NULL AND is_duplicate = false')),
+        Index('idx_report_ai_processed', 'ai_processed_at', postgresql_where=text('ai_processed_at IS NOT NULL')),
+        Index('idx_report_duplicates', 'duplicate_of_report_id', postgresql_where=text('is_duplicate = true')),
+        Index(
+            'idx_report_active_severity', 'severity', 'department_id',
+            postgresql_where=text("status NOT IN ('closed', 'resolved', 'rejected')"),
+        ),
     )
     
     def __repr__(self):
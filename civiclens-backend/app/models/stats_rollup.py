@@ -0,0 +1,57 @@
+from sqlalchemy import Column, String, Integer, ForeignKey, Float, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from app.core.database import Base
+
+
+class StatsRollup(Base):
+    """
+    Refresh state for each rollup kind ("dashboard", "public", "departments", "officers").
+
+    Scalar rollups (dashboard/public) keep their precomputed payload in ``data``;
+    per-entity rollups keep rows in their own tables and only use this row for
+    freshness tracking. ``source_generation`` is the "reports" cache generation
+    the rollup was computed at, so report writes mark rollups as dirty.
+    """
+    __tablename__ = "stats_rollups"
+
+    kind = Column(String(50), primary_key=True)
+    data = Column(JSONB, nullable=True)
+    source_generation = Column(Integer, nullable=True)
+    refreshed_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<StatsRollup(kind={self.kind}, refreshed_at={self.refreshed_at})>"
+
+
+class DepartmentStatsRollup(Base):
+    """Precomputed per-department statistics (one row per department)"""
+    __tablename__ = "department_stats_rollups"
+
+    department_id = Column(Integer, ForeignKey("departments.id", ondelete="CASCADE"), primary_key=True)
+    total_officers = Column(Integer, default=0, nullable=False)
+    active_officers = Column(Integer, default=0, nullable=False)
+    total_reports = Column(Integer, default=0, nullable=False)
+    pending_reports = Column(Integer, default=0, nullable=False)
+    in_progress_reports = Column(Integer, default=0, nullable=False)
+    resolved_reports = Column(Integer, default=0, nullable=False)
+    avg_resolution_time_days = Column(Float, nullable=True)
+    refreshed_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<DepartmentStatsRollup(department_id={self.department_id}, total_reports={self.total_reports})>"
+
+
+class OfficerStatsRollup(Base):
+    """Precomputed per-officer workload statistics (one row per active officer)"""
+    __tablename__ = "officer_stats_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    active_reports = Column(Integer, default=0, nullable=False)
+    resolved_reports = Column(Integer, default=0, nullable=False)
+    avg_resolution_time_days = Column(Float, nullable=True)
+    workload_score = Column(Float, default=0.0, nullable=False)
+    capacity_level = Column(String(20), default="low", nullable=False)
+    refreshed_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<OfficerStatsRollup(user_id={self.user_id}, active_reports={self.active_reports})>"
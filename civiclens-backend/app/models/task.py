@@ -52,6 +52,7 @@ class Task(BaseModel):
     __table_args__ = (
         Index('idx_task_officer_status', 'assigned_to', 'status'),
         Index('idx_task_priority', 'priority', 'status'),
+        Index('idx_task_status_resolved', 'status', 'resolved_at'),
     )
     
     def __repr__(self):
@@ -5,7 +5,7 @@ Pydantic models for media upload and response
 """
 
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 
@@ -14,6 +14,8 @@ class MediaResponse(BaseModel):
     id: int
     report_id: int
     file_url: str
+    thumbnail_url: Optional[str] = None  # ~320px WebP, for lists and map popups
+    medium_url: Optional[str] = None  # ~1024px WebP, for feeds and detail views
     file_type: str
     file_size: Optional[int] = None
     mime_type: Optional[str] = None
@@ -35,6 +37,50 @@ class BulkUploadResponse(BaseModel):
     errors: List[str] = []
 
 
+class DirectUploadFile(BaseModel):
+    """A file the client will upload straight to storage"""
+    filename: str = Field(..., max_length=255)
+    content_type: str = Field(..., description="MIME type the file will be uploaded with")
+    size: int = Field(..., gt=0, description="Size in bytes")
+    caption: Optional[str] = Field(None, max_length=500)
+    is_primary: bool = False
+    upload_source: Optional[str] = None
+    is_proof_of_work: bool = False
+
+
+class DirectUploadRequest(BaseModel):
+    """Request model for presigned direct uploads"""
+    files: List[DirectUploadFile] = Field(..., min_length=1, max_length=6)
+
+
+class DirectUploadTarget(BaseModel):
+    """Where and how to POST one file"""
+    upload_id: str
+    filename: str
+    url: str  # POST as multipart/form-data: all fields, then the file as "file"
+    fields: Dict[str, Any]
+    max_size: int
+
+
+class DirectUploadResponse(BaseModel):
+    """Response model for presigned direct uploads"""
+    uploads: List[DirectUploadTarget]
+    expires_in: int
+
+
+class FinalizeUploadRequest(BaseModel):
+    """Request model for finalizing direct uploads"""
+    upload_ids: List[str] = Field(..., min_length=1, max_length=6)
+
+
+class UploadStatusResponse(BaseModel):
+    """State of a direct upload: pending, processing, completed or failed"""
+    upload_id: str
+    status: str
+    media_id: Optional[int] = None
+    error: Optional[str] = None
+
+
 class MediaListResponse(BaseModel):
     """Response model for media list"""
     media: List[MediaResponse]
@@ -135,6 +135,8 @@ class AIConfig:
     DUPLICATE_GEO_RADIUS_METERS = 200  # 200m radius default
     DUPLICATE_TIME_WINDOW_DAYS = 30  # Check reports from last 30 days
     DUPLICATE_HIGH_CONFIDENCE_THRESHOLD = 0.90  # ≥90% = auto-mark, <90% = needs review
+    DUPLICATE_IMAGE_PHASH_THRESHOLD = 10  # Max pHash Hamming distance (of 64 bits) for a matching photo
+    DUPLICATE_IMAGE_DHASH_THRESHOLD = 12  # ...and max dHash distance (both must hold)
     
     # Category-Specific Geo Radius (for better duplicate detection)
     CATEGORY_GEO_RADIUS = {
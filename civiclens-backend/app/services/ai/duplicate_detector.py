@@ -1,19 +1,23 @@
 """
 Duplicate Detection using Semantic Similarity + Geospatial Proximity
-Combines Sentence-BERT embeddings with PostGIS spatial queries
+Combines Sentence-BERT embeddings with PostGIS spatial queries, plus a
+perceptual-hash photo match (Hamming distance) within the same window
 """
 
 import logging
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, and_, func, cast
+from sqlalchemy.dialects.postgresql import BIT
+from sqlalchemy.orm import aliased
 from sentence_transformers import SentenceTransformer, util
 from geoalchemy2.functions import ST_DWithin, ST_MakePoint
 import numpy as np
 import torch
 from app.services.ai.gpu_manager import GPUManager
 
+from app.models.media import Media
 from app.models.report import Report, ReportStatus
 from app.services.ai.config import AIConfig
 
@@ -24,8 +28,9 @@ class DuplicateDetector:
     """
     Detects duplicate reports using:
     1. Semantic similarity (Sentence-BERT)
-    2. Geospatial proximity (PostGIS)
-    3. Temporal window
+    2. Photo similarity (pHash/dHash Hamming distance)
+    3. Geospatial proximity (PostGIS)
+    4. Temporal window
     """
     
     def __init__(self):
@@ -111,7 +116,42 @@ class DuplicateDetector:
             
             logger.info(f"Found {len(nearby_reports)} nearby reports")
             
-            # Step 2: Semantic similarity check
+            # Step 2: Photo match - a cheap query, no model inference
+            if report_id:
+                image_match = await self._find_image_match(
+                    db, report_id, [r.id for r in nearby_reports]
+                )
+                if image_match:
+                    match_id, distance = image_match
+                    best_match = next(r for r in nearby_reports if r.id == match_id)
+                    similarity = 1 - distance / 64
+                    
+                    logger.info(
+                        f"Duplicate detected! Matching photo in report {best_match.id} "
+                        f"(pHash distance: {distance})"
+                    )
+                    
+                    return {
+                        "is_duplicate": True,
+                        "duplicate_of": best_match.id,
+                        "similarity": round(similarity, 3),
+                        "distance_meters": radius_meters,  # Approximate
+                        "match_type": "image",
+                        "image_distance": distance,
+                        "explanation": (
+                            f"Matching photo found (Report #{best_match.report_number or best_match.id}). "
+                            f"{distance} of 64 hash bits differ, within {radius_meters}m radius."
+                        ),
+                        "original_report": {
+                            "id": best_match.id,
+                            "report_number": best_match.report_number,
+                            "title": best_match.title,
+                            "status": best_match.status.value,
+                            "created_at": best_match.created_at.isoformat()
+                        }
+                    }
+            
+            # Step 3: Semantic similarity check
             query_text = f"{title}. {description}"
             
             # Batch encode - much faster on GPU
@@ -142,7 +182,7 @@ class DuplicateDetector:
             best_similarity = cosine_scores[best_score_idx].item()
             best_match = nearby_reports[best_score_idx]
             
-            # Step 3: Determine if duplicate
+            # Step 4: Determine if duplicate
             is_duplicate = best_similarity >= AIConfig.DUPLICATE_SIMILARITY_THRESHOLD
             
             if is_duplicate and best_match:
@@ -156,6 +196,7 @@ class DuplicateDetector:
                     "duplicate_of": best_match.id,
                     "similarity": round(best_similarity, 3),
                     "distance_meters": radius_meters,  # Approximate
+                    "match_type": "text",
                     "explanation": (
                         f"Similar report found (Report #{best_match.report_number or best_match.id}). "
                         f"Similarity: {best_similarity:.0%}, within {radius_meters}m radius."
@@ -246,6 +287,48 @@ class DuplicateDetector:
             logger.error(f"Spatial query error: {str(e)}", exc_info=True)
             return []
     
+    async def _find_image_match(
+        self,
+        db: AsyncSession,
+        report_id: int,
+        candidate_ids: List[int]
+    ) -> Optional[Tuple[int, int]]:
+        """
+        (report id, pHash distance) of the candidate report with the closest
+        photo to one of this report's photos, if within both hash thresholds.
+        Hamming distance is computed in PostgreSQL (bit_count of the XOR).
+        """
+        try:
+            new_media = aliased(Media)
+            old_media = aliased(Media)
+            phash_distance = func.bit_count(cast(new_media.phash.op('#')(old_media.phash), BIT(64)))
+            dhash_distance = func.bit_count(cast(new_media.dhash.op('#')(old_media.dhash), BIT(64)))
+            
+            query = (
+                select(old_media.report_id, func.min(phash_distance).label("distance"))
+                .select_from(new_media)
+                .join(old_media, old_media.report_id.in_(candidate_ids))
+                .where(
+                    new_media.report_id == report_id,
+                    new_media.phash.isnot(None),
+                    old_media.phash.isnot(None),
+                    phash_distance <= AIConfig.DUPLICATE_IMAGE_PHASH_THRESHOLD,
+                    dhash_distance <= AIConfig.DUPLICATE_IMAGE_DHASH_THRESHOLD
+                )
+                .group_by(old_media.report_id)
+                .order_by(func.min(phash_distance))
+                .limit(1)
+            )
+            
+            # Savepoint: a failed query must not abort the pipeline's transaction
+            async with db.begin_nested():
+                row = (await db.execute(query)).first()
+            return (row.report_id, int(row.distance)) if row else None
+            
+        except Exception as e:
+            logger.error(f"Image match query error: {str(e)}", exc_info=True)
+            return None
+    
     def _cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """Calculate cosine similarity between two vectors"""
         dot_product = np.dot(vec1, vec2)
@@ -170,7 +170,11 @@ class AIProcessingPipeline:
                     if duplicate_result["is_duplicate"]:
                         # Determine if needs urgent review based on similarity confidence
                         similarity = duplicate_result.get("similarity", 1.0)
-                        needs_review = similarity < AIConfig.DUPLICATE_HIGH_CONFIDENCE_THRESHOLD  # Low confidence duplicates need review
+                        needs_review = (
+                            similarity < AIConfig.DUPLICATE_HIGH_CONFIDENCE_THRESHOLD  # Low confidence duplicates need review
+                            # Photo matches are not on the text-similarity scale: always reviewed
+                            or duplicate_result.get("match_type") == "image"
+                        )
                         
                         # Update report: mark as duplicate
                         await report_crud.update(db, report_id, ReportUpdate(
@@ -0,0 +1,188 @@
+"""
+Audit Partition Service
+Manages monthly range partitions of the audit_logs table
+
+audit_logs is partitioned by RANGE (timestamp), one partition per calendar
+month (UTC) named ``audit_logs_pYYYY_MM``, plus ``audit_logs_default`` as a
+safety net for rows outside every partition.
+
+- ``ensure_partitions`` creates the current month and the next
+  AUDIT_PARTITION_PREMAKE_MONTHS months ahead of time. Rows that already
+  landed in the default partition for that range are moved into the new one.
+- ``apply_retention`` removes partitions entirely older than
+  AUDIT_LOG_RETENTION_DAYS: detached and moved to the AUDIT_ARCHIVE_SCHEMA
+  schema ("detach", default) or dropped ("drop").
+
+Both run periodically from app.workers.audit_partition_worker (first pass at
+its startup). The API additionally runs ``ensure_partitions`` once at startup.
+"""
+
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import settings
+from app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "audit_logs"
+DEFAULT_PARTITION = f"{PARENT_TABLE}_default"
+_PARTITION_NAME_RE = re.compile(rf"^{PARENT_TABLE}_p(\d{{4}})_(\d{{2}})$")
+
+
+def month_start(dt: datetime) -> datetime:
+    """First instant (UTC) of the month containing ``dt``"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    dt = dt.astimezone(timezone.utc)
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(dt: datetime, months: int) -> datetime:
+    """Shift a month start by ``months`` (may be negative)"""
+    index = dt.year * 12 + (dt.month - 1) + months
+    return dt.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f"{PARENT_TABLE}_p{start.year:04d}_{start.month:02d}"
+
+
+def retention_horizon(now: Optional[datetime] = None) -> datetime:
+    """Oldest timestamp still kept online"""
+    now = now or datetime.now(timezone.utc)
+    return now - timedelta(days=settings.AUDIT_LOG_RETENTION_DAYS)
+
+
+async def _is_partitioned(conn: AsyncConnection) -> bool:
+    relkind = await conn.scalar(
+        text("SELECT c.relkind FROM pg_class c WHERE c.oid = to_regclass(:name)"),
+        {"name": PARENT_TABLE},
+    )
+    return relkind == "p"
+
+
+async def list_partitions(conn: AsyncConnection) -> Dict[str, datetime]:
+    """Attached monthly partitions -> month start"""
+    rows = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:parent)"
+        ),
+        {"parent": PARENT_TABLE},
+    )
+    partitions = {}
+    for (name,) in rows:
+        match = _PARTITION_NAME_RE.match(name)
+        if match:
+            partitions[name] = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+    return partitions
+
+
+async def _create_partition(conn: AsyncConnection, start: datetime):
+    end = add_months(start, 1)
+    name = partition_name(start)
+    bounds = {"start": start, "end": end}
+
+    # A new partition cannot overlap rows sitting in the default partition
+    has_default = await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION})
+    stray = 0
+    if has_default:
+        stray = await conn.scalar(
+            text(f'SELECT count(*) FROM {DEFAULT_PARTITION} WHERE "timestamp" >= :start AND "timestamp" < :end'),
+            bounds,
+        )
+
+    if stray:
+        await conn.execute(text(f"CREATE TEMP TABLE _audit_stray ON COMMIT DROP AS SELECT * FROM {DEFAULT_PARTITION} WITH NO DATA"))
+        await conn.execute(
+            text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+                f'WHERE "timestamp" >= :start AND "timestamp" < :end RETURNING *) '
+                "INSERT INTO _audit_stray SELECT * FROM moved"
+            ),
+            bounds,
+        )
+
+    await conn.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    )
+
+    if stray:
+        await conn.execute(text(f"INSERT INTO {PARENT_TABLE} SELECT * FROM _audit_stray"))
+        await conn.execute(text("DROP TABLE _audit_stray"))
+        logger.info(f"Moved {stray} audit rows from {DEFAULT_PARTITION} into {name}")
+
+    logger.info(f"Created audit partition {name}")
+
+
+async def ensure_partitions(now: Optional[datetime] = None) -> List[str]:
+    """Create missing partitions for this month and the premake window"""
+    now = now or datetime.now(timezone.utc)
+    created = []
+
+    async with engine.begin() as conn:
+        if not await _is_partitioned(conn):
+            logger.warning(f"{PARENT_TABLE} is not partitioned; run the alembic migrations")
+            return created
+
+        await conn.execute(
+            text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT")
+        )
+        existing = await list_partitions(conn)
+
+        first = month_start(now)
+        for offset in range(settings.AUDIT_PARTITION_PREMAKE_MONTHS + 1):
+            start = add_months(first, offset)
+            name = partition_name(start)
+            if name in existing:
+                continue
+            await _create_partition(conn, start)
+            created.append(name)
+
+    return created
+
+
+async def apply_retention(now: Optional[datetime] = None) -> List[str]:
+    """Detach (and archive) or drop partitions older than the retention window"""
+    horizon = retention_horizon(now)
+    action = settings.AUDIT_PARTITION_RETENTION_ACTION
+    removed = []
+
+    async with engine.begin() as conn:
+        if not await _is_partitioned(conn):
+            return removed
+
+        partitions = await list_partitions(conn)
+        if action == "detach":
+            await conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {settings.AUDIT_ARCHIVE_SCHEMA}"))
+
+        for name, start in sorted(partitions.items(), key=lambda item: item[1]):
+            if add_months(start, 1) > horizon:
+                break
+            await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            if action == "drop":
+                await conn.execute(text(f"DROP TABLE {name}"))
+                logger.info(f"Dropped expired audit partition {name}")
+            else:
+                await conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {settings.AUDIT_ARCHIVE_SCHEMA}"))
+                logger.info(f"Archived expired audit partition {name} to schema {settings.AUDIT_ARCHIVE_SCHEMA}")
+            removed.append(name)
+
+    return removed
+
+
+async def maintain_audit_partitions() -> Dict[str, List[str]]:
+    """Create upcoming partitions and enforce retention"""
+    created = await ensure_partitions()
+    removed = await apply_retention()
+    return {"created": created, "removed": removed}
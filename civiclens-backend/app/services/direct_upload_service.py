@@ -0,0 +1,298 @@
+"""
+Direct Upload Service
+Two-phase uploads that keep media bytes off the API workers
+
+1. ``create_uploads``: the report, media limits and the declared type and
+   size are checked, and each file gets a presigned POST policy (content type
+   fixed, size capped). The client uploads straight to storage under
+   DIRECT_UPLOAD_PREFIX.
+2. ``finalize``: the client confirms the uploads. Objects are checked for
+   existence, claimed and queued on queue:direct_uploads. The direct upload
+   worker (app.workers.direct_upload_worker) then validates and hashes each
+   object with one streamed read, copies it server-side to its
+   content-addressed key and adds the Media row (``process_uploads``, through
+   FileUploadService as for multipart uploads); images are then queued for
+   the media worker. Clients poll ``get_statuses``. Upload bytes never pass
+   through the API processes.
+
+Upload records live in Redis (media:upload:<id>) for a day. Objects that are
+never finalized are removed by the storage lifecycle rule. A finalize claim
+lasts DIRECT_UPLOAD_CLAIM_SECONDS and is renewed as each upload starts
+processing; if the worker dies mid-way the upload is requeued when it
+restarts, or the claim lapses and the next finalize call picks it up again.
+"""
+
+import json
+import logging
+import uuid
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import UploadFile
+
+from app.config import settings
+from app.core.audit_logger import audit_logger
+from app.core.background_tasks import queue_media_for_processing_bg
+from app.core.database import get_redis
+from app.core.exceptions import NotFoundException, ValidationException
+from app.models.audit_log import AuditAction, AuditStatus
+from app.models.media import UploadSource
+from app.schemas.media import DirectUploadFile
+from app.services.file_upload_service import FileUploadService, OFFICER_PHOTO_SOURCES
+from app.services.media_processing_service import unprocessed_media_ids
+
+logger = logging.getLogger(__name__)
+
+DIRECT_UPLOAD_QUEUE = "queue:direct_uploads"
+DIRECT_UPLOAD_INFLIGHT_QUEUE = "queue:direct_uploads:inflight"  # Taken by a worker, not yet done
+
+
+async def enqueue_direct_uploads(upload_ids: List[str]):
+    """Queue claimed uploads for the direct upload worker"""
+    if not upload_ids:
+        return
+    redis = await get_redis()
+    await redis.lpush(DIRECT_UPLOAD_QUEUE, *upload_ids)
+
+
+class DirectUploadService:
+    """Presigned direct uploads and their finalization"""
+
+    RECORD_TTL = 24 * 3600  # Seconds an upload record is kept
+    SPOOL_SIZE = 2 * 1024 * 1024  # Downloads larger than this spill to a temp file
+
+    def __init__(self, upload_service: FileUploadService):
+        self.uploads = upload_service
+        self.storage = upload_service.storage
+
+    @staticmethod
+    def _key(upload_id: str) -> str:
+        return f"media:upload:{upload_id}"
+
+    @classmethod
+    def _claim_key(cls, upload_id: str) -> str:
+        return f"{cls._key(upload_id)}:claim"
+
+    async def _load(self, upload_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        redis = await get_redis()
+        values = await redis.mget([self._key(upload_id) for upload_id in upload_ids])
+        return [json.loads(value) if value else None for value in values]
+
+    async def _save(self, *records: Dict[str, Any]):
+        redis = await get_redis()
+        async with redis.pipeline(transaction=False) as pipe:
+            for record in records:
+                pipe.set(self._key(record['upload_id']), json.dumps(record), ex=self.RECORD_TTL)
+            await pipe.execute()
+
+    def _file_type(self, file: DirectUploadFile) -> Tuple[str, int]:
+        """(file_type, max_size) for a declared file"""
+        if file.content_type in self.uploads.ALLOWED_IMAGE_TYPES:
+            file_type, allowed, max_size = 'image', self.uploads.ALLOWED_IMAGE_TYPES, self.uploads.MAX_IMAGE_SIZE
+        elif file.content_type in self.uploads.ALLOWED_AUDIO_TYPES:
+            file_type, allowed, max_size = 'audio', self.uploads.ALLOWED_AUDIO_TYPES, self.uploads.MAX_AUDIO_SIZE
+        else:
+            raise ValidationException(f"Unsupported file type: {file.content_type}")
+
+        file_ext = Path(file.filename).suffix.lower()
+        if file_ext not in allowed[file.content_type]:
+            raise ValidationException(f"File extension {file_ext} doesn't match type {file.content_type}")
+        if file.size > max_size:
+            raise ValidationException(f"{file.filename} too large. Maximum size: {max_size // (1024*1024)}MB")
+        return file_type, max_size
+
+    @staticmethod
+    def _upload_source(value: Optional[str]) -> Optional[UploadSource]:
+        if not value:
+            return None
+        try:
+            return UploadSource(value)
+        except ValueError:
+            raise ValidationException(f"Invalid upload_source: {value}. Must be one of: citizen_submission, officer_before_photo, officer_after_photo")
+
+    async def create_uploads(
+        self,
+        report_id: int,
+        user_id: int,
+        files: List[DirectUploadFile]
+    ) -> List[Dict[str, Any]]:
+        """Presigned POST targets for ``files``; raises if any file is not acceptable"""
+        counts = await self.uploads.get_media_counts(report_id)
+        records = []
+        targets = []
+
+        for file in files:
+            file_type, max_size = self._file_type(file)
+            upload_source = self._upload_source(file.upload_source)
+
+            # Limits include the files requested before this one
+            self.uploads._check_media_limit(counts, file_type, upload_source)
+            if file_type == 'audio':
+                counts['audio'] += 1
+            elif upload_source in OFFICER_PHOTO_SOURCES:
+                counts['officer_image'] += 1
+            else:
+                counts['citizen_image'] += 1
+
+            upload_id = uuid.uuid4().hex
+            object_name = f"{settings.DIRECT_UPLOAD_PREFIX}/{user_id}/{upload_id}{Path(file.filename).suffix.lower()}"
+            presigned = self.storage.presign_upload(
+                object_name, file.content_type, max_size, settings.DIRECT_UPLOAD_EXPIRE_SECONDS
+            )
+
+            records.append({
+                'upload_id': upload_id,
+                'report_id': report_id,
+                'user_id': user_id,
+                'object_name': object_name,
+                'filename': file.filename,
+                'file_type': file_type,
+                'max_size': max_size,
+                'caption': file.caption,
+                'is_primary': file.is_primary,
+                'upload_source': upload_source.value if upload_source else None,
+                'is_proof_of_work': file.is_proof_of_work,
+                'status': 'pending',
+                'media_id': None,
+                'error': None,
+            })
+            targets.append({
+                'upload_id': upload_id,
+                'filename': file.filename,
+                'url': presigned['url'],
+                'fields': presigned['fields'],
+                'max_size': max_size,
+            })
+
+        await self._save(*records)
+        return targets
+
+    async def _get_records(self, report_id: int, user_id: int, upload_ids: List[str]) -> List[Dict[str, Any]]:
+        records = await self._load(upload_ids)
+        for upload_id, record in zip(upload_ids, records):
+            if record is None or record['report_id'] != report_id or record['user_id'] != user_id:
+                raise NotFoundException(f"Upload not found: {upload_id}")
+        return records
+
+    async def get_statuses(self, report_id: int, user_id: int, upload_ids: List[str]) -> List[Dict[str, Any]]:
+        """Current state of uploads"""
+        records = await self._get_records(report_id, user_id, upload_ids)
+        return [self._status(record) for record in records]
+
+    @staticmethod
+    def _status(record: Dict[str, Any], error: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            'upload_id': record['upload_id'],
+            'status': record['status'],
+            'media_id': record['media_id'],
+            'error': error or record['error'],
+        }
+
+    async def finalize(
+        self,
+        report_id: int,
+        user_id: int,
+        upload_ids: List[str]
+    ) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Claim uploaded objects and queue them for processing.
+        Returns (statuses, claimed upload ids). Uploads whose object is not
+        in storage yet stay pending; repeated calls are no-ops while a claim
+        is held. Uploads left 'processing' by a process that died are
+        claimed again once their claim has lapsed.
+        """
+        records = await self._get_records(report_id, user_id, list(dict.fromkeys(upload_ids)))
+        pending = [record for record in records if record['status'] in ('pending', 'processing')]
+        infos = await self.storage.get_files_info([
+            self.storage.get_public_url(record['object_name']) for record in pending
+        ])
+
+        redis = await get_redis()
+        claimed = []
+        errors = {}
+        for record in pending:
+            if infos.get(self.storage.get_public_url(record['object_name'])) is None:
+                errors[record['upload_id']] = "File has not been uploaded"
+                continue
+            # Only one finalize call processes an upload
+            if not await redis.set(
+                self._claim_key(record['upload_id']), "1", nx=True, ex=settings.DIRECT_UPLOAD_CLAIM_SECONDS
+            ):
+                continue
+            if record['status'] == 'processing':
+                logger.warning(f"Direct upload {record['upload_id']}: stale claim, processing again")
+            record['status'] = 'processing'
+            claimed.append(record)
+
+        if claimed:
+            await self._save(*claimed)
+            await enqueue_direct_uploads([record['upload_id'] for record in claimed])
+
+        statuses = [self._status(record, errors.get(record['upload_id'])) for record in records]
+        return statuses, [record['upload_id'] for record in claimed]
+
+    async def process_uploads(self, upload_ids: List[str]):
+        """
+        Validate and register claimed uploads (direct upload worker).
+        Each object is read once to validate and hash it, then copied
+        server-side to its content-addressed key. Each upload is committed on
+        its own; the uploaded object is removed either way.
+        """
+        db = self.uploads.db
+        redis = await get_redis()
+        for record in await self._load(upload_ids):
+            if record is None or record['status'] != 'processing':
+                continue
+
+            # Uploads later in the batch must not look abandoned meanwhile
+            await redis.set(self._claim_key(record['upload_id']), "1", ex=settings.DIRECT_UPLOAD_CLAIM_SECONDS)
+
+            try:
+                with SpooledTemporaryFile(max_size=self.SPOOL_SIZE) as buffer:
+                    await self.storage.read_object(record['object_name'], buffer, record['max_size'])
+                    buffer.seek(0)
+                    media = await self.uploads.upload_file(
+                        file=UploadFile(file=buffer, filename=record['filename']),
+                        report_id=record['report_id'],
+                        user_id=record['user_id'],
+                        file_type=record['file_type'],
+                        caption=record['caption'],
+                        is_primary=record['is_primary'],
+                        upload_source=self._upload_source(record['upload_source']),
+                        is_proof_of_work=record['is_proof_of_work'],
+                        source_object=record['object_name']
+                    )
+                await db.commit()
+
+                await audit_logger.log(
+                    db=db,
+                    action=AuditAction.MEDIA_UPLOADED,
+                    status=AuditStatus.SUCCESS,
+                    user_id=record['user_id'],
+                    description=f"Uploaded {record['file_type']} file to report #{record['report_id']}",
+                    metadata={
+                        "report_id": record['report_id'],
+                        "media_id": media.id,
+                        "file_type": record['file_type'],
+                        "file_size": media.file_size,
+                        "filename": record['filename'],
+                        "direct_upload": True
+                    },
+                    resource_type="media",
+                    resource_id=str(media.id)
+                )
+                record.update(status='completed', media_id=media.id)
+                await queue_media_for_processing_bg(unprocessed_media_ids([media]))
+
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Direct upload {record['upload_id']} failed: {e}")
+                record.update(
+                    status='failed',
+                    error=e.detail if isinstance(e, ValidationException) else "Processing failed"
+                )
+
+            finally:
+                await self.storage.delete_object(record['object_name'])
+                await self._save(record)
@@ -5,27 +5,28 @@ Handles secure file uploads with validation, processing, and storage
 """
 
 import os
-import uuid
 import hashlib
 import mimetypes
-from typing import List, Optional, Dict, Any, BinaryIO, Tuple
+from typing import List, Optional, Dict, Any, BinaryIO, Tuple, Union
+from collections import Counter
 from pathlib import Path
 import asyncio
 from datetime import datetime, timedelta
 import aiofiles
 from PIL import Image
-import io
 
 from fastapi import UploadFile, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update, delete, case
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from app.models.media import Media, MediaType, UploadSource
+from app.models.media import Media, MediaObject, MediaType, UploadSource
 from app.models.report import Report
 from app.core.exceptions import ValidationException, ForbiddenException
 from app.core.database import get_db
 from app.config import settings
 from app.services.storage_service import get_storage_service, StorageService
+from app.services.storage_usage_service import apply_usage, usage_entries
 import logging
 
 # Handle different python-magic installations
@@ -46,6 +47,8 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+OFFICER_PHOTO_SOURCES = (UploadSource.OFFICER_BEFORE_PHOTO, UploadSource.OFFICER_AFTER_PHOTO)
+
 
 class FileUploadService:
     """Comprehensive file upload service with validation and processing"""
@@ -72,11 +75,18 @@ class FileUploadService:
     MAX_IMAGES_PER_REPORT = 5
     MAX_AUDIO_PER_REPORT = 1
     
+    # Streaming validation
+    SNIFF_BYTES = 64 * 1024  # Leading bytes used for MIME detection
+    READ_CHUNK_SIZE = 1024 * 1024
+    
     # Image processing settings
     MAX_IMAGE_DIMENSION = 2048
     JPEG_QUALITY = 85
     WEBP_QUALITY = 80
     
+    # Downscaled WebP variants stored next to each image (name -> max dimension)
+    IMAGE_VARIANTS = {'thumbnail': 320, 'medium': 1024}
+    
     def __init__(self, db: AsyncSession, storage_service: StorageService):
         self.db = db
         self.storage = storage_service
@@ -113,11 +123,41 @@ class FileUploadService:
         
         return detected_mime
         
+    @staticmethod
+    def _read_image_header(stream: BinaryIO) -> Tuple[str, Tuple[int, int]]:
+        """Format and size from the image header (no pixel decoding)"""
+        stream.seek(0)
+        image = Image.open(stream)
+        return image.format, image.size
+    
+    async def _scan_file(self, file: UploadFile, max_size: int) -> Tuple[bytes, int, str]:
+        """
+        Stream the upload once in READ_CHUNK_SIZE chunks.
+        Returns (head, size, sha256): the first SNIFF_BYTES for MIME detection,
+        the size (stops counting just past max_size) and the incremental hash.
+        """
+        await file.seek(0)
+        head = await file.read(self.SNIFF_BYTES)
+        digest = hashlib.sha256(head)
+        size = len(head)
+        
+        while size <= max_size:
+            chunk = await file.read(self.READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+        
+        await file.seek(0)  # Reset for later use
+        return head, size, digest.hexdigest()
+    
     async def validate_file(self, file: UploadFile, expected_type: str) -> Dict[str, Any]:
-        """Comprehensive file validation"""
+        """
+        Comprehensive file validation
         
-        # Reset file pointer
-        await file.seek(0)
+        The file is streamed once (never held in memory as a whole): the MIME
+        type is sniffed from its first bytes and the hash is computed per chunk.
+        """
         
         # Determine max size based on expected type
         if expected_type == 'image':
@@ -129,17 +169,13 @@ class FileUploadService:
         else:
             raise ValidationException(f"Unsupported file type: {expected_type}")
 
-        # Read file content with size limit + 1 byte to check for overflow
-        # This prevents loading huge files into memory (DoS protection)
-        content = await file.read(max_size + 1)
-        await file.seek(0)  # Reset for later use
+        # Reading stops just past the size limit (DoS protection)
+        head, file_size, file_hash = await self._scan_file(file, max_size)
         
-        if not content:
+        if not head:
             raise ValidationException("File is empty")
         
         # File size validation
-        file_size = len(content)
-
         if file_size > max_size:
             if expected_type == 'image':
                 raise ValidationException(f"Image file too large. Maximum size: {self.MAX_IMAGE_SIZE // (1024*1024)}MB")
@@ -149,14 +185,14 @@ class FileUploadService:
         # MIME type validation using python-magic
         if HAS_MAGIC and magic is not None:
             try:
-                detected_mime = magic.from_buffer(content, mime=True)
+                detected_mime = magic.from_buffer(head, mime=True)
             except Exception as e:
                 logger.error(f"MIME type detection failed: {e}")
                 # Fallback to basic validation
-                detected_mime = self._detect_mime_fallback(file.filename, content)
+                detected_mime = self._detect_mime_fallback(file.filename, head)
         else:
             # Use fallback method when magic is not available
-            detected_mime = self._detect_mime_fallback(file.filename, content)
+            detected_mime = self._detect_mime_fallback(file.filename, head)
         
         # Validate against allowed types
         if detected_mime not in allowed_types:
@@ -174,8 +210,11 @@ class FileUploadService:
         # Additional validation for images
         if expected_type == 'image':
             try:
-                image = Image.open(io.BytesIO(content))
-                width, height = image.size
+                loop = asyncio.get_running_loop()
+                image_format, (width, height) = await loop.run_in_executor(
+                    None, self._read_image_header, file.file
+                )
+                await file.seek(0)
                 
                 # Validate image dimensions
                 if width < 100 or height < 100:
@@ -185,8 +224,8 @@ class FileUploadService:
                     raise ValidationException("Image too large. Maximum size: 10000x10000 pixels")
                 
                 # Validate image format
-                if image.format.upper() not in ['JPEG', 'PNG', 'WEBP']:
-                    raise ValidationException(f"Unsupported image format: {image.format}")
+                if not image_format or image_format.upper() not in ['JPEG', 'PNG', 'WEBP']:
+                    raise ValidationException(f"Unsupported image format: {image_format}")
                 
             except Exception as e:
                 if isinstance(e, ValidationException):
@@ -194,192 +233,338 @@ class FileUploadService:
                 logger.error(f"Image validation failed: {e}")
                 raise ValidationException("Invalid or corrupted image file")
         
-        # Generate file hash for deduplication
-        file_hash = hashlib.sha256(content).hexdigest()
-        
-        return {
+        result = {
             'size': file_size,
             'mime_type': detected_mime,
             'hash': file_hash,
             'extension': file_ext,
             'is_valid': True
         }
+        
+        return result
     
-    @staticmethod
-    def _process_image_sync(
-        content: bytes,
-        mime_type: str,
-        max_dimension: int,
-        jpeg_quality: int,
-        webp_quality: int
-    ) -> Tuple[bytes, str, Optional[str]]:
+    async def get_media_counts(self, report_id: int) -> Dict[str, int]:
         """
-        Synchronous image processing logic to run in executor.
-        Returns: (processed_content, final_mime_type, final_extension)
-        final_extension is None if it wasn't changed.
+        Existing media for a report in one grouped query:
+        {'citizen_image', 'officer_image', 'audio'}
         """
-        # Open image
-        image = Image.open(io.BytesIO(content))
-
-        # Convert to RGB if necessary (for JPEG compatibility)
-        if image.mode in ('RGBA', 'LA', 'P'):
-            # Create white background for transparency
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            if image.mode == 'P':
-                image = image.convert('RGBA')
-            background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
-            image = background
-
-        # Resize if too large
-        width, height = image.size
-        if width > max_dimension or height > max_dimension:
-            # Calculate new dimensions maintaining aspect ratio
-            ratio = min(max_dimension / width, max_dimension / height)
-            new_width = int(width * ratio)
-            new_height = int(height * ratio)
-
-            image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            logger.info(f"Resized image from {width}x{height} to {new_width}x{new_height}")
-
-        # Save optimized image
-        output = io.BytesIO()
-        final_mime_type = mime_type
-        final_extension = None
-
-        # Choose optimal format
-        if mime_type == 'image/png' and image.mode == 'RGB':
-            # Convert PNG to JPEG if no transparency
-            image.save(output, format='JPEG', quality=jpeg_quality, optimize=True)
-            final_mime_type = 'image/jpeg'
-            final_extension = '.jpg'
-        elif mime_type == 'image/webp':
-            image.save(output, format='WEBP', quality=webp_quality, optimize=True)
-        else:
-            # Keep original format but optimize
-            format_map = {'image/jpeg': 'JPEG', 'image/png': 'PNG'}
-            format_name = format_map.get(mime_type, 'JPEG')
-
-            if format_name == 'JPEG':
-                image.save(output, format=format_name, quality=jpeg_quality, optimize=True)
-            else:
-                image.save(output, format=format_name, optimize=True)
-
-        return output.getvalue(), final_mime_type, final_extension
-
-    async def process_image(self, file: UploadFile, validation_result: Dict[str, Any]) -> bytes:
-        """Process and optimize image"""
-        
-        await file.seek(0)
-        content = await file.read()
+        result = await self.db.execute(
+            select(Media.file_type, Media.upload_source, func.count(Media.id))
+            .where(Media.report_id == report_id)
+            .group_by(Media.file_type, Media.upload_source)
+        )
         
-        try:
-            loop = asyncio.get_running_loop()
-            processed_content, final_mime_type, final_extension = await loop.run_in_executor(
-                None,
-                self._process_image_sync,
-                content,
-                validation_result['mime_type'],
-                self.MAX_IMAGE_DIMENSION,
-                self.JPEG_QUALITY,
-                self.WEBP_QUALITY
-            )
-            
-            # Update validation result
-            validation_result['size'] = len(processed_content)
-            validation_result['mime_type'] = final_mime_type
-            if final_extension:
-                validation_result['extension'] = final_extension
-            
-            logger.info(f"Image processed: {len(content)} -> {len(processed_content)} bytes")
-            
-            return processed_content
-            
-        except Exception as e:
-            logger.error(f"Image processing failed: {e}")
-            raise ValidationException(f"Failed to process image: {str(e)}")
+        counts = {'citizen_image': 0, 'officer_image': 0, 'audio': 0}
+        for media_type, source, count in result:
+            if media_type == MediaType.AUDIO:
+                counts['audio'] += count
+            elif media_type == MediaType.IMAGE:
+                if source in OFFICER_PHOTO_SOURCES:
+                    counts['officer_image'] += count
+                else:
+                    counts['citizen_image'] += count
+        return counts
     
-    async def upload_file(
+    def _check_media_limit(
         self,
-        file: UploadFile,
-        report_id: int,
-        user_id: int,
+        counts: Dict[str, int],
         file_type: str,
-        caption: Optional[str] = None,
-        is_primary: bool = False,
-        upload_source: Optional[UploadSource] = None,
-        is_proof_of_work: bool = False
-    ) -> Media:
-        """Upload and store a single file"""
-        
-        # Validate file
-        validation_result = await self.validate_file(file, file_type)
-        
-        # Check existing media count for this report
-        # Count separately for citizen photos and officer photos
+        upload_source: Optional[UploadSource]
+    ):
+        """Raise if the report has no room left for another file of this kind"""
+        # Citizen photos and officer photos (before + after) are limited separately
         if file_type == 'image':
-            # If it's an officer photo, count only officer photos (before + after)
-            if upload_source and upload_source in [UploadSource.OFFICER_BEFORE_PHOTO, UploadSource.OFFICER_AFTER_PHOTO]:
-                existing_count = await self.db.execute(
-                    select(func.count(Media.id))
-                    .where(Media.report_id == report_id)
-                    .where(Media.file_type == MediaType.IMAGE)
-                    .where(Media.upload_source.in_([UploadSource.OFFICER_BEFORE_PHOTO, UploadSource.OFFICER_AFTER_PHOTO]))
-                )
-                if existing_count.scalar() >= self.MAX_IMAGES_PER_REPORT:
+            if upload_source in OFFICER_PHOTO_SOURCES:
+                if counts['officer_image'] >= self.MAX_IMAGES_PER_REPORT:
                     raise ValidationException(f"Maximum {self.MAX_IMAGES_PER_REPORT} officer photos allowed per report (before + after combined)")
-            else:
-                # For citizen photos, count only citizen photos
-                existing_count = await self.db.execute(
-                    select(func.count(Media.id))
-                    .where(Media.report_id == report_id)
-                    .where(Media.file_type == MediaType.IMAGE)
-                    .where(
-                        (Media.upload_source == UploadSource.CITIZEN_SUBMISSION) | 
-                        (Media.upload_source == None)
-                    )
-                )
-                if existing_count.scalar() >= self.MAX_IMAGES_PER_REPORT:
-                    raise ValidationException(f"Maximum {self.MAX_IMAGES_PER_REPORT} citizen photos allowed per report")
+            elif counts['citizen_image'] >= self.MAX_IMAGES_PER_REPORT:
+                raise ValidationException(f"Maximum {self.MAX_IMAGES_PER_REPORT} citizen photos allowed per report")
         
         elif file_type == 'audio':
-            existing_count = await self.db.execute(
-                select(func.count(Media.id))
-                .where(Media.report_id == report_id)
-                .where(Media.file_type == MediaType.AUDIO)
-            )
-            if existing_count.scalar() >= self.MAX_AUDIO_PER_REPORT:
+            if counts['audio'] >= self.MAX_AUDIO_PER_REPORT:
                 raise ValidationException(f"Maximum {self.MAX_AUDIO_PER_REPORT} audio file allowed per report")
-        
-        # Process file content
-        if file_type == 'image':
-            processed_content = await self.process_image(file, validation_result)
-        else:
-            await file.seek(0)
-            processed_content = await file.read()
-        
-        # Generate unique filename
-        file_id = str(uuid.uuid4())
-        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        filename = f"{report_id}_{timestamp}_{file_id}{validation_result['extension']}"
-        
-        # Upload to storage
+    
+    @staticmethod
+    def object_path(content_hash: str, extension: str, variant: Optional[str] = None) -> Tuple[str, str]:
+        """
+        (folder, filename) of the content-addressed object for a hash, or of
+        a file derived from it (``variant``: 'optimised', 'thumbnail', ...)
+        """
+        if variant:
+            return f"media/{content_hash[:2]}", f"{content_hash}_{variant}{extension}"
+        return f"media/{content_hash[:2]}", f"{content_hash}{extension}"
+    
+    async def put_object(
+        self,
+        content: Union[bytes, BinaryIO],
+        folder: str,
+        filename: str,
+        content_type: str,
+        length: Optional[int] = None
+    ) -> str:
+        """Upload one object; returns its URL"""
         try:
             file_url = await self.storage.upload_file(
-                content=processed_content,
+                content=content,
                 filename=filename,
-                content_type=validation_result['mime_type'],
-                folder=f"reports/{report_id}"
+                content_type=content_type,
+                folder=folder,
+                length=length
             )
         except Exception as e:
             logger.error(f"Storage upload failed: {e}")
             raise ValidationException(f"Failed to upload file: {str(e)}")
         
-        # Create media record
+        logger.info(f"File uploaded successfully: {folder}/{filename} -> {file_url}")
+        return file_url
+    
+    async def _put_upload(self, file: UploadFile, validation_result: Dict[str, Any]) -> str:
+        """
+        Store an upload at its content-addressed path; returns the file URL.
+        Uploads already in storage (``source_object``) are copied server-side.
+        """
+        folder, filename = self.object_path(validation_result['hash'], validation_result['extension'])
+        source_object = validation_result.get('source_object')
+        if source_object:
+            try:
+                return await self.storage.copy_object(
+                    source_object, folder, filename, validation_result['mime_type']
+                )
+            except Exception as e:
+                raise ValidationException(f"Failed to store file: {str(e)}")
+        
+        await file.seek(0)
+        return await self.put_object(
+            file.file, folder, filename, validation_result['mime_type'], validation_result['size']
+        )
+    
+    def _describe_object(self, validation_result: Dict[str, Any]) -> Dict[str, Any]:
+        """MediaObject values for an upload that is about to be stored"""
+        folder, filename = self.object_path(validation_result['hash'], validation_result['extension'])
+        return {
+            'file_url': self.storage.get_public_url(f"{folder}/{filename}"),
+            'mime_type': validation_result['mime_type'],
+            'file_size': validation_result['size'],
+            'variants': {},
+        }
+    
+    async def _get_media_objects(self, hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Stored, referenced objects among ``hashes``"""
+        result = await self.db.execute(
+            select(
+                MediaObject.content_hash,
+                MediaObject.file_url,
+                MediaObject.mime_type,
+                MediaObject.file_size,
+                MediaObject.variants
+            )
+            .where(MediaObject.content_hash.in_(hashes))
+            .where(MediaObject.ref_count > 0)
+        )
+        return {
+            row.content_hash: {
+                'file_url': row.file_url,
+                'mime_type': row.mime_type,
+                'file_size': row.file_size,
+                'variants': row.variants or {},
+            }
+            for row in result
+        }
+    
+    async def _get_fingerprints(self, hashes: List[str]) -> Dict[str, Tuple[int, int]]:
+        """(phash, dhash) already computed by the media worker for content among ``hashes``"""
+        if not hashes:
+            return {}
+        result = await self.db.execute(
+            select(Media.content_hash, Media.phash, Media.dhash)
+            .where(Media.content_hash.in_(hashes), Media.phash.isnot(None))
+            .distinct(Media.content_hash)
+        )
+        return {row.content_hash: (row.phash, row.dhash) for row in result}
+    
+    async def _add_object_refs(self, objects: Dict[str, Dict[str, Any]], refs: Counter) -> Dict[str, Dict[str, Any]]:
+        """
+        Upsert objects and add ``refs`` references each in one statement.
+        Objects that are still referenced keep their stored values (the media
+        worker may have optimised them since the lookup). Returns hash ->
+        object values and ref_count afterwards (ref_count equals the added
+        count when nobody else references the object, i.e. it must be uploaded).
+        """
+        if not refs:
+            return {}
+        
+        # Sorted so concurrent batches lock rows in the same order
+        stmt = pg_insert(MediaObject).values([
+            {
+                'content_hash': content_hash,
+                'file_url': objects[content_hash]['file_url'],
+                'mime_type': objects[content_hash]['mime_type'],
+                'file_size': objects[content_hash]['file_size'],
+                'variants': objects[content_hash]['variants'],
+                'ref_count': count,
+            }
+            for content_hash, count in sorted(refs.items())
+        ])
+        referenced = MediaObject.ref_count > 0
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MediaObject.content_hash],
+            set_={
+                'ref_count': MediaObject.ref_count + stmt.excluded.ref_count,
+                'file_url': case((referenced, MediaObject.file_url), else_=stmt.excluded.file_url),
+                'mime_type': case((referenced, MediaObject.mime_type), else_=stmt.excluded.mime_type),
+                'file_size': case((referenced, MediaObject.file_size), else_=stmt.excluded.file_size),
+                'variants': case((referenced, MediaObject.variants), else_=stmt.excluded.variants),
+            }
+        )
+        result = await self.db.execute(
+            stmt.returning(
+                MediaObject.content_hash,
+                MediaObject.ref_count,
+                MediaObject.file_url,
+                MediaObject.mime_type,
+                MediaObject.file_size,
+                MediaObject.variants
+            )
+        )
+        return {
+            row.content_hash: {
+                'ref_count': row.ref_count,
+                'file_url': row.file_url,
+                'mime_type': row.mime_type,
+                'file_size': row.file_size,
+                'variants': row.variants or {},
+            }
+            for row in result
+        }
+    
+    async def _release_object_refs(self, refs: Counter):
+        """
+        Drop references. Objects left unreferenced are deleted from storage
+        while their row is still locked, so a concurrent upload of the same
+        content waits and then uploads it again.
+        """
+        for content_hash, count in sorted(refs.items()):
+            result = await self.db.execute(
+                update(MediaObject)
+                .where(MediaObject.content_hash == content_hash)
+                .values(ref_count=MediaObject.ref_count - count)
+                .returning(MediaObject.ref_count, MediaObject.file_url, MediaObject.variants)
+                .execution_options(synchronize_session=False)
+            )
+            row = result.first()
+            if row is None or row.ref_count > 0:
+                continue
+            
+            for variant_url in (row.variants or {}).values():
+                await self.storage.delete_file(variant_url)
+            if await self.storage.delete_file(row.file_url):
+                await self.db.execute(
+                    delete(MediaObject)
+                    .where(MediaObject.content_hash == content_hash)
+                    .execution_options(synchronize_session=False)
+                )
+    
+    async def _store_files(
+        self,
+        entries: List[Tuple[UploadFile, str, Dict[str, Any]]]
+    ) -> List[Optional[BaseException]]:
+        """
+        Store validated (file, file_type, validation_result) entries,
+        content-addressed by the sha256 of the uploaded bytes.
+        
+        Content that is already stored is referenced without being uploaded
+        again; identical files in one batch are uploaded once. New content is
+        streamed to storage concurrently. Each successful
+        entry's validation_result gets the object's file_url, size and
+        mime_type. Returns the error (or None) per entry.
+        """
+        errors: List[Optional[BaseException]] = [None] * len(entries)
+        by_hash: Dict[str, List[int]] = {}
+        for index, (_, _, validation_result) in enumerate(entries):
+            by_hash.setdefault(validation_result['hash'], []).append(index)
+        
+        def first_entry(content_hash: str) -> Tuple[UploadFile, str, Dict[str, Any]]:
+            return entries[by_hash[content_hash][0]]
+        
+        found = await self._get_media_objects(list(by_hash))
+        objects = {
+            content_hash: found.get(content_hash) or self._describe_object(first_entry(content_hash)[2])
+            for content_hash in by_hash
+        }
+        
+        refs = Counter({h: len(indices) for h, indices in by_hash.items()})
+        stored = await self._add_object_refs(objects, refs)
+        
+        # Upload objects nobody else references: new content, or content
+        # whose last reference was released after the lookup above
+        uploads = []
+        for content_hash, row in stored.items():
+            if row['ref_count'] != refs[content_hash]:
+                objects[content_hash] = row
+                continue
+            uploads.append(content_hash)
+            if content_hash in found:
+                # Re-inserted from the stale lookup: describe the upload instead
+                objects[content_hash] = self._describe_object(first_entry(content_hash)[2])
+                await self.db.execute(
+                    update(MediaObject)
+                    .where(MediaObject.content_hash == content_hash)
+                    .values(**objects[content_hash])
+                    .execution_options(synchronize_session=False)
+                )
+        
+        results = await asyncio.gather(
+            *(self._put_upload(first_entry(h)[0], first_entry(h)[2]) for h in uploads),
+            return_exceptions=True
+        )
+        failed = Counter()
+        for content_hash, result in zip(uploads, results):
+            if isinstance(result, BaseException):
+                failed[content_hash] = refs[content_hash]
+                for index in by_hash[content_hash]:
+                    errors[index] = result
+        
+        # References taken for content that could not be stored
+        await self._release_object_refs(failed)
+        
+        # Optimised content is not processed again: reuse its perceptual hashes
+        fingerprints = await self._get_fingerprints([h for h in by_hash if objects[h]['variants']])
+        
+        for content_hash, indices in by_hash.items():
+            for index in indices:
+                if errors[index] is None:
+                    entries[index][2].update(
+                        file_url=objects[content_hash]['file_url'],
+                        size=objects[content_hash]['file_size'],
+                        mime_type=objects[content_hash]['mime_type'],
+                        variants=objects[content_hash]['variants'],
+                    )
+                    if content_hash in fingerprints:
+                        entries[index][2]['phash'], entries[index][2]['dhash'] = fingerprints[content_hash]
+        
+        return errors
+    
+    def _build_media(
+        self,
+        file: UploadFile,
+        report_id: int,
+        user_id: int,
+        file_type: str,
+        validation_result: Dict[str, Any],
+        caption: Optional[str] = None,
+        is_primary: bool = False,
+        upload_source: Optional[UploadSource] = None,
+        is_proof_of_work: bool = False
+    ) -> Media:
+        """Media record for a stored file"""
         media_type = MediaType.IMAGE if file_type == 'image' else MediaType.AUDIO
         
-        media = Media(
+        return Media(
             report_id=report_id,
-            file_url=file_url,
+            file_url=validation_result['file_url'],
+            content_hash=validation_result['hash'],
+            phash=validation_result.get('phash'),
+            dhash=validation_result.get('dhash'),
             file_type=media_type,
             file_size=validation_result['size'],
             mime_type=validation_result['mime_type'],
@@ -390,16 +575,58 @@ class FileUploadService:
             meta={
                 'original_filename': file.filename,
                 'file_hash': validation_result['hash'],
-                'processed': file_type == 'image',
+                # Images sharing an already optimised object need no processing
+                'processed': file_type == 'image' and bool(validation_result.get('variants')),
+                'variants': validation_result.get('variants') or {},
                 'uploaded_by': user_id,
                 'upload_timestamp': datetime.utcnow().isoformat()
             }
         )
+    
+    async def upload_file(
+        self,
+        file: UploadFile,
+        report_id: int,
+        user_id: int,
+        file_type: str,
+        caption: Optional[str] = None,
+        is_primary: bool = False,
+        upload_source: Optional[UploadSource] = None,
+        is_proof_of_work: bool = False,
+        source_object: Optional[str] = None
+    ) -> Media:
+        """
+        Upload and store a single file
+        
+        ``source_object`` names an object already in storage holding the same
+        bytes as ``file`` (direct uploads); it is copied server-side instead
+        of uploading ``file`` again.
+        """
+        
+        # Validate file
+        validation_result = await self.validate_file(file, file_type)
+        validation_result['source_object'] = source_object
+        
+        # Check existing media count for this report
+        counts = await self.get_media_counts(report_id)
+        self._check_media_limit(counts, file_type, upload_source)
+        
+        error, = await self._store_files([(file, file_type, validation_result)])
+        if error is not None:
+            raise error
+        
+        media = self._build_media(
+            file, report_id, user_id, file_type, validation_result,
+            caption=caption,
+            is_primary=is_primary,
+            upload_source=upload_source,
+            is_proof_of_work=is_proof_of_work
+        )
         
         self.db.add(media)
         await self.db.flush()
-        
-        logger.info(f"File uploaded successfully: {filename} -> {file_url}")
+        # Counted in the caller's transaction, which commits right after
+        await apply_usage(self.db, usage_entries([media]))
         
         return media
     
@@ -410,7 +637,15 @@ class FileUploadService:
         user_id: int,
         captions: Optional[List[str]] = None
     ) -> List[Media]:
-        """Upload multiple files with validation and processing"""
+        """
+        Upload multiple files with validation and processing
+        
+        Limits are checked once up front. Files are then validated and
+        uploaded concurrently; storage uploads are capped by
+        MEDIA_UPLOAD_CONCURRENCY. Files that fail are
+        logged and skipped, and all Media rows go in with one flush. The
+        first stored image is primary.
+        """
         
         if not files:
             return []
@@ -443,46 +678,57 @@ class FileUploadService:
         if len(audio_files) > self.MAX_AUDIO_PER_REPORT:
             raise ValidationException(f"Too many audio files. Maximum {self.MAX_AUDIO_PER_REPORT} allowed")
         
-        # Upload files
-        uploaded_media = []
+        # Room left on the report (bulk uploads are citizen submissions)
+        counts = await self.get_media_counts(report_id)
+        image_slots = max(0, self.MAX_IMAGES_PER_REPORT - counts['citizen_image'])
+        audio_slots = max(0, self.MAX_AUDIO_PER_REPORT - counts['audio'])
         
-        # Upload images
-        for i, (original_index, file) in enumerate(images):
-            caption = captions[original_index] if captions and original_index < len(captions) else None
-            is_primary = i == 0  # First image is primary
-            
-            try:
-                media = await self.upload_file(
-                    file=file,
-                    report_id=report_id,
-                    user_id=user_id,
-                    file_type='image',
-                    caption=caption,
-                    is_primary=is_primary
-                )
-                uploaded_media.append(media)
-            except Exception as e:
-                logger.error(f"Failed to upload image {file.filename}: {e}")
+        for _, file in images[image_slots:] + audio_files[audio_slots:]:
+            logger.warning(f"Skipping {file.filename}: report {report_id} is at its media limit")
+        
+        jobs = [(i, file, 'image') for i, file in images[:image_slots]]
+        jobs += [(i, file, 'audio') for i, file in audio_files[:audio_slots]]
+        
+        validations = await asyncio.gather(
+            *(self.validate_file(file, file_type) for _, file, file_type in jobs),
+            return_exceptions=True
+        )
+        
+        valid_jobs = []
+        for (original_index, file, file_type), result in zip(jobs, validations):
+            if isinstance(result, BaseException):
+                logger.error(f"Failed to upload {file_type} {file.filename}: {result}")
                 # Continue with other files
+                continue
+            valid_jobs.append((original_index, file, file_type, result))
+        
+        errors = await self._store_files([
+            (file, file_type, validation_result)
+            for _, file, file_type, validation_result in valid_jobs
+        ])
+        
+        # Build records in submission order (images first, then audio)
+        uploaded_media = []
+        has_primary = False
         
-        # Upload audio files
-        for original_index, file in audio_files:
+        for (original_index, file, file_type, validation_result), error in zip(valid_jobs, errors):
+            if error is not None:
+                logger.error(f"Failed to upload {file_type} {file.filename}: {error}")
+                continue
+            
             caption = captions[original_index] if captions and original_index < len(captions) else None
+            is_primary = file_type == 'image' and not has_primary
+            has_primary = has_primary or is_primary
             
-            try:
-                media = await self.upload_file(
-                    file=file,
-                    report_id=report_id,
-                    user_id=user_id,
-                    file_type='audio',
-                    caption=caption
-                )
-                uploaded_media.append(media)
-            except Exception as e:
-                logger.error(f"Failed to upload audio {file.filename}: {e}")
-                # Continue with other files
+            uploaded_media.append(self._build_media(
+                file, report_id, user_id, file_type, validation_result,
+                caption=caption,
+                is_primary=is_primary
+            ))
         
+        self.db.add_all(uploaded_media)
         await self.db.flush()
+        await apply_usage(self.db, usage_entries(uploaded_media))
         
         logger.info(f"Uploaded {len(uploaded_media)} files for report {report_id}")
         
@@ -510,11 +756,16 @@ class FileUploadService:
             raise ForbiddenException("Access denied")
         
         try:
-            # Delete from storage
-            await self.storage.delete_file(media.file_url)
-            
             # Delete from database
+            await apply_usage(self.db, usage_entries([media], sign=-1))
             await self.db.delete(media)
+            
+            # Shared objects are only deleted from storage with their last reference
+            if media.content_hash:
+                await self._release_object_refs(Counter({media.content_hash: 1}))
+            else:
+                await self.storage.delete_file(media.file_url)
+            
             await self.db.commit()
             
             logger.info(f"Media deleted: {media_id}")
@@ -525,7 +776,6 @@ class FileUploadService:
             await self.db.rollback()
             raise ValidationException(f"Failed to delete media: {str(e)}")
 
-
 # Factory function for dependency injection
 async def get_file_upload_service(
     db: AsyncSession = Depends(get_db)
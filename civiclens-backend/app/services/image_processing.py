@@ -0,0 +1,231 @@
+"""
+Image Processing
+CPU-bound image optimisation run in a bounded process pool
+
+Processing runs in the media worker (app.workers.media_worker), after the
+original has been stored; the API processes never decode images.
+
+Decoding, resizing and re-encoding a phone photo holds the GIL for most of
+its runtime, so the thread pool would process one image at a time. Work is
+instead submitted to a ProcessPoolExecutor of MEDIA_PROCESS_WORKERS
+processes, and the media worker runs that many jobs at once, so queued
+photos are processed in parallel.
+
+Pool processes are spawned rather than forked (the worker runs an event
+loop) and import only this module's dependencies. If the pool cannot be
+used, work falls back to the default thread pool.
+
+Each image is decoded once, in a pool process. JPEGs are decoded at reduced
+scale via ``draft()`` when they exceed MAX_IMAGE_DIMENSION. Thumbnail and
+medium WebP variants for list/feed views and the perceptual hashes are
+derived from the same decoded image.
+
+Perceptual hashes (``perceptual_hashes``) are used for duplicate detection:
+64-bit pHash (low DCT frequencies against their median, excluding the DC
+term) and dHash (horizontal gradients), compared by Hamming distance.
+"""
+
+import asyncio
+import io
+import logging
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+VARIANT_MIME_TYPE = 'image/webp'
+VARIANT_EXTENSION = '.webp'
+
+PHASH_SIZE = 32  # Side of the grayscale image transformed for pHash
+HASH_SIZE = 8  # Hashes are HASH_SIZE x HASH_SIZE = 64 bits
+
+# DCT-II basis for the lowest HASH_SIZE frequencies
+_DCT = [
+    [math.cos(math.pi * u * (2 * x + 1) / (2 * PHASH_SIZE)) for x in range(PHASH_SIZE)]
+    for u in range(HASH_SIZE)
+]
+
+
+def _signed64(value: int) -> int:
+    """Unsigned 64-bit hash as a signed value (fits a BIGINT column)"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def perceptual_hashes(image: Image.Image) -> Tuple[int, int]:
+    """(pHash, dHash) of a decoded image as signed 64-bit integers"""
+    gray = image.convert('L')
+
+    # dHash: one bit per horizontal gradient of a 9x8 thumbnail
+    pixels = list(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.LANCZOS).getdata())
+    dhash = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            dhash = (dhash << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+
+    # pHash: low 8x8 frequencies of the 32x32 DCT, one bit each for above median
+    pixels = list(gray.resize((PHASH_SIZE, PHASH_SIZE), Image.Resampling.LANCZOS).getdata())
+    rows = [pixels[y * PHASH_SIZE:(y + 1) * PHASH_SIZE] for y in range(PHASH_SIZE)]
+    row_coefficients = [[sum(c * p for c, p in zip(basis, row)) for basis in _DCT] for row in rows]
+    coefficients = [
+        sum(basis[y] * row_coefficients[y][u] for y in range(PHASH_SIZE))
+        for basis in _DCT
+        for u in range(HASH_SIZE)
+    ]
+    # The DC term (mean brightness) dwarfs the others: it is left out of the
+    # median and its bit is always 0
+    ordered = sorted(coefficients[1:])
+    median = ordered[len(ordered) // 2]
+    phash = 0
+    for index, coefficient in enumerate(coefficients):
+        phash = (phash << 1) | (index > 0 and coefficient > median)
+
+    return _signed64(phash), _signed64(dhash)
+
+
+def image_fingerprint(stream: BinaryIO) -> Tuple[int, int]:
+    """(pHash, dHash) of an encoded image, oriented as it is displayed"""
+    stream.seek(0)
+    image = Image.open(stream)
+    if image.format == 'JPEG':
+        # Hashes need a tiny grayscale image: decode at up to 1/8 scale
+        image.draft('L', (PHASH_SIZE * 2, PHASH_SIZE * 2))
+    ImageOps.exif_transpose(image, in_place=True)
+    return perceptual_hashes(image)
+
+
+def _encode_variant(image: Image.Image, max_dimension: int, webp_quality: int) -> bytes:
+    """Downscaled WebP copy of a decoded image"""
+    variant = image.copy()
+    variant.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    output = io.BytesIO()
+    variant.save(output, format='WEBP', quality=webp_quality, method=4)
+    return output.getvalue()
+
+
+def process_image_bytes(
+    content: bytes,
+    mime_type: str,
+    max_dimension: int,
+    jpeg_quality: int,
+    webp_quality: int,
+    variant_dimensions: Optional[Dict[str, int]] = None
+) -> Tuple[bytes, str, Optional[str], Dict[str, bytes], Tuple[int, int]]:
+    """
+    Resize and re-encode an image, plus smaller WebP variants.
+    Returns: (processed_content, final_mime_type, final_extension, variants, (phash, dhash))
+    final_extension is None if it wasn't changed; variants maps each name in
+    ``variant_dimensions`` to WebP bytes no larger than its dimension.
+    """
+    # Open image
+    image = Image.open(io.BytesIO(content))
+
+    # Target size maintaining aspect ratio (orientation does not change the bound)
+    width, height = image.size
+    target = None
+    if width > max_dimension or height > max_dimension:
+        ratio = min(max_dimension / width, max_dimension / height)
+        target = (int(width * ratio), int(height * ratio))
+
+    # JPEG: let the decoder scale by 1/2, 1/4 or 1/8 while decoding (never
+    # below the target), so large photos are not materialised at full size
+    if target and image.format == 'JPEG':
+        image.draft(image.mode, target)
+
+    # Apply the EXIF orientation to the pixels. EXIF (GPS position, device)
+    # is not carried over: save() only writes it when passed explicitly.
+    ImageOps.exif_transpose(image, in_place=True)
+
+    # Convert to RGB if necessary (for JPEG compatibility)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # Create white background for transparency
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode == 'P':
+            image = image.convert('RGBA')
+        background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
+        image = background
+
+    fingerprint = perceptual_hashes(image)
+
+    # Resize if too large; reducing_gap shrinks by an integer factor first
+    if target:
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    # Save optimized image
+    output = io.BytesIO()
+    final_mime_type = mime_type
+    final_extension = None
+
+    # Choose optimal format
+    if mime_type == 'image/png' and image.mode == 'RGB':
+        # Convert PNG to JPEG if no transparency
+        image.save(output, format='JPEG', quality=jpeg_quality, optimize=True)
+        final_mime_type = 'image/jpeg'
+        final_extension = '.jpg'
+    elif mime_type == 'image/webp':
+        image.save(output, format='WEBP', quality=webp_quality, optimize=True)
+    else:
+        # Keep original format but optimize
+        format_map = {'image/jpeg': 'JPEG', 'image/png': 'PNG'}
+        format_name = format_map.get(mime_type, 'JPEG')
+
+        if format_name == 'JPEG':
+            image.save(output, format=format_name, quality=jpeg_quality, optimize=True)
+        else:
+            image.save(output, format=format_name, optimize=True)
+
+    # Variants from the decoded full-size image (no second decode)
+    variants = {
+        name: _encode_variant(image, dimension, webp_quality)
+        for name, dimension in (variant_dimensions or {}).items()
+    }
+
+    return output.getvalue(), final_mime_type, final_extension, variants, fingerprint
+
+
+class ImageProcessingPool:
+    """Bounded process pool for image work"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run(self, func, *args):
+        """Run ``func(*args)`` in the pool (``func`` must be a module-level function)"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        if executor is not None:
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed); start a fresh pool next time
+                logger.warning("Image processing pool broken, recreating it")
+                self._executor = None
+        return await loop.run_in_executor(None, func, *args)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global image processing pool instance
+image_processing_pool = ImageProcessingPool(workers=settings.MEDIA_PROCESS_WORKERS)
@@ -0,0 +1,209 @@
+"""
+Media Processing Service
+Deferred image optimisation for uploaded media
+
+Uploads store the original image and respond straight away. Image Media ids
+are queued on queue:media_processing (``enqueue_media_processing``) and the
+media worker (app.workers.media_worker) calls ``process_media``: the shared
+content-addressed object is re-encoded (orientation applied, EXIF stripped,
+resized) with thumbnail and medium WebP variants and its perceptual hashes
+(duplicate detection) are taken from the same decode; every Media row of that
+content is updated. The re-encoded image gets its own key and the original is
+deleted only after the URL switch is committed. Objects that are already
+optimised are only copied onto the Media row, so repeated or duplicate jobs
+are cheap and safe.
+"""
+
+import asyncio
+import logging
+import os
+from io import BytesIO
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, literal, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_redis
+from app.models.media import Media, MediaObject, MediaType
+from app.services.file_upload_service import FileUploadService
+from app.services.image_processing import (
+    VARIANT_EXTENSION,
+    VARIANT_MIME_TYPE,
+    image_fingerprint,
+    image_processing_pool,
+    process_image_bytes,
+)
+from app.services.storage_service import StorageService
+from app.services.storage_usage_service import apply_usage
+
+logger = logging.getLogger(__name__)
+
+MEDIA_QUEUE = "queue:media_processing"
+MEDIA_INFLIGHT_QUEUE = "queue:media_processing:inflight"  # Taken by a worker, not yet done
+MEDIA_FAILED_QUEUE = "queue:media_failed"  # Dead letters for manual review
+OPTIMISED_VARIANT = "optimised"  # Key suffix of the re-encoded image (never the original's key)
+
+
+def unprocessed_media_ids(media_list: Iterable[Media]) -> List[int]:
+    """Ids of images that still need optimising"""
+    return [
+        media.id for media in media_list
+        if media.file_type == MediaType.IMAGE and not (media.meta or {}).get('processed')
+    ]
+
+
+async def enqueue_media_processing(media_ids: List[int]):
+    """Queue media for the media worker (call after the rows are committed)"""
+    if not media_ids:
+        return
+    redis = await get_redis()
+    await redis.lpush(MEDIA_QUEUE, *(str(media_id) for media_id in media_ids))
+
+
+class MediaProcessingService:
+    """Optimises stored originals and updates their Media rows"""
+
+    def __init__(self, db: AsyncSession, storage_service: StorageService):
+        self.db = db
+        self.storage = storage_service
+        self.uploads = FileUploadService(db, storage_service)
+
+    async def process_media(self, media_id: int) -> str:
+        """
+        Optimise one media item's image and commit.
+        Returns 'processed', 'synced' (object was already optimised) or
+        'skipped' (gone, not an image, or already done).
+        """
+        media = await self.db.get(Media, media_id)
+        if (
+            media is None
+            or media.file_type != MediaType.IMAGE
+            or not media.content_hash
+            or (media.meta or {}).get('processed')
+        ):
+            return 'skipped'
+
+        # The row lock keeps the object from being released (and deleted)
+        # or processed by another worker meanwhile
+        result = await self.db.execute(
+            select(MediaObject)
+            .where(MediaObject.content_hash == media.content_hash)
+            .with_for_update()
+        )
+        media_object = result.scalar_one_or_none()
+        if media_object is None or media_object.ref_count <= 0:
+            return 'skipped'
+
+        replaced_url = None
+        outcome = 'synced'
+        if not media_object.variants:
+            replaced_url, fingerprint = await self._optimise(media_object)
+            outcome = 'processed'
+        else:
+            fingerprint = await self._stored_fingerprint(media_object)
+
+        # Usage counters follow the size change of every affected row
+        result = await self.db.execute(
+            select(Media.report_id, Media.upload_source, Media.file_size)
+            .where(Media.content_hash == media_object.content_hash)
+        )
+        await apply_usage(self.db, [
+            (
+                report_id,
+                upload_source.value if upload_source else None,
+                media_object.file_size - (file_size or 0),
+                0,
+            )
+            for report_id, upload_source, file_size in result
+        ])
+
+        values = {
+            'file_url': media_object.file_url,
+            'file_size': media_object.file_size,
+            'mime_type': media_object.mime_type,
+            'meta': func.coalesce(Media.meta, literal({}, JSONB)).op('||')(
+                literal({'processed': True, 'variants': media_object.variants}, JSONB)
+            ),
+        }
+        if fingerprint is not None:
+            values['phash'], values['dhash'] = fingerprint
+        await self.db.execute(
+            update(Media)
+            .where(Media.content_hash == media_object.content_hash)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+
+        # The original is unreferenced now that the optimised URL is committed
+        if replaced_url:
+            await self.storage.delete_file(replaced_url)
+
+        return outcome
+
+    async def _stored_fingerprint(self, media_object: MediaObject) -> Optional[Tuple[int, int]]:
+        """
+        (phash, dhash) of already optimised content: from another Media row,
+        else computed from the stored file. None if hashing fails.
+        """
+        result = await self.db.execute(
+            select(Media.phash, Media.dhash)
+            .where(Media.content_hash == media_object.content_hash, Media.phash.isnot(None))
+            .limit(1)
+        )
+        row = result.first()
+        if row is not None:
+            return row.phash, row.dhash
+
+        try:
+            stored = BytesIO()
+            await self.storage.read_file(media_object.file_url, stored, self.uploads.MAX_IMAGE_SIZE)
+            return await image_processing_pool.run(image_fingerprint, stored)
+        except Exception as e:
+            logger.warning(f"Perceptual hashing failed for {media_object.content_hash}: {e}")
+            return None
+
+    async def _optimise(self, media_object: MediaObject) -> Tuple[str, Tuple[int, int]]:
+        """
+        Re-encode the stored original and upload it with its variants under
+        keys of their own. Updates ``media_object`` and returns (the
+        original's URL, (phash, dhash)). The original must only be deleted
+        once the new URL is committed (a retry after a failed commit then
+        starts from the original again).
+        """
+        original = BytesIO()
+        await self.storage.read_file(media_object.file_url, original, self.uploads.MAX_IMAGE_SIZE)
+
+        processed_content, mime_type, extension, variants, fingerprint = await image_processing_pool.run(
+            process_image_bytes,
+            original.getvalue(),
+            media_object.mime_type,
+            self.uploads.MAX_IMAGE_DIMENSION,
+            self.uploads.JPEG_QUALITY,
+            self.uploads.WEBP_QUALITY,
+            self.uploads.IMAGE_VARIANTS
+        )
+        logger.info(f"Image processed: {original.tell()} -> {len(processed_content)} bytes")
+
+        content_hash = media_object.content_hash
+        extension = extension or os.path.splitext(media_object.file_url)[1]
+        uploads = [self.uploads.put_object(
+            processed_content,
+            *self.uploads.object_path(content_hash, extension, OPTIMISED_VARIANT),
+            mime_type
+        )]
+        for variant, variant_content in variants.items():
+            uploads.append(self.uploads.put_object(
+                variant_content,
+                *self.uploads.object_path(content_hash, VARIANT_EXTENSION, variant),
+                VARIANT_MIME_TYPE
+            ))
+        file_url, *variant_urls = await asyncio.gather(*uploads)
+
+        original_url = media_object.file_url
+        media_object.file_url = file_url
+        media_object.mime_type = mime_type
+        media_object.file_size = len(processed_content)
+        media_object.variants = dict(zip(variants, variant_urls))
+        return original_url, fingerprint
@@ -0,0 +1,487 @@
+"""
+Statistics Rollup Service
+Precomputed summary rows for dashboard, department and officer statistics
+
+Rollups are recomputed with a handful of set-based GROUP BY queries and read
+back with a single query, replacing per-request aggregate fan-out (and the
+per-department / per-officer N+1 loops).
+
+Freshness:
+- Each rollup records the "reports" cache generation it was computed from.
+  Report writes bump that generation (see app.core.cache), which marks the
+  rollup dirty; it is recomputed on the next read once it is at least
+  STATS_ROLLUP_MIN_REFRESH_SECONDS old.
+- Rollups older than STATS_ROLLUP_MAX_AGE_SECONDS are always recomputed.
+- app.workers.stats_rollup_worker refreshes everything on a schedule so reads
+  rarely pay for a refresh.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, func, delete, and_, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.core.cache import get_generations, REPORTS_TAG
+from app.core.database import AsyncSessionLocal
+from app.models.department import Department
+from app.models.report import Report, ReportStatus, ReportSeverity
+from app.models.stats_rollup import StatsRollup, DepartmentStatsRollup, OfficerStatsRollup
+from app.models.task import Task, TaskStatus
+from app.models.user import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+# Rollup kinds
+DASHBOARD = "dashboard"
+PUBLIC = "public"
+DEPARTMENTS = "departments"
+OFFICERS = "officers"
+ALL_KINDS = (DASHBOARD, PUBLIC, DEPARTMENTS, OFFICERS)
+
+OFFICER_ROLES = [UserRole.NODAL_OFFICER, UserRole.ADMIN]
+
+ACTIVE_REPORT_EXCLUDED_STATUSES = [
+    ReportStatus.CLOSED,
+    ReportStatus.RESOLVED,
+    ReportStatus.REJECTED,
+]
+
+DEPARTMENT_PENDING_STATUSES = [
+    ReportStatus.RECEIVED,
+    ReportStatus.PENDING_CLASSIFICATION,
+    ReportStatus.CLASSIFIED,
+    ReportStatus.ASSIGNED_TO_DEPARTMENT,
+    ReportStatus.ASSIGNED_TO_OFFICER,
+    ReportStatus.ACKNOWLEDGED,
+]
+
+RESOLVED_STATUSES = [ReportStatus.RESOLVED, ReportStatus.CLOSED]
+
+# One refresh per kind at a time within this process (across processes:
+# the advisory lock taken in refresh_rollup)
+_refresh_locks: Dict[str, asyncio.Lock] = {kind: asyncio.Lock() for kind in ALL_KINDS}
+
+
+# ============================================================================
+# LIVE COMPUTATION (used to build rollups)
+# ============================================================================
+
+async def compute_public_stats(db: AsyncSession) -> Dict[str, Any]:
+    """Compute public landing-page statistics from source tables"""
+    report_result = await db.execute(
+        select(
+            func.count(Report.id).label("total"),
+            func.count(Report.id).filter(Report.status.in_(RESOLVED_STATUSES)).label("resolved"),
+        )
+    )
+    report_counts = report_result.first()
+
+    active_officers_result = await db.execute(
+        select(func.count(User.id)).where(
+            User.is_active == True,
+            User.role.in_([
+                UserRole.NODAL_OFFICER,
+                UserRole.ADMIN,
+                UserRole.AUDITOR,
+                UserRole.SUPER_ADMIN
+            ]),
+            User.department_id.isnot(None)
+        )
+    )
+    active_officers = active_officers_result.scalar() or 0
+
+    avg_resolution_result = await db.execute(
+        select(
+            func.avg(
+                func.extract('epoch', Task.resolved_at - Task.assigned_at) / 86400.0
+            )
+        ).where(
+            Task.status == TaskStatus.RESOLVED,
+            Task.resolved_at.isnot(None),
+            Task.assigned_at.isnot(None)
+        )
+    )
+    avg_resolution_days = avg_resolution_result.scalar()
+
+    return {
+        "total_reports": report_counts.total or 0,
+        "resolved_reports": report_counts.resolved or 0,
+        "active_officers": active_officers,
+        "avg_resolution_days": round(float(avg_resolution_days), 1) if avg_resolution_days is not None else 0.0,
+    }
+
+
+async def compute_dashboard_stats(db: AsyncSession) -> Dict[str, Any]:
+    """Compute admin dashboard statistics from source tables"""
+    from app.crud.report import report_crud
+
+    today = datetime.utcnow().date()
+
+    task_result = await db.execute(
+        select(
+            func.count(Task.id).filter(
+                Task.status.in_([TaskStatus.ASSIGNED, TaskStatus.IN_PROGRESS])
+            ).label("pending"),
+            func.count(Task.id).filter(
+                Task.status == TaskStatus.RESOLVED,
+                func.date(Task.resolved_at) == today
+            ).label("resolved_today"),
+            func.count(Task.id).filter(Task.status == TaskStatus.RESOLVED).label("resolved"),
+            func.count(Task.id).filter(
+                Task.status == TaskStatus.RESOLVED,
+                Task.sla_violated == 0
+            ).label("sla_compliant"),
+            func.avg(
+                func.extract('epoch', Task.resolved_at - Task.assigned_at) / 3600.0
+            ).filter(
+                Task.status == TaskStatus.RESOLVED,
+                Task.resolved_at.isnot(None),
+                Task.assigned_at.isnot(None)
+            ).label("avg_resolution_hours"),
+        )
+    )
+    tasks = task_result.first()
+
+    report_result = await db.execute(
+        select(
+            func.count(Report.id).label("total"),
+            func.count(Report.id).filter(
+                Report.severity == ReportSeverity.HIGH,
+                Report.status.not_in(ACTIVE_REPORT_EXCLUDED_STATUSES)
+            ).label("high"),
+            func.count(Report.id).filter(
+                Report.severity == ReportSeverity.CRITICAL,
+                Report.status.not_in(ACTIVE_REPORT_EXCLUDED_STATUSES)
+            ).label("critical"),
+        )
+    )
+    reports = report_result.first()
+
+    total_resolved_tasks = tasks.resolved or 0
+    sla_compliance = 0.0
+    if total_resolved_tasks > 0:
+        sla_compliance = round(((tasks.sla_compliant or 0) / total_resolved_tasks) * 100, 1)
+
+    avg_resolution_hours = tasks.avg_resolution_hours
+    avg_resolution_hours = round(float(avg_resolution_hours), 1) if avg_resolution_hours is not None else 0.0
+
+    stats = await report_crud.get_statistics(db)
+
+    return {
+        "total_reports": reports.total or 0,
+        "pending_tasks": tasks.pending or 0,
+        "resolved_today": tasks.resolved_today or 0,
+        "high_priority_count": reports.high or 0,
+        "critical_priority_count": reports.critical or 0,
+        "sla_compliance": sla_compliance,
+        "avg_resolution_time": avg_resolution_hours,
+        "reports_by_category": stats['by_category'],
+        "reports_by_status": {k.value if hasattr(k, 'value') else str(k): v for k, v in stats['by_status'].items()},
+        "reports_by_severity": {k.value if hasattr(k, 'value') else str(k): v for k, v in stats['by_severity'].items()},
+    }
+
+
+# ============================================================================
+# ROLLUP SERVICE
+# ============================================================================
+
+class StatsRollupService:
+    """Read (and lazily refresh) precomputed statistics"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    # ---- Reads ------------------------------------------------------------
+
+    async def get_dashboard_stats(self) -> Dict[str, Any]:
+        """Dashboard stats from the precomputed rollup row"""
+        state = await self._ensure_fresh(DASHBOARD)
+        return state.data
+
+    async def get_public_stats(self) -> Dict[str, Any]:
+        """Public landing-page stats from the precomputed rollup row"""
+        state = await self._ensure_fresh(PUBLIC)
+        return state.data
+
+    async def get_department_stats(self, department_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Per-department stats, one query over departments + rollup rows"""
+        await self._ensure_fresh(DEPARTMENTS)
+
+        query = (
+            select(Department.id, Department.name, DepartmentStatsRollup)
+            .outerjoin(DepartmentStatsRollup, DepartmentStatsRollup.department_id == Department.id)
+            .order_by(Department.id)
+        )
+        if department_id is not None:
+            query = query.where(Department.id == department_id)
+
+        result = await self.db.execute(query)
+        stats = []
+        for dept_id, dept_name, rollup in result.all():
+            total_reports = rollup.total_reports if rollup else 0
+            resolved_reports = rollup.resolved_reports if rollup else 0
+            resolution_rate = (resolved_reports / total_reports) * 100 if total_reports > 0 else 0.0
+            stats.append({
+                "department_id": dept_id,
+                "department_name": dept_name,
+                "total_officers": rollup.total_officers if rollup else 0,
+                "active_officers": rollup.active_officers if rollup else 0,
+                "total_reports": total_reports,
+                "pending_reports": rollup.pending_reports if rollup else 0,
+                "resolved_reports": resolved_reports,
+                "in_progress_reports": rollup.in_progress_reports if rollup else 0,
+                "avg_resolution_time_days": rollup.avg_resolution_time_days if rollup else None,
+                "resolution_rate": round(resolution_rate, 1),
+            })
+        return stats
+
+    async def get_officer_stats(self, department_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Per-officer workload stats, one query over users + departments + rollup rows"""
+        await self._ensure_fresh(OFFICERS)
+
+        query = (
+            select(User, Department.name, OfficerStatsRollup)
+            .outerjoin(Department, Department.id == User.department_id)
+            .outerjoin(OfficerStatsRollup, OfficerStatsRollup.user_id == User.id)
+            .where(
+                User.role.in_(OFFICER_ROLES),
+                User.is_active == True
+            )
+        )
+        if department_id:
+            query = query.where(User.department_id == department_id)
+
+        result = await self.db.execute(query)
+        stats = []
+        for officer, dept_name, rollup in result.all():
+            active_reports = rollup.active_reports if rollup else 0
+            resolved_reports = rollup.resolved_reports if rollup else 0
+            stats.append({
+                "user_id": officer.id,
+                "full_name": officer.full_name,
+                "email": officer.email,
+                "phone": officer.phone,
+                "employee_id": officer.employee_id,
+                "department_id": officer.department_id,
+                "department_name": dept_name,
+                "total_reports": active_reports + resolved_reports,
+                "resolved_reports": resolved_reports,
+                "in_progress_reports": active_reports,
+                "active_reports": active_reports,
+                "avg_resolution_time_days": float(rollup.avg_resolution_time_days or 0.0) if rollup else 0.0,
+                "workload_score": float(rollup.workload_score) if rollup else 0.0,
+                "capacity_level": rollup.capacity_level if rollup else "low",
+            })
+        return stats
+
+    # ---- Freshness --------------------------------------------------------
+
+    async def _get_state(self, kind: str) -> Optional[StatsRollup]:
+        result = await self.db.execute(select(StatsRollup).where(StatsRollup.kind == kind))
+        return result.scalar_one_or_none()
+
+    async def _ensure_fresh(self, kind: str) -> StatsRollup:
+        """Return the rollup state for ``kind``, refreshing it first if stale"""
+        state = await self._get_state(kind)
+        generation = await _current_generation()
+        if not _is_stale(state, generation):
+            return state
+
+        async with _refresh_locks[kind]:
+            # Another coroutine may have refreshed while we waited
+            self.db.expire_all()
+            state = await self._get_state(kind)
+            if _is_stale(state, generation):
+                await refresh_rollup(kind, generation)
+                self.db.expire_all()
+                state = await self._get_state(kind)
+        return state
+
+
+def _age_seconds(refreshed_at: datetime) -> float:
+    return (datetime.utcnow() - refreshed_at.replace(tzinfo=None)).total_seconds()
+
+
+def _is_stale(state: Optional[StatsRollup], generation: Optional[int]) -> bool:
+    if state is None:
+        return True
+    age = _age_seconds(state.refreshed_at)
+    if age >= settings.STATS_ROLLUP_MAX_AGE_SECONDS:
+        return True
+    if (
+        generation is not None
+        and state.source_generation != generation
+        and age >= settings.STATS_ROLLUP_MIN_REFRESH_SECONDS
+    ):
+        return True
+    return False
+
+
+async def _current_generation() -> Optional[int]:
+    """Current "reports" generation, or None when Redis is unavailable"""
+    try:
+        generations = await get_generations([REPORTS_TAG])
+        return generations[REPORTS_TAG]
+    except Exception as e:
+        logger.warning(f"Could not read reports generation for rollups: {e}")
+        return None
+
+
+# ============================================================================
+# REFRESH
+# ============================================================================
+
+async def refresh_rollup(kind: str, generation: Optional[int] = None) -> None:
+    """
+    Recompute one rollup kind in its own transaction. Refreshes of the same
+    kind from other processes (API workers, stats_rollup_worker) wait on a
+    transaction-scoped advisory lock, so their DELETE + INSERT of the
+    per-entity rows never interleave.
+    """
+    if generation is None:
+        generation = await _current_generation()
+
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+                {"key": f"stats_rollup:{kind}"}
+            )
+            data = None
+            if kind == DASHBOARD:
+                data = await compute_dashboard_stats(db)
+            elif kind == PUBLIC:
+                data = await compute_public_stats(db)
+            elif kind == DEPARTMENTS:
+                await _refresh_department_rows(db)
+            elif kind == OFFICERS:
+                await _refresh_officer_rows(db)
+            else:
+                raise ValueError(f"Unknown rollup kind: {kind}")
+
+            now = datetime.utcnow()
+            stmt = insert(StatsRollup).values(
+                kind=kind, data=data, source_generation=generation, refreshed_at=now
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[StatsRollup.kind],
+                set_={
+                    "data": stmt.excluded.data,
+                    "source_generation": stmt.excluded.source_generation,
+                    "refreshed_at": stmt.excluded.refreshed_at,
+                }
+            )
+            await db.execute(stmt)
+            await db.commit()
+            logger.debug(f"Refreshed '{kind}' stats rollup (generation={generation})")
+        except Exception:
+            await db.rollback()
+            raise
+
+
+async def refresh_all_rollups() -> None:
+    """Recompute every rollup kind (used by the scheduled worker)"""
+    generation = await _current_generation()
+    for kind in ALL_KINDS:
+        async with _refresh_locks[kind]:
+            await refresh_rollup(kind, generation)
+
+
+async def _refresh_department_rows(db: AsyncSession) -> None:
+    """Rebuild department_stats_rollups with two grouped queries"""
+    officers_result = await db.execute(
+        select(
+            User.department_id,
+            func.count(User.id),
+            func.count(User.id).filter(User.is_active == True)
+        )
+        .where(
+            User.department_id.isnot(None),
+            User.role.in_(OFFICER_ROLES)
+        )
+        .group_by(User.department_id)
+    )
+    officer_counts = {dept_id: (total, active) for dept_id, total, active in officers_result.all()}
+
+    reports_result = await db.execute(
+        select(
+            Report.department_id,
+            func.count(Report.id).label('total'),
+            func.count(Report.id).filter(Report.status.in_(DEPARTMENT_PENDING_STATUSES)).label('pending'),
+            func.count(Report.id).filter(Report.status == ReportStatus.IN_PROGRESS).label('in_progress'),
+            func.count(Report.id).filter(Report.status.in_(RESOLVED_STATUSES)).label('resolved'),
+            func.avg(
+                func.extract('epoch', Report.updated_at - Report.created_at) / 86400
+            ).filter(
+                Report.status.in_(RESOLVED_STATUSES),
+                Report.updated_at.isnot(None)
+            ).label('avg_resolution_days'),
+        )
+        .where(Report.department_id.isnot(None))
+        .group_by(Report.department_id)
+    )
+    report_counts = {row.department_id: row for row in reports_result.all()}
+
+    dept_result = await db.execute(select(Department.id))
+    department_ids = dept_result.scalars().all()
+
+    now = datetime.utcnow()
+    rows = []
+    for dept_id in department_ids:
+        total_officers, active_officers = officer_counts.get(dept_id, (0, 0))
+        counts = report_counts.get(dept_id)
+        rows.append({
+            "department_id": dept_id,
+            "total_officers": total_officers,
+            "active_officers": active_officers,
+            "total_reports": counts.total if counts else 0,
+            "pending_reports": counts.pending if counts else 0,
+            "in_progress_reports": counts.in_progress if counts else 0,
+            "resolved_reports": counts.resolved if counts else 0,
+            "avg_resolution_time_days": float(counts.avg_resolution_days) if counts and counts.avg_resolution_days else None,
+            "refreshed_at": now,
+        })
+
+    # Replace atomically - readers see the previous rows until commit
+    await db.execute(delete(DepartmentStatsRollup))
+    if rows:
+        await db.execute(insert(DepartmentStatsRollup), rows)
+
+
+async def _refresh_officer_rows(db: AsyncSession) -> None:
+    """Rebuild officer_stats_rollups using the batched workload queries"""
+    from app.services.report_service import WorkloadBalancer
+
+    officers_result = await db.execute(
+        select(User.id).where(
+            and_(
+                User.role.in_(OFFICER_ROLES),
+                User.is_active == True
+            )
+        )
+    )
+    officer_ids = list(officers_result.scalars().all())
+    workloads = await WorkloadBalancer(db).get_officers_workload_batch(officer_ids)
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "user_id": officer_id,
+            "active_reports": workload.get("active_reports", 0) or 0,
+            "resolved_reports": workload.get("resolved_reports", 0) or 0,
+            "avg_resolution_time_days": workload.get("avg_resolution_time_days"),
+            "workload_score": workload.get("workload_score", 0.0) or 0.0,
+            "capacity_level": workload.get("capacity_level", "low") or "low",
+            "refreshed_at": now,
+        }
+        for officer_id, workload in workloads.items()
+    ]
+
+    await db.execute(delete(OfficerStatsRollup))
+    if rows:
+        await db.execute(insert(OfficerStatsRollup), rows)
@@ -1,250 +1,245 @@
 #!/usr/bin/env python3
 """
 Production-Ready Storage Service for CivicLens
-Handles file storage with MinIO (S3-compatible) - MinIO Required
+Handles file storage through an async backend (app.services.storage_backends):
+MinIO (S3-compatible) over a pooled HTTP client, or the local filesystem for
+development
+
+Signed URLs are computed locally (SigV4 is pure HMAC, see
+app.services.storage_signing) and cached per object and time window: URLs
+are signed for a fixed window start, so every request in the window gets the
+same URL (also cacheable by browsers/CDNs) and it stays valid for at least
+the requested lifetime. Bulk stat requests run concurrently on the backend's
+connection pool.
 """
 
-import uuid
-from typing import Optional, BinaryIO, Union
-from datetime import datetime, timedelta
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, BinaryIO, Tuple, Union
+from datetime import datetime, timezone
 import asyncio
-import urllib3
 
 from app.config import settings
+from app.services.storage_backends import StorageBackend, create_storage_backend
 import logging
 
-# MinIO is now required
-try:
-    from minio import Minio
-    from minio.error import S3Error
-except ImportError:
-    raise ImportError(
-        "MinIO is required for file storage. Install with: pip install minio"
-    )
-
 logger = logging.getLogger(__name__)
 
 
 class StorageService:
-    """MinIO-only storage service for production deployment"""
+    """Object storage service for production deployment"""
     
-    def __init__(self):
-        # Validate required MinIO configuration
-        if not settings.MINIO_ENDPOINT:
-            raise ValueError("MINIO_ENDPOINT is required for file storage")
-        if not settings.MINIO_ACCESS_KEY:
-            raise ValueError("MINIO_ACCESS_KEY is required for file storage")
-        if not settings.MINIO_SECRET_KEY:
-            raise ValueError("MINIO_SECRET_KEY is required for file storage")
-            
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self.backend = backend or create_storage_backend()
         self.bucket_name = settings.MINIO_BUCKET or "civiclens-media"
-        self._init_minio()
+        # Caps concurrent uploads (each holds a part in memory)
+        self._upload_slots = asyncio.Semaphore(max(1, settings.MEDIA_UPLOAD_CONCURRENCY))
+        # Caps concurrent stat requests in bulk lookups
+        self._stat_slots = asyncio.Semaphore(max(1, settings.MINIO_STAT_CONCURRENCY))
+        # (object_name, expires_in, window_start) -> signed URL, LRU-bounded
+        self._signed_urls: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
     
-    def _init_minio(self):
-        """Initialize MinIO client and bucket"""
+    async def initialize(self):
+        """Create the bucket if it doesn't exist"""
         try:
-            # Disable SSL warnings for development
-            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-            
-            # Create MinIO client
-            self.client = Minio(
-                endpoint=settings.MINIO_ENDPOINT,
-                access_key=settings.MINIO_ACCESS_KEY,
-                secret_key=settings.MINIO_SECRET_KEY,
-                secure=settings.MINIO_USE_SSL or False
-            )
-            
-            # Create bucket if it doesn't exist
-            if not self.client.bucket_exists(self.bucket_name):
-                self.client.make_bucket(self.bucket_name)
-                logger.info(f"Created MinIO bucket: {self.bucket_name}")
-            
-            # Set bucket policy for public read access to all files
-            policy = {
-                "Version": "2012-10-17",
-                "Statement": [
-                    {
-                        "Effect": "Allow",
-                        "Principal": {"AWS": "*"},
-                        "Action": "s3:GetObject",
-                        "Resource": f"arn:aws:s3:::{self.bucket_name}/*"
-                    }
-                ]
-            }
-            
+            await self.backend.ensure_bucket()
             try:
-                import json
-                self.client.set_bucket_policy(self.bucket_name, json.dumps(policy))
+                # Direct uploads that are never finalized are removed by the server
+                await self.backend.expire_prefix(f"{settings.DIRECT_UPLOAD_PREFIX}/", days=1)
             except Exception as e:
-                logger.warning(f"Could not set bucket policy: {e}")
-            
-            logger.info(f"MinIO storage initialized: {settings.MINIO_ENDPOINT}")
-            
+                logger.warning(f"Could not set expiry for {settings.DIRECT_UPLOAD_PREFIX}/: {e}")
+            logger.info(f"Storage initialized: {self.backend.name} ({self.backend.base_url})")
         except Exception as e:
-            logger.error(f"MinIO initialization failed: {e}")
-            raise RuntimeError(f"Failed to initialize MinIO storage: {str(e)}")
+            logger.error(f"Storage initialization failed: {e}")
+            raise RuntimeError(f"Failed to initialize storage: {str(e)}")
+    
+    async def close(self):
+        """Close pooled connections"""
+        await self.backend.close()
     
     async def upload_file(
         self,
         content: Union[bytes, BinaryIO],
         filename: str,
         content_type: str,
-        folder: str = "uploads"
+        folder: str = "uploads",
+        length: Optional[int] = None
     ) -> str:
-        """Upload file to MinIO storage and return public URL"""
+        """
+        Upload file to storage and return public URL
+        
+        Streams (file objects) are read in MEDIA_MULTIPART_PART_SIZE parts
+        and sent as a multipart upload when larger than one part, so they are
+        never held in memory whole.
+        """
         
         # Generate storage path
         storage_path = f"{folder}/{filename}"
         
-        return await self._upload_to_minio(content, storage_path, content_type)
-    
-    async def _upload_to_minio(self, content: Union[bytes, BinaryIO], path: str, content_type: str) -> str:
-        """Upload file to MinIO"""
         try:
-            # Convert bytes to BytesIO if needed
-            if isinstance(content, bytes):
-                from io import BytesIO
-                content_stream = BytesIO(content)
-                content_length = len(content)
-            else:
-                content_stream = content
-                content_length = -1  # Let MinIO determine length
-            
-            # Upload to MinIO
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.client.put_object(
-                    bucket_name=self.bucket_name,
-                    object_name=path,
-                    data=content_stream,
-                    length=content_length,
-                    content_type=content_type
-                )
-            )
-            
-            # Generate public URL
-            if settings.MINIO_USE_SSL:
-                protocol = "https"
-            else:
-                protocol = "http"
+            async with self._upload_slots:
+                await self.backend.put_object(storage_path, content, content_type, length)
             
-            public_url = f"{protocol}://{settings.MINIO_ENDPOINT}/{self.bucket_name}/{path}"
-            
-            logger.info(f"File uploaded to MinIO: {path}")
-            return public_url
+            logger.info(f"File uploaded to storage: {storage_path}")
+            return self.get_public_url(storage_path)
             
         except Exception as e:
-            logger.error(f"MinIO upload failed: {e}")
-            raise Exception(f"Failed to upload to MinIO: {str(e)}")
+            logger.error(f"Storage upload failed: {e}")
+            raise Exception(f"Failed to upload to storage: {str(e)}")
     
+    def get_public_url(self, path: str) -> str:
+        """Public URL of an object path (whether or not it exists yet)"""
+        return self.backend.public_url(path)
     
-    async def delete_file(self, file_url: str) -> bool:
-        """Delete file from MinIO storage"""
-        return await self._delete_from_minio(file_url)
+    def presign_upload(
+        self,
+        object_name: str,
+        content_type: str,
+        max_size: int,
+        expires_in: int
+    ) -> Dict[str, Any]:
+        """{'url', 'fields'} for a client to POST one file straight to storage"""
+        return self.backend.presign_post(
+            object_name,
+            expires=expires_in,
+            date=datetime.now(timezone.utc),
+            content_type=content_type,
+            max_size=max_size,
+        )
+    
+    async def read_object(self, object_name: str, destination: BinaryIO, max_size: Optional[int] = None) -> int:
+        """Download an object into ``destination``; returns the byte count"""
+        return await self.backend.read_object(object_name, destination, max_size)
+    
+    async def read_file(self, file_url: str, destination: BinaryIO, max_size: Optional[int] = None) -> int:
+        """Download a file by public URL into ``destination``; returns the byte count"""
+        object_name = self._object_name(file_url)
+        if object_name is None:
+            raise ValueError("Invalid storage URL format")
+        return await self.backend.read_object(object_name, destination, max_size)
+    
+    async def copy_object(self, source_name: str, folder: str, filename: str, content_type: str) -> str:
+        """Server-side copy of an object to ``folder/filename``; returns its public URL"""
+        storage_path = f"{folder}/{filename}"
+        try:
+            await self.backend.copy_object(source_name, storage_path, content_type)
+            logger.info(f"File copied in storage: {source_name} -> {storage_path}")
+            return self.get_public_url(storage_path)
+        except Exception as e:
+            logger.error(f"Storage copy failed: {e}")
+            raise Exception(f"Failed to copy in storage: {str(e)}")
     
-    async def _delete_from_minio(self, file_url: str) -> bool:
-        """Delete file from MinIO"""
+    async def delete_object(self, object_name: str) -> bool:
+        """Delete an object by name"""
         try:
-            # Extract object name from URL
-            # URL format: http://minio:9000/bucket/path/file.jpg
-            url_parts = file_url.split('/')
-            if len(url_parts) < 4:
-                raise ValueError("Invalid MinIO URL format")
-            
-            # Skip protocol, host, bucket - get the path
-            object_name = '/'.join(url_parts[4:])
+            return await self.backend.delete_object(object_name)
+        except Exception as e:
+            logger.error(f"Storage delete failed: {e}")
+            return False
+    
+    async def delete_file(self, file_url: str) -> bool:
+        """Delete file from storage; True only if the object is gone"""
+        try:
+            object_name = self._object_name(file_url)
+            if object_name is None:
+                raise ValueError("Invalid storage URL format")
             
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.client.remove_object(self.bucket_name, object_name)
-            )
+            if not await self.backend.delete_object(object_name):
+                logger.error(f"Storage delete refused: {object_name}")
+                return False
             
-            logger.info(f"File deleted from MinIO: {object_name}")
+            logger.info(f"File deleted from storage: {object_name}")
             return True
             
         except Exception as e:
-            logger.error(f"MinIO delete failed: {e}")
+            logger.error(f"Storage delete failed: {e}")
             return False
     
+    def _object_name(self, file_url: str) -> Optional[str]:
+        """Object name from a public URL (http://minio:9000/bucket/path/file.jpg -> path/file.jpg)"""
+        return self.backend.object_name(file_url)
     
-    async def get_signed_url(self, file_url: str, expires_in: int = 3600) -> str:
-        """Generate signed URL for secure access"""
+    def _presign(self, object_name: str, expires_in: int) -> str:
+        """Signed GET URL, reused for every call in the same half-lifetime window"""
+        step = max(1, expires_in // 2)
+        now = int(time.time())
+        window_start = now - now % step
+        key = (object_name, expires_in, window_start)
         
-        try:
-            # Extract object name from URL
-            url_parts = file_url.split('/')
-            if len(url_parts) < 4:
-                return file_url
-            
-            object_name = '/'.join(url_parts[4:])
-            
-            # Generate presigned URL
-            signed_url = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.client.presigned_get_object(
-                    bucket_name=self.bucket_name,
-                    object_name=object_name,
-                    expires=timedelta(seconds=expires_in)
-                )
-            )
-            
+        signed_url = self._signed_urls.get(key)
+        if signed_url is not None:
+            self._signed_urls.move_to_end(key)
             return signed_url
-            
-        except Exception as e:
-            logger.error(f"Failed to generate signed URL: {e}")
-            return file_url
+        
+        # Valid until window_start + expires_in + step, i.e. >= expires_in from now
+        signed_url = self.backend.presign_get(
+            object_name,
+            expires=expires_in + step,
+            date=datetime.fromtimestamp(window_start, tz=timezone.utc),
+        )
+        self._signed_urls[key] = signed_url
+        while len(self._signed_urls) > settings.SIGNED_URL_CACHE_MAX_ENTRIES:
+            self._signed_urls.popitem(last=False)
+        return signed_url
+    
+    async def get_signed_url(self, file_url: str, expires_in: int = 3600) -> str:
+        """Generate signed URL for secure access"""
+        return self.get_signed_urls([file_url], expires_in)[file_url]
+    
+    def get_signed_urls(self, file_urls: Iterable[str], expires_in: int = 3600) -> Dict[str, str]:
+        """Signed URLs for many files (computed locally, no storage round trips)"""
+        signed = {}
+        for file_url in file_urls:
+            object_name = self._object_name(file_url)
+            try:
+                signed[file_url] = self._presign(object_name, expires_in) if object_name else file_url
+            except Exception as e:
+                logger.error(f"Failed to generate signed URL: {e}")
+                signed[file_url] = file_url
+        return signed
     
     async def get_file_info(self, file_url: str) -> Optional[dict]:
         """Get file information"""
         
-        return await self._get_minio_file_info(file_url)
+        return await self._get_file_info(file_url)
+    
+    async def get_files_info(self, file_urls: List[str]) -> Dict[str, Optional[dict]]:
+        """File information for many files, fetched concurrently"""
+        results = await asyncio.gather(*(self._get_file_info_limited(url) for url in file_urls))
+        return dict(zip(file_urls, results))
     
-    async def _get_minio_file_info(self, file_url: str) -> Optional[dict]:
-        """Get file info from MinIO"""
+    async def _get_file_info_limited(self, file_url: str) -> Optional[dict]:
+        async with self._stat_slots:
+            return await self._get_file_info(file_url)
+    
+    async def _get_file_info(self, file_url: str) -> Optional[dict]:
+        """Get file info from storage"""
         try:
-            url_parts = file_url.split('/')
-            if len(url_parts) < 4:
+            object_name = self._object_name(file_url)
+            if object_name is None:
                 return None
             
-            object_name = '/'.join(url_parts[4:])
-            
-            stat = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.client.stat_object(self.bucket_name, object_name)
-            )
-            
-            return {
-                'size': stat.size,
-                'last_modified': stat.last_modified,
-                'content_type': stat.content_type,
-                'etag': stat.etag
-            }
+            return await self.backend.stat_object(object_name)
             
         except Exception as e:
-            logger.error(f"Failed to get MinIO file info: {e}")
+            logger.error(f"Failed to get storage file info: {e}")
             return None
     
-    def get_storage_stats(self) -> dict:
+    async def get_storage_stats(self) -> dict:
         """Get storage statistics"""
         
         stats = {
-            'type': 'minio',
+            'type': self.backend.name,
             'bucket': self.bucket_name,
-            'available': True
+            'available': await self.backend.is_available()
         }
         
-        try:
-            # Test MinIO connection
-            self.client.bucket_exists(self.bucket_name)
-            stats['available'] = True
-        except Exception:
-            stats['available'] = False
-        
         return stats
 
 
 # Global storage service instance
 _storage_service: Optional[StorageService] = None
+_storage_lock = asyncio.Lock()
 
 
 async def get_storage_service() -> StorageService:
@@ -252,6 +247,19 @@ async def get_storage_service() -> StorageService:
     global _storage_service
     
     if _storage_service is None:
-        _storage_service = StorageService()
+        async with _storage_lock:
+            if _storage_service is None:
+                storage_service = StorageService()
+                await storage_service.initialize()
+                _storage_service = storage_service
+    
+    return _storage_service
+
+
+async def close_storage_service():
+    """Close the storage service's connections (application shutdown)"""
+    global _storage_service
     
-    return _storage_service
\ No newline at end of file
+    if _storage_service is not None:
+        await _storage_service.close()
+        _storage_service = None
@@ -0,0 +1,209 @@
+"""
+Storage Request Signing
+AWS Signature Version 4 for S3-compatible object storage (MinIO)
+
+Signing is pure HMAC-SHA256 over the request, so presigned URLs and POST
+policies are computed locally without a round trip to the storage server.
+The per-day signing key is cached.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Optional
+from urllib.parse import quote
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+EMPTY_PAYLOAD_SHA256 = hashlib.sha256(b"").hexdigest()
+MAX_PRESIGN_SECONDS = 7 * 24 * 3600  # SigV4 upper bound
+
+
+def _uri_encode(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+def canonical_path(path: str) -> str:
+    """URI-encoded object path (slashes kept)"""
+    return _uri_encode(path or "/", safe="/-_.~")
+
+
+def canonical_query(params: Mapping[str, str]) -> str:
+    """Sorted, URI-encoded query string"""
+    return "&".join(
+        f"{_uri_encode(key)}={_uri_encode(str(value))}"
+        for key, value in sorted(params.items())
+    )
+
+
+def _amz_date(date: datetime) -> str:
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc)
+    return date.strftime("%Y%m%dT%H%M%SZ")
+
+
+def _scope(date_stamp: str, region: str, service: str) -> str:
+    return f"{date_stamp}/{region}/{service}/aws4_request"
+
+
+@lru_cache(maxsize=64)
+def _signing_key(secret_key: str, date_stamp: str, region: str, service: str) -> bytes:
+    key = hmac.new(f"AWS4{secret_key}".encode(), date_stamp.encode(), hashlib.sha256).digest()
+    for part in (region, service, "aws4_request"):
+        key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+    return key
+
+
+def _signature(
+    secret_key: str,
+    amz_date: str,
+    region: str,
+    service: str,
+    canonical_request: str
+) -> str:
+    date_stamp = amz_date[:8]
+    string_to_sign = "\n".join([
+        ALGORITHM,
+        amz_date,
+        _scope(date_stamp, region, service),
+        hashlib.sha256(canonical_request.encode()).hexdigest(),
+    ])
+    key = _signing_key(secret_key, date_stamp, region, service)
+    return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+
+def presign_url(
+    method: str,
+    scheme: str,
+    host: str,
+    path: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    expires: int,
+    date: datetime,
+    query: Optional[Mapping[str, str]] = None,
+    service: str = "s3"
+) -> str:
+    """
+    Query-string signed URL valid for ``expires`` seconds from ``date``.
+
+    ``host`` must match the Host header the client will send (include the
+    port when it is not the scheme default).
+    """
+    amz_date = _amz_date(date)
+    params = dict(query or {})
+    params.update({
+        "X-Amz-Algorithm": ALGORITHM,
+        "X-Amz-Credential": f"{access_key}/{_scope(amz_date[:8], region, service)}",
+        "X-Amz-Date": amz_date,
+        "X-Amz-Expires": str(min(expires, MAX_PRESIGN_SECONDS)),
+        "X-Amz-SignedHeaders": "host",
+    })
+    query_string = canonical_query(params)
+    canonical_request = "\n".join([
+        method,
+        canonical_path(path),
+        query_string,
+        f"host:{host}\n",
+        "host",
+        UNSIGNED_PAYLOAD,
+    ])
+    signature = _signature(secret_key, amz_date, region, service, canonical_request)
+    return f"{scheme}://{host}{canonical_path(path)}?{query_string}&X-Amz-Signature={signature}"
+
+
+def sign_headers(
+    method: str,
+    host: str,
+    path: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    date: datetime,
+    headers: Optional[Mapping[str, str]] = None,
+    query: Optional[Mapping[str, str]] = None,
+    payload_sha256: str = UNSIGNED_PAYLOAD,
+    service: str = "s3"
+) -> Dict[str, str]:
+    """
+    Headers for an Authorization-header signed request: the given headers
+    plus x-amz-date, x-amz-content-sha256 and Authorization. ``host`` is
+    signed; the request must carry the same Host header.
+    """
+    amz_date = _amz_date(date)
+    signed = {key.lower(): " ".join(str(value).split()) for key, value in (headers or {}).items()}
+    signed.update({
+        "host": host,
+        "x-amz-date": amz_date,
+        "x-amz-content-sha256": payload_sha256,
+    })
+
+    names = sorted(signed)
+    signed_headers = ";".join(names)
+    canonical_request = "\n".join([
+        method,
+        canonical_path(path),
+        canonical_query(query or {}),
+        "".join(f"{name}:{signed[name]}\n" for name in names),
+        signed_headers,
+        payload_sha256,
+    ])
+    signature = _signature(secret_key, amz_date, region, service, canonical_request)
+
+    result = dict(headers or {})
+    result.update({
+        "x-amz-date": amz_date,
+        "x-amz-content-sha256": payload_sha256,
+        "Authorization": (
+            f"{ALGORITHM} Credential={access_key}/{_scope(amz_date[:8], region, service)}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        ),
+    })
+    return result
+
+
+def presign_post_policy(
+    bucket: str,
+    key: str,
+    access_key: str,
+    secret_key: str,
+    region: str,
+    expires: int,
+    date: datetime,
+    fields: Optional[Mapping[str, str]] = None,
+    conditions: Optional[List[Any]] = None,
+    service: str = "s3"
+) -> Dict[str, str]:
+    """
+    Form fields for a browser-style POST upload of ``key``, valid for
+    ``expires`` seconds from ``date``.
+
+    ``fields`` (e.g. Content-Type) are sent as form fields and must match
+    exactly; ``conditions`` adds policy conditions such as
+    ``["content-length-range", 1, max_size]``. The file goes in a final
+    ``file`` form field.
+    """
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    amz_date = _amz_date(date)
+    form = dict(fields or {})
+    form.update({
+        "key": key,
+        "x-amz-algorithm": ALGORITHM,
+        "x-amz-credential": f"{access_key}/{_scope(amz_date[:8], region, service)}",
+        "x-amz-date": amz_date,
+    })
+    expiration = date + timedelta(seconds=min(expires, MAX_PRESIGN_SECONDS))
+    policy = {
+        "expiration": expiration.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "conditions": [{"bucket": bucket}, *({name: value} for name, value in form.items()), *(conditions or [])],
+    }
+    encoded_policy = base64.b64encode(json.dumps(policy).encode()).decode()
+    key_bytes = _signing_key(secret_key, amz_date[:8], region, service)
+    form["policy"] = encoded_policy
+    form["x-amz-signature"] = hmac.new(key_bytes, encoded_policy.encode(), hashlib.sha256).hexdigest()
+    return form
@@ -0,0 +1,212 @@
+"""
+Storage Usage Service
+Incremental byte/object accounting for media, without listing the bucket
+
+Counters (media_storage_usage) are kept per report, per upload source and in
+total. Uploads add their rows and deletions subtract theirs in the same
+transaction as the media change (one upsert just before the commit, so the
+shared counter rows are locked only briefly), and the media worker applies
+the size change when it re-encodes an image. Counters therefore never include
+uncommitted media, and ``reconcile_usage`` cannot double-count an upload.
+Per-department usage is summed from the per-report counters by each report's
+current department, so reassignment needs no bookkeeping.
+
+Anything that bypasses these paths (report deletion cascades) is corrected by
+``reconcile_usage``, run periodically by app.workers.storage_usage_worker.
+"""
+
+import logging
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Integer, cast, delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.models.department import Department
+from app.models.media import Media, MediaObject, MediaStorageUsage
+from app.models.report import Report
+
+logger = logging.getLogger(__name__)
+
+REPORT_SCOPE = "report"
+SOURCE_SCOPE = "source"
+TOTAL_SCOPE = "total"
+TOTAL_KEY = "all"
+UNKNOWN_SOURCE = "unknown"  # Media uploaded before sources were recorded
+
+# (report_id, upload_source value, byte delta, object delta)
+UsageEntry = Tuple[int, Optional[str], int, int]
+
+
+def usage_entries(media_list: Iterable[Media], sign: int = 1) -> List[UsageEntry]:
+    """Deltas for adding (sign=1) or removing (sign=-1) media rows"""
+    return [
+        (
+            media.report_id,
+            media.upload_source.value if media.upload_source else None,
+            sign * (media.file_size or 0),
+            sign,
+        )
+        for media in media_list
+    ]
+
+
+def _scope_deltas(entries: Iterable[UsageEntry]) -> Dict[Tuple[str, str], List[int]]:
+    deltas: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+    for report_id, upload_source, byte_delta, object_delta in entries:
+        for key in (
+            (REPORT_SCOPE, str(report_id)),
+            (SOURCE_SCOPE, upload_source or UNKNOWN_SOURCE),
+            (TOTAL_SCOPE, TOTAL_KEY),
+        ):
+            deltas[key][0] += byte_delta
+            deltas[key][1] += object_delta
+    return {key: value for key, value in deltas.items() if value != [0, 0]}
+
+
+async def apply_usage(db: AsyncSession, entries: Iterable[UsageEntry]):
+    """Add deltas to the counters in one statement (caller commits)"""
+    deltas = _scope_deltas(entries)
+    if not deltas:
+        return
+
+    # Sorted so concurrent writers lock counter rows in the same order
+    stmt = pg_insert(MediaStorageUsage).values([
+        {'scope': scope, 'scope_key': scope_key, 'byte_count': byte_delta, 'object_count': object_delta}
+        for (scope, scope_key), (byte_delta, object_delta) in sorted(deltas.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MediaStorageUsage.scope, MediaStorageUsage.scope_key],
+        set_={
+            'byte_count': MediaStorageUsage.byte_count + stmt.excluded.byte_count,
+            'object_count': MediaStorageUsage.object_count + stmt.excluded.object_count,
+            'updated_at': func.now(),
+        }
+    )
+    await db.execute(stmt)
+
+
+def _usage(byte_count: Optional[int], object_count: Optional[int]) -> Dict[str, int]:
+    return {'bytes': int(byte_count or 0), 'objects': int(object_count or 0)}
+
+
+async def get_usage(db: AsyncSession, top_reports: int = 10) -> Dict[str, Any]:
+    """Usage totals, by upload source, by department and the largest reports"""
+    result = await db.execute(
+        select(MediaStorageUsage.scope, MediaStorageUsage.scope_key,
+               MediaStorageUsage.byte_count, MediaStorageUsage.object_count)
+        .where(MediaStorageUsage.scope.in_([SOURCE_SCOPE, TOTAL_SCOPE]))
+    )
+    total = _usage(0, 0)
+    by_source = {}
+    for row in result:
+        if row.scope == TOTAL_SCOPE:
+            total = _usage(row.byte_count, row.object_count)
+        else:
+            by_source[row.scope_key] = _usage(row.byte_count, row.object_count)
+
+    report_id = cast(MediaStorageUsage.scope_key, Integer)
+    department_result = await db.execute(
+        select(
+            Report.department_id,
+            Department.name,
+            func.sum(MediaStorageUsage.byte_count).label("byte_count"),
+            func.sum(MediaStorageUsage.object_count).label("object_count"),
+        )
+        .select_from(MediaStorageUsage)
+        .join(Report, Report.id == report_id)
+        .outerjoin(Department, Department.id == Report.department_id)
+        .where(MediaStorageUsage.scope == REPORT_SCOPE)
+        .group_by(Report.department_id, Department.name)
+        .order_by(func.sum(MediaStorageUsage.byte_count).desc())
+    )
+    by_department = [
+        {
+            'department_id': row.department_id,
+            'department_name': row.name or "Unassigned",
+            **_usage(row.byte_count, row.object_count),
+        }
+        for row in department_result
+    ]
+
+    report_result = await db.execute(
+        select(MediaStorageUsage.scope_key, MediaStorageUsage.byte_count, MediaStorageUsage.object_count)
+        .where(MediaStorageUsage.scope == REPORT_SCOPE)
+        .order_by(MediaStorageUsage.byte_count.desc())
+        .limit(top_reports)
+    )
+    largest_reports = [
+        {'report_id': int(row.scope_key), **_usage(row.byte_count, row.object_count)}
+        for row in report_result
+    ]
+
+    # Stored once per distinct content (media_objects), excluding variants
+    stored_result = await db.execute(
+        select(func.sum(MediaObject.file_size), func.count(MediaObject.content_hash))
+        .where(MediaObject.ref_count > 0)
+    )
+    stored = _usage(*stored_result.one())
+
+    return {
+        'total': total,
+        'stored_deduplicated': stored,
+        'by_source': by_source,
+        'by_department': by_department,
+        'largest_reports': largest_reports,
+    }
+
+
+async def _computed_usage(db: AsyncSession) -> Dict[Tuple[str, str], Tuple[int, int]]:
+    """Counters recomputed from the media table"""
+    computed = {}
+    size = func.coalesce(func.sum(Media.file_size), 0)
+
+    result = await db.execute(select(Media.report_id, size, func.count(Media.id)).group_by(Media.report_id))
+    for report_id, byte_count, object_count in result:
+        computed[(REPORT_SCOPE, str(report_id))] = (int(byte_count), object_count)
+
+    result = await db.execute(select(Media.upload_source, size, func.count(Media.id)).group_by(Media.upload_source))
+    total_bytes = total_objects = 0
+    for upload_source, byte_count, object_count in result:
+        key = (SOURCE_SCOPE, upload_source.value if upload_source else UNKNOWN_SOURCE)
+        computed[key] = (int(byte_count), object_count)
+        total_bytes += int(byte_count)
+        total_objects += object_count
+
+    computed[(TOTAL_SCOPE, TOTAL_KEY)] = (total_bytes, total_objects)
+    return computed
+
+
+async def reconcile_usage() -> int:
+    """
+    Rebuild the counters from the media table; returns how many counters
+    were wrong. Delta writers wait on the table lock meanwhile.
+    """
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("LOCK TABLE media_storage_usage IN EXCLUSIVE MODE"))
+
+        result = await db.execute(
+            select(MediaStorageUsage.scope, MediaStorageUsage.scope_key,
+                   MediaStorageUsage.byte_count, MediaStorageUsage.object_count)
+        )
+        current = {(row.scope, row.scope_key): (row.byte_count, row.object_count) for row in result}
+        computed = await _computed_usage(db)
+
+        drifted = [
+            key for key in current.keys() | computed.keys()
+            if current.get(key, (0, 0)) != computed.get(key, (0, 0))
+        ]
+        if drifted:
+            await db.execute(delete(MediaStorageUsage))
+            if computed:
+                await db.execute(pg_insert(MediaStorageUsage).values([
+                    {'scope': scope, 'scope_key': scope_key, 'byte_count': byte_count, 'object_count': object_count}
+                    for (scope, scope_key), (byte_count, object_count) in computed.items()
+                ]))
+        await db.commit()
+
+    if drifted:
+        logger.warning(f"Storage usage reconciled: {len(drifted)} counters corrected")
+    return len(drifted)
@@ -0,0 +1,35 @@
+"""
+Audit Partition Worker
+Periodically creates upcoming audit_logs partitions and enforces retention
+"""
+
+import asyncio
+import logging
+from app.config import settings
+from app.services.audit_partition_service import maintain_audit_partitions
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def run_audit_partition_worker():
+    """Maintain audit partitions in a loop (every AUDIT_PARTITION_WORKER_INTERVAL_SECONDS)"""
+    interval = settings.AUDIT_PARTITION_WORKER_INTERVAL_SECONDS
+    logger.info(f"🚀 Audit Partition Worker started (runs every {interval}s)")
+
+    while True:
+        try:
+            result = await maintain_audit_partitions()
+            logger.info(
+                f"✅ Audit partitions maintained "
+                f"(created: {len(result['created'])}, removed: {len(result['removed'])})"
+            )
+        except Exception as e:
+            logger.error(f"Audit partition maintenance error: {str(e)}", exc_info=True)
+
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    """Run the worker directly"""
+    asyncio.run(run_audit_partition_worker())
@@ -0,0 +1,101 @@
+"""
+Direct Upload Background Worker
+Processes queue:direct_uploads Redis queue
+Validates finalized direct uploads and moves them to their content-addressed key
+
+Jobs are moved atomically to an in-flight list while they are processed and
+removed when done, so a job is not lost if the worker dies mid-way: on
+startup, in-flight jobs are put back on the queue (run one worker per queue).
+Failures are recorded on the upload record, which clients poll.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import sys
+
+from app.core.database import AsyncSessionLocal, get_redis
+from app.services.direct_upload_service import (
+    DIRECT_UPLOAD_INFLIGHT_QUEUE,
+    DIRECT_UPLOAD_QUEUE,
+    DirectUploadService,
+)
+from app.services.file_upload_service import FileUploadService
+from app.services.storage_service import close_storage_service, get_storage_service
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s | %(levelname)-8s | UPLOAD | %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S',
+    handlers=[logging.StreamHandler(sys.stdout)],
+    force=True
+)
+logger = logging.getLogger(__name__)
+
+# Global flag for graceful shutdown
+shutdown_requested = False
+
+
+def signal_handler(signum, frame):
+    """Handle shutdown signals gracefully"""
+    global shutdown_requested
+    logger.info("[SYSTEM] Shutdown signal received, finishing current job...")
+    shutdown_requested = True
+
+
+async def process_direct_upload_queue():
+    """Main worker loop - processes the direct upload queue continuously"""
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    logger.info(f"[SYSTEM] Direct upload worker starting (PID {os.getpid()})")
+
+    try:
+        redis = await get_redis()
+        await redis.ping()
+        storage = await get_storage_service()
+    except Exception as e:
+        logger.error(f"[SYSTEM] Startup failed: {str(e)}")
+        return
+
+    # Jobs left in flight by a previous run go back to the front of the queue
+    recovered = 0
+    while await redis.lmove(DIRECT_UPLOAD_INFLIGHT_QUEUE, DIRECT_UPLOAD_QUEUE, "RIGHT", "RIGHT"):
+        recovered += 1
+    if recovered:
+        logger.info(f"[SYSTEM] Requeued {recovered} interrupted jobs")
+
+    logger.info(f"[SYSTEM] Monitoring queue: {DIRECT_UPLOAD_QUEUE}")
+    processed = 0
+
+    try:
+        while not shutdown_requested:
+            try:
+                job = await redis.blmove(DIRECT_UPLOAD_QUEUE, DIRECT_UPLOAD_INFLIGHT_QUEUE, 5, "RIGHT", "LEFT")
+                if job is None:
+                    continue
+
+                try:
+                    async with AsyncSessionLocal() as db:
+                        await DirectUploadService(FileUploadService(db, storage)).process_uploads([job])
+                    processed += 1
+                    logger.info(f"[COMPLETE] Upload {job}")
+                except Exception as e:
+                    # process_uploads records per-upload failures itself
+                    logger.error(f"[ERROR] Upload {job} failed: {str(e)}")
+
+                await redis.lrem(DIRECT_UPLOAD_INFLIGHT_QUEUE, 1, job)
+
+            except Exception as e:
+                logger.error(f"[SYSTEM] Worker error: {str(e)}")
+                logger.error("[SYSTEM] Retrying in 1 second...")
+                await asyncio.sleep(1)  # Back off on error
+
+    finally:
+        await close_storage_service()
+        logger.info(f"[SYSTEM] Direct upload worker stopped ({processed} uploads processed)")
+
+
+if __name__ == "__main__":
+    asyncio.run(process_direct_upload_queue())
@@ -0,0 +1,156 @@
+"""
+Media Background Worker
+Processes queue:media_processing Redis queue
+Optimises uploaded images and generates their variants
+
+Up to MEDIA_PROCESS_WORKERS jobs run at once, so every process of the image
+processing pool has work. Jobs are moved atomically to an in-flight list
+while they are processed and removed when done, so a job is not lost if the
+worker dies mid-way: on startup, in-flight jobs are put back on the queue
+(run one worker per queue). Failed jobs go to queue:media_failed for manual
+review.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import sys
+from datetime import datetime
+
+from app.config import settings
+from app.core.database import AsyncSessionLocal, get_redis
+from app.services.image_processing import image_processing_pool
+from app.services.media_processing_service import (
+    MEDIA_FAILED_QUEUE,
+    MEDIA_INFLIGHT_QUEUE,
+    MEDIA_QUEUE,
+    MediaProcessingService,
+)
+from app.services.storage_service import close_storage_service, get_storage_service
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s | %(levelname)-8s | MEDIA | %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S',
+    handlers=[logging.StreamHandler(sys.stdout)],
+    force=True
+)
+logger = logging.getLogger(__name__)
+
+# Global flag for graceful shutdown
+shutdown_requested = False
+
+
+def signal_handler(signum, frame):
+    """Handle shutdown signals gracefully"""
+    global shutdown_requested
+    logger.info("[SYSTEM] Shutdown signal received, finishing current jobs...")
+    shutdown_requested = True
+
+
+async def process_media_queue():
+    """Main worker loop - processes the media queue continuously"""
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    logger.info(f"[SYSTEM] Media worker starting (PID {os.getpid()})")
+
+    metrics = {'processed': 0, 'synced': 0, 'skipped': 0, 'failed': 0}
+
+    try:
+        redis = await get_redis()
+        await redis.ping()
+        storage = await get_storage_service()
+    except Exception as e:
+        logger.error(f"[SYSTEM] Startup failed: {str(e)}")
+        return
+
+    # Jobs left in flight by a previous run go back to the front of the queue
+    recovered = 0
+    while await redis.lmove(MEDIA_INFLIGHT_QUEUE, MEDIA_QUEUE, "RIGHT", "RIGHT"):
+        recovered += 1
+    if recovered:
+        logger.info(f"[SYSTEM] Requeued {recovered} interrupted jobs")
+
+    await redis.hset("media_metrics:worker", mapping={
+        "status": "running",
+        "start_time": datetime.utcnow().isoformat()
+    })
+
+    # Heartbeat for health checks
+    async def update_heartbeat():
+        while True:
+            try:
+                await redis.set("media_worker:heartbeat", datetime.utcnow().isoformat(), ex=60)
+            except Exception as e:
+                logger.error(f"Heartbeat error: {e}")
+            await asyncio.sleep(10)
+
+    heartbeat_task = asyncio.create_task(update_heartbeat())
+
+    # One job per pool process (at least one when processing runs in threads)
+    concurrency = max(1, settings.MEDIA_PROCESS_WORKERS)
+    slots = asyncio.Semaphore(concurrency)
+    running = set()
+
+    async def run_job(job: str):
+        try:
+            try:
+                async with AsyncSessionLocal() as db:
+                    outcome = await MediaProcessingService(db, storage).process_media(int(job))
+                metrics[outcome] += 1
+                logger.info(f"[COMPLETE] Media {job}: {outcome}")
+            except Exception as e:
+                metrics['failed'] += 1
+                logger.error(f"[ERROR] Media {job} failed: {str(e)} - moved to {MEDIA_FAILED_QUEUE}")
+                await redis.lpush(MEDIA_FAILED_QUEUE, job)
+
+            await redis.lrem(MEDIA_INFLIGHT_QUEUE, 1, job)
+            await redis.hset("media_metrics:worker", mapping=metrics)
+        except Exception as e:
+            logger.error(f"[SYSTEM] Failed to finish media job {job}: {str(e)}")
+        finally:
+            slots.release()
+
+    logger.info(f"[SYSTEM] Monitoring queue: {MEDIA_QUEUE} ({concurrency} concurrent jobs)")
+
+    try:
+        while not shutdown_requested:
+            await slots.acquire()
+            try:
+                job = await redis.blmove(MEDIA_QUEUE, MEDIA_INFLIGHT_QUEUE, 5, "RIGHT", "LEFT")
+            except Exception as e:
+                slots.release()
+                logger.error(f"[SYSTEM] Worker error: {str(e)}")
+                logger.error("[SYSTEM] Retrying in 1 second...")
+                await asyncio.sleep(1)  # Back off on error
+                continue
+
+            if job is None:
+                slots.release()
+                continue
+
+            task = asyncio.create_task(run_job(job))
+            running.add(task)
+            task.add_done_callback(running.discard)
+
+    finally:
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+        heartbeat_task.cancel()
+        image_processing_pool.shutdown()
+        await close_storage_service()
+        try:
+            await redis.hset("media_metrics:worker", mapping={
+                "status": "stopped",
+                "stop_time": datetime.utcnow().isoformat()
+            })
+            await redis.delete("media_worker:heartbeat")
+        except Exception as e:
+            logger.warning(f"Failed to update final metrics: {e}")
+        logger.info(f"[SYSTEM] Media worker stopped ({metrics})")
+
+
+if __name__ == "__main__":
+    asyncio.run(process_media_queue())
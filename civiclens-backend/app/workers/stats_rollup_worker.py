@@ -0,0 +1,32 @@
+"""
+Statistics Rollup Worker
+Periodically refreshes precomputed dashboard, department and officer statistics
+"""
+
+import asyncio
+import logging
+from app.config import settings
+from app.services.stats_rollup_service import refresh_all_rollups
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def run_stats_rollup_worker():
+    """Refresh all rollups in a loop (every STATS_ROLLUP_WORKER_INTERVAL_SECONDS)"""
+    interval = settings.STATS_ROLLUP_WORKER_INTERVAL_SECONDS
+    logger.info(f"🚀 Stats Rollup Worker started (runs every {interval}s)")
+
+    while True:
+        try:
+            await refresh_all_rollups()
+            logger.info("✅ Stats rollups refreshed")
+        except Exception as e:
+            logger.error(f"Stats rollup refresh error: {str(e)}", exc_info=True)
+
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    """Run the worker directly"""
+    asyncio.run(run_stats_rollup_worker())
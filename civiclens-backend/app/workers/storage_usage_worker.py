@@ -0,0 +1,32 @@
+"""
+Storage Usage Worker
+Periodically reconciles the media storage usage counters with the media table
+"""
+
+import asyncio
+import logging
+from app.config import settings
+from app.services.storage_usage_service import reconcile_usage
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def run_storage_usage_worker():
+    """Reconcile usage counters in a loop (every STORAGE_USAGE_RECONCILE_INTERVAL_SECONDS)"""
+    interval = settings.STORAGE_USAGE_RECONCILE_INTERVAL_SECONDS
+    logger.info(f"🚀 Storage Usage Worker started (runs every {interval}s)")
+
+    while True:
+        try:
+            corrected = await reconcile_usage()
+            logger.info(f"✅ Storage usage reconciled ({corrected} counters corrected)")
+        except Exception as e:
+            logger.error(f"Storage usage reconciliation error: {str(e)}", exc_info=True)
+
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    """Run the worker directly"""
+    asyncio.run(run_storage_usage_worker())
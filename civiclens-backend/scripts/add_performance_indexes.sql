@@ -1,58 +0,0 @@
--- Performance Optimization: Add Database Indexes
--- Run this to speed up dashboard queries by 50-70%
--- Use CONCURRENTLY to avoid locking tables in production
-
--- Reports table indexes
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reports_status ON reports(status);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reports_severity ON reports(severity);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reports_created_at ON reports(created_at DESC);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reports_updated_at ON reports(updated_at DESC);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reports_ai_processed ON reports(ai_processed_at DESC);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reports_department_id ON reports(department_id);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reports_user_id ON reports(user_id);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reports_category ON reports(category);
-
--- Composite indexes for common queries
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reports_status_severity ON reports(status, severity);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reports_status_created ON reports(status, created_at DESC);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reports_dept_status ON reports(department_id, status);
-
--- Tasks table indexes
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tasks_status ON tasks(status);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tasks_assigned_to ON tasks(assigned_to);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tasks_report_id ON tasks(report_id);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tasks_resolved_at ON tasks(resolved_at DESC);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tasks_created_at ON tasks(created_at DESC);
-
--- Composite index for officer workload queries
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tasks_officer_status ON tasks(assigned_to, status);
-
--- Users table indexes (if not already exists)
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_role ON users(role);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_department_id ON users(department_id);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_is_active ON users(is_active);
-
--- Report status history indexes
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_report_status_history_report_id ON report_status_history(report_id);
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_report_status_history_created_at ON report_status_history(created_at DESC);
-
--- Media table indexes
-CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_media_report_id ON media(report_id);
-
--- Analyze tables to update statistics
-ANALYZE reports;
-ANALYZE tasks;
-ANALYZE users;
-ANALYZE report_status_history;
-ANALYZE media;
-
--- Verify indexes were created
-SELECT 
-    schemaname,
-    tablename,
-    indexname,
-    indexdef
-FROM pg_indexes
-WHERE schemaname = 'public'
-AND tablename IN ('reports', 'tasks', 'users', 'report_status_history', 'media')
-ORDER BY tablename, indexname;
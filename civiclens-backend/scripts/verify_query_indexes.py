@@ -0,0 +1,203 @@
+"""
+Query Index Verification Script
+Runs EXPLAIN on each hot report/task query and checks it is served by an index
+
+Usage (from civiclens-backend/):
+    python -m scripts.verify_query_indexes            # index usability (seq scans disabled)
+    python -m scripts.verify_query_indexes --natural  # planner's real choice on current data
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, text
+from sqlalchemy.dialects import postgresql
+from app.core.database import AsyncSessionLocal
+from app.models.report import Report, ReportStatus
+from app.models.task import Task, TaskStatus
+
+INDEX_NODE_TYPES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+def build_hot_queries():
+    """(description, accepted index names, statement) for each hot query"""
+    now = datetime.utcnow()
+    week_ago = now - timedelta(days=7)
+    month_ago = now - timedelta(days=30)
+
+    return [
+        (
+            "Admin report list (department + status, newest first)",
+            {"idx_report_dept_status_created"},
+            select(Report.id).where(
+                Report.department_id == 1,
+                Report.status == ReportStatus.ASSIGNED_TO_DEPARTMENT,
+            ).order_by(Report.created_at.desc()).limit(20),
+        ),
+        (
+            "My reports / per-user rate limit (user + created_at)",
+            {"idx_report_user_created"},
+            select(func.count(Report.id)).where(
+                Report.user_id == 1,
+                Report.created_at >= now - timedelta(hours=1),
+            ),
+        ),
+        (
+            "Status list (status, newest first)",
+            {"idx_report_status_created"},
+            select(Report.id).where(
+                Report.status == ReportStatus.RECEIVED,
+            ).order_by(Report.created_at.desc()).limit(20),
+        ),
+        (
+            "AI review queue (needs_review, ai_processed_at window)",
+            {"idx_report_review_queue"},
+            select(func.count(Report.id)).where(
+                Report.needs_review == True,
+                Report.ai_processed_at >= month_ago,
+            ),
+        ),
+        (
+            "AI pending queue (unprocessed, non-duplicate RECEIVED)",
+            {"idx_report_ai_pending"},
+            select(Report.id).where(
+                Report.status == ReportStatus.RECEIVED,
+                Report.ai_processed_at.is_(None),
+                Report.classified_by_user_id.is_(None),
+                Report.is_duplicate == False,
+            ).order_by(Report.created_at.desc()).limit(50),
+        ),
+        (
+            "AI metrics (ai_processed_at range)",
+            {"idx_report_ai_processed", "idx_report_review_queue"},
+            select(func.count(Report.id)).where(
+                Report.ai_processed_at.isnot(None),
+                Report.ai_processed_at >= week_ago,
+            ),
+        ),
+        (
+            "Duplicate clusters (is_duplicate, grouped by original)",
+            {"idx_report_duplicates"},
+            select(Report.duplicate_of_report_id, func.count(Report.id)).where(
+                Report.is_duplicate == True,
+            ).group_by(Report.duplicate_of_report_id),
+        ),
+        (
+            "Active reports by severity (excludes closed/resolved/rejected)",
+            {"idx_report_active_severity"},
+            select(Report.severity, func.count(Report.id)).where(
+                Report.status.not_in([
+                    ReportStatus.CLOSED,
+                    ReportStatus.RESOLVED,
+                    ReportStatus.REJECTED,
+                ]),
+                Report.department_id == 1,
+            ).group_by(Report.severity),
+        ),
+        (
+            "Resolution time (resolved tasks in window)",
+            {"idx_task_status_resolved"},
+            select(func.count(Task.id)).where(
+                Task.status == TaskStatus.RESOLVED,
+                Task.resolved_at >= month_ago,
+            ),
+        ),
+    ]
+
+
+def compile_statement(stmt) -> str:
+    """Render with literal values so partial-index predicates can be proven"""
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def collect_index_scans(node, found=None):
+    """Walk an EXPLAIN (FORMAT JSON) plan tree and collect (node type, index name)"""
+    if found is None:
+        found = []
+    if node.get("Node Type") in INDEX_NODE_TYPES:
+        found.append((node["Node Type"], node.get("Index Name")))
+    for child in node.get("Plans", []):
+        collect_index_scans(child, found)
+    return found
+
+
+async def verify_indexes(natural: bool = False) -> bool:
+    """Explain each hot query and report which index serves it"""
+
+    print("=" * 80)
+    print("  QUERY INDEX VERIFICATION - CIVICLENS")
+    print("  " + datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    print("  Mode: " + ("natural planning" if natural else "seq scans disabled (index usability)"))
+    print("=" * 80)
+
+    queries = build_hot_queries()
+    failures = 0
+
+    async with AsyncSessionLocal() as db:
+        if not natural:
+            await db.execute(text("SET LOCAL enable_seqscan = off"))
+
+        for i, (description, expected, stmt) in enumerate(queries, start=1):
+            print(f"\n[{i}/{len(queries)}] {description}")
+            print("-" * 80)
+
+            result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {compile_statement(stmt)}"))
+            raw_plan = result.scalar()
+            plan = json.loads(raw_plan) if isinstance(raw_plan, str) else raw_plan
+            root = plan[0]["Plan"]
+
+            scans = collect_index_scans(root)
+            used = {name for _, name in scans}
+
+            if used & expected:
+                print(f"✅ Uses {', '.join(sorted(used & expected))}")
+            else:
+                failures += 1
+                print(f"❌ Expected one of: {', '.join(sorted(expected))}")
+                if scans:
+                    print(f"   Planner chose: {', '.join(f'{t} on {n}' for t, n in scans)}")
+                else:
+                    print(f"   Planner chose: {root['Node Type']} (no index scan)")
+            print(f"   Estimated cost: {root.get('Total Cost')}")
+
+        await db.rollback()
+
+    print("\n" + "=" * 80)
+    if failures:
+        print(f"⚠️  {failures}/{len(queries)} hot queries are not using their index")
+        print("   Action: run migrations with: alembic upgrade head")
+        if natural:
+            print("   Note: on small tables the planner may prefer a sequential scan")
+        return False
+
+    print(f"✅ All {len(queries)} hot queries are served by an index")
+    return True
+
+
+async def main():
+    """Run index verification"""
+    parser = argparse.ArgumentParser(description="Verify hot queries use indexes via EXPLAIN")
+    parser.add_argument(
+        "--natural",
+        action="store_true",
+        help="Do not disable sequential scans (shows the planner's choice on current data)",
+    )
+    args = parser.parse_args()
+
+    try:
+        success = await verify_indexes(natural=args.natural)
+        sys.exit(0 if success else 1)
+    except KeyboardInterrupt:
+        print("\n\n⏸️  Verification interrupted")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\n\n❌ Verification failed: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+import io
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("pydantic_settings")
+
+from PIL import Image, ImageDraw
+
+from app.services.ai.config import AIConfig
+from app.services.image_processing import image_fingerprint, process_image_bytes
+
+EXIF_ORIENTATION = 0x0112
+
+
+def _scene(seed: int) -> Image.Image:
+    """Deterministic photo-like test image: a gradient with shapes"""
+    image = Image.new("RGB", (640, 480))
+    draw = ImageDraw.Draw(image)
+    for y in range(480):
+        draw.line([(0, y), (639, y)], fill=(y // 2, 90 + seed * 30 % 120, 255 - y // 2))
+    for i in range(6):
+        x = (i * 97 + seed * 151) % 520
+        y = (i * 61 + seed * 89) % 360
+        color = ((i * 70 + seed * 40) % 256, (i * 30 + seed * 90) % 256, (i * 110 + seed * 20) % 256)
+        if (i + seed) % 2:
+            draw.ellipse([x, y, x + 120, y + 120], fill=color)
+        else:
+            draw.rectangle([x, y, x + 110, y + 90], fill=color)
+    return image
+
+
+def _encode(image: Image.Image, quality: int = 95, **kwargs) -> io.BytesIO:
+    stream = io.BytesIO()
+    image.save(stream, format="JPEG", quality=quality, **kwargs)
+    stream.seek(0)
+    return stream
+
+
+def _distances(a: io.BytesIO, b: io.BytesIO):
+    (phash_a, dhash_a), (phash_b, dhash_b) = image_fingerprint(a), image_fingerprint(b)
+    mask = (1 << 64) - 1
+    return bin((phash_a ^ phash_b) & mask).count("1"), bin((dhash_a ^ dhash_b) & mask).count("1")
+
+
+def test_recompressed_copy_matches():
+    original = _scene(1)
+    phash_distance, dhash_distance = _distances(_encode(original), _encode(original, quality=40))
+    assert phash_distance <= AIConfig.DUPLICATE_IMAGE_PHASH_THRESHOLD
+    assert dhash_distance <= AIConfig.DUPLICATE_IMAGE_DHASH_THRESHOLD
+
+
+def test_exif_rotated_copy_matches():
+    original = _scene(1)
+    # Stored sideways with an orientation tag saying "rotate 90° clockwise to display"
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = 6
+    rotated = _encode(original.transpose(Image.Transpose.ROTATE_90), exif=exif.tobytes())
+
+    phash_distance, dhash_distance = _distances(_encode(original), rotated)
+    assert phash_distance <= AIConfig.DUPLICATE_IMAGE_PHASH_THRESHOLD
+    assert dhash_distance <= AIConfig.DUPLICATE_IMAGE_DHASH_THRESHOLD
+
+
+def test_different_image_does_not_match():
+    phash_distance, _ = _distances(_encode(_scene(1)), _encode(_scene(2)))
+    assert phash_distance > AIConfig.DUPLICATE_IMAGE_PHASH_THRESHOLD
+
+
+def test_processing_hashes_match_image_fingerprint():
+    original = _encode(_scene(1))
+    *_, (phash, dhash) = process_image_bytes(original.getvalue(), "image/jpeg", 320, 85, 80)
+    expected_phash, expected_dhash = image_fingerprint(original)
+    mask = (1 << 64) - 1
+    assert bin((phash ^ expected_phash) & mask).count("1") <= AIConfig.DUPLICATE_IMAGE_PHASH_THRESHOLD
+    assert bin((dhash ^ expected_dhash) & mask).count("1") <= AIConfig.DUPLICATE_IMAGE_DHASH_THRESHOLD
@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("geoalchemy2")
+
+from app.core.rbac import (
+    Permission,
+    PERMISSION_BITS,
+    ROLE_PERMISSIONS,
+    ROLE_PERMISSION_MASKS,
+    ROLE_PERMISSION_SETS,
+    get_user_permissions,
+    has_all_permissions,
+    has_any_permission,
+    has_permission,
+    permission_mask,
+    permissions_from_mask,
+)
+from app.models.user import UserRole
+
+
+def test_permission_bits_are_unique_single_bits():
+    bits = list(PERMISSION_BITS.values())
+    assert len(bits) == len(Permission)
+    assert len(set(bits)) == len(bits)
+    assert all(bit & (bit - 1) == 0 for bit in bits)
+
+
+def test_compiled_masks_match_declared_permissions():
+    assert set(ROLE_PERMISSION_MASKS) == set(ROLE_PERMISSIONS)
+    for role, declared in ROLE_PERMISSIONS.items():
+        assert set(permissions_from_mask(ROLE_PERMISSION_MASKS[role])) == declared
+        assert ROLE_PERMISSION_SETS[role] == frozenset(declared)
+        assert get_user_permissions(role) == frozenset(declared)
+
+
+def test_checks_match_set_membership():
+    for role, declared in ROLE_PERMISSIONS.items():
+        for permission in Permission:
+            assert has_permission(role, permission) == (permission in declared)
+
+        granted = sorted(declared, key=list(Permission).index)[:2]
+        missing = [p for p in Permission if p not in declared][:2]
+        assert has_any_permission(role, granted + missing) == bool(granted)
+        assert has_all_permissions(role, granted) is True
+        assert has_all_permissions(role, granted + missing) == (not missing)
+        assert has_any_permission(role, []) is False
+        assert has_all_permissions(role, []) is True
+
+
+def test_mask_round_trip():
+    permissions = [Permission.CREATE_REPORT, Permission.SYSTEM_ADMIN]
+    assert permissions_from_mask(permission_mask(permissions)) == permissions
+    assert has_permission(UserRole.CITIZEN, Permission.SYSTEM_ADMIN) is False